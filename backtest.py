@@ -0,0 +1,269 @@
+#!.venv/bin/python
+"""
+Backtest the OrderbookTrader strategy (price/spread filters + decide_trade) on recorded
+top-of-book data, and sweep its thresholds across a process pool.
+
+Input is a CSV or parquet file with one row per top-of-book update:
+    ts      seconds since epoch (float)
+    ticker  market ticker
+    p_yes   cost to buy yes in cents (-1 if there is no offer)
+    p_no    cost to buy no in cents (-1 if there is no offer)
+Full-depth recordings (one raw websocket message per line, JSONL) can be converted with
+`top_of_book_from_depth`.
+
+Fill model: every order crosses the spread at the quote prevailing `latency` seconds after
+the decision. Positions are marked at the final bid, or at settlement if results are given.
+
+    python backtest.py tob.parquet --max-price 95 97 99 --min-spread 50 66 80 --latency 0 0.5
+"""
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+from orderbook_trader import MAX_PRICE, MIN_SPREAD
+
+# ticker -> (ts float64, p_yes int64, p_no int64), each sorted by ts
+Series = Dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]]
+
+_DATA: Series = {}
+_RESULTS: Dict[str, str] = {}
+
+
+def load_top_of_book(path: str) -> Series:
+    df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    return series_from_frame(df)
+
+
+def series_from_frame(df: pd.DataFrame) -> Series:
+    """Splits top-of-book rows (ts, ticker, p_yes, p_no) into per-ticker arrays sorted by ts."""
+    df = df.sort_values(["ticker", "ts"], kind="stable")
+    series = {}
+    for ticker, g in df.groupby("ticker", sort=False):
+        series[ticker] = (
+            g["ts"].to_numpy(np.float64),
+            g["p_yes"].to_numpy(np.int64),
+            g["p_no"].to_numpy(np.int64),
+        )
+    return series
+
+
+def top_of_book_from_depth(path: str) -> pd.DataFrame:
+    """Replays a JSONL recording of orderbook_snapshot/orderbook_delta messages into top-of-book rows."""
+    books: Dict[str, Dict[str, Dict[int, int]]] = {}
+    rows = []
+    with open(path) as f:
+        for line in f:
+            data = json.loads(line)
+            msg = data.get("msg", {})
+            ticker = msg.get("market_ticker")
+            if data.get("type") == "orderbook_snapshot":
+                books[ticker] = {
+                    side: {p: v for p, v in msg.get(side, [])} for side in ("yes", "no")
+                }
+            elif data.get("type") == "orderbook_delta" and ticker in books:
+                levels = books[ticker][msg["side"]]
+                new = levels.get(msg["price"], 0) + msg["delta"]
+                if new > 0:
+                    levels[msg["price"]] = new
+                else:
+                    levels.pop(msg["price"], None)
+            else:
+                continue
+            yes_top = max(books[ticker]["yes"], default=None)
+            no_top = max(books[ticker]["no"], default=None)
+            rows.append(
+                (
+                    data.get("ts", msg.get("ts")),
+                    ticker,
+                    100 - no_top if no_top is not None else -1,
+                    100 - yes_top if yes_top is not None else -1,
+                )
+            )
+    return pd.DataFrame(rows, columns=["ts", "ticker", "p_yes", "p_no"])
+
+
+def simulate_ticker(
+    ts: np.ndarray,
+    p_yes: np.ndarray,
+    p_no: np.ndarray,
+    max_price: int = MAX_PRICE,
+    min_spread: int = MIN_SPREAD,
+    latency: float = 0.0,
+    fee: float = 0.0,
+    result: str | None = None,
+) -> Dict[str, float]:
+    """
+    Runs the strategy over one ticker's quotes.
+
+    decide_trade always leaves the position at the sign of the cheaper side (-1 when yes
+    is cheaper, +1 when no is cheaper), so trades happen exactly where that direction
+    changes among tradable quotes; no per-quote Python loop is needed.
+    """
+    tradable = (
+        (p_yes >= 0)
+        & (p_no >= 0)
+        & (p_yes <= max_price)
+        & (p_no <= max_price)
+        & (np.abs(p_no - p_yes) >= min_spread)
+    )
+    direction = np.sign(p_yes - p_no)  # +1: no is cheaper -> go long yes
+    idx = np.flatnonzero(tradable & (direction != 0))
+    d = direction[idx]
+    change = np.ones(d.size, dtype=bool)
+    change[1:] = d[1:] != d[:-1]
+    trade_idx = idx[change]
+    new_pos = d[change]
+    qty = new_pos - np.concatenate(([0], new_pos[:-1]))  # +-1 first, then +-2
+
+    # fill at the quote in force `latency` seconds later: the last one at or before then
+    fill_idx = (
+        np.searchsorted(ts, ts[trade_idx] + latency, side="right") - 1
+        if latency
+        else trade_idx
+    )
+    fill_price = np.where(qty > 0, p_yes[fill_idx], p_no[fill_idx])
+    # no offer at fill time: fall back to the decision quote
+    fill_price = np.where(
+        fill_price < 0, np.where(qty > 0, p_yes[trade_idx], p_no[trade_idx]), fill_price
+    )
+
+    contracts = np.abs(qty)
+    yes_held = int(contracts[qty > 0].sum())
+    no_held = int(contracts[qty < 0].sum())
+    cash = -float((contracts * fill_price).sum()) - fee * float(contracts.sum())
+
+    if result is not None:
+        value = 100.0 * (yes_held if result == "yes" else no_held)
+    else:
+        pairs = min(yes_held, no_held)
+        yes_bid = 100 - p_no[-1] if p_no[-1] >= 0 else 0
+        no_bid = 100 - p_yes[-1] if p_yes[-1] >= 0 else 0
+        value = (
+            100.0 * pairs + (yes_held - pairs) * yes_bid + (no_held - pairs) * no_bid
+        )
+
+    return {
+        "pnl": float(cash + value),
+        "trades": int(trade_idx.size),
+        "contracts": int(contracts.sum()),
+        "final_pos": int(new_pos[-1]) if new_pos.size else 0,
+        "capital": -cash,
+    }
+
+
+def run_backtest(
+    data: Series, results: Dict[str, str] | None = None, **params
+) -> Dict[str, float]:
+    """Backtests every ticker with one parameter set and sums the per-ticker results."""
+    results = results or {}
+    total = {
+        "pnl": 0.0,
+        "trades": 0,
+        "contracts": 0,
+        "capital": 0.0,
+        "markets_traded": 0,
+        "worst_market": 0.0,
+    }
+    for ticker, (ts, p_yes, p_no) in data.items():
+        r = simulate_ticker(ts, p_yes, p_no, result=results.get(ticker), **params)
+        total["pnl"] += r["pnl"]
+        total["trades"] += r["trades"]
+        total["contracts"] += r["contracts"]
+        total["capital"] += r["capital"]
+        total["markets_traded"] += r["trades"] > 0
+        total["worst_market"] = min(total["worst_market"], r["pnl"])
+    return total
+
+
+def per_ticker(
+    data: Series, results: Dict[str, str] | None = None, **params
+) -> pd.DataFrame:
+    results = results or {}
+    rows = {
+        t: simulate_ticker(*arrays, result=results.get(t), **params)
+        for t, arrays in data.items()
+    }
+    return pd.DataFrame.from_dict(rows, orient="index").sort_values("pnl")
+
+
+def _init_worker(data: Series, results: Dict[str, str]) -> None:
+    global _DATA, _RESULTS
+    _DATA, _RESULTS = data, results
+
+
+def _run_params(params: Dict) -> Dict:
+    return {**params, **run_backtest(_DATA, _RESULTS, **params)}
+
+
+def sweep(
+    data: Series,
+    grid: Dict[str, Iterable],
+    results: Dict[str, str] | None = None,
+    processes: int | None = None,
+) -> pd.DataFrame:
+    """Runs every combination in `grid` across a process pool; one row per combination, best first."""
+    keys = list(grid)
+    combos = [
+        dict(zip(keys, values))
+        for values in itertools.product(*(grid[k] for k in keys))
+    ]
+    # data is shipped once per worker, not once per combination
+    with ProcessPoolExecutor(
+        processes, initializer=_init_worker, initargs=(data, results or {})
+    ) as pool:
+        rows = list(
+            pool.map(
+                _run_params,
+                combos,
+                chunksize=max(1, len(combos) // (4 * (os.cpu_count() or 1))),
+            )
+        )
+    return pd.DataFrame(rows).sort_values("pnl", ascending=False, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "path", help="top-of-book CSV/parquet, or a .jsonl depth recording"
+    )
+    parser.add_argument("--max-price", type=int, nargs="+", default=[MAX_PRICE])
+    parser.add_argument("--min-spread", type=int, nargs="+", default=[MIN_SPREAD])
+    parser.add_argument(
+        "--latency", type=float, nargs="+", default=[0.0], help="seconds"
+    )
+    parser.add_argument("--fee", type=float, default=0.0, help="cents per contract")
+    parser.add_argument(
+        "--results", help="JSON file mapping ticker -> 'yes'/'no' settlement"
+    )
+    parser.add_argument("--processes", type=int)
+    args = parser.parse_args()
+
+    if args.path.endswith(".jsonl"):
+        data = series_from_frame(top_of_book_from_depth(args.path))
+    else:
+        data = load_top_of_book(args.path)
+    results = None
+    if args.results:
+        with open(args.results) as f:
+            results = json.load(f)
+    grid = {
+        "max_price": args.max_price,
+        "min_spread": args.min_spread,
+        "latency": args.latency,
+        "fee": [args.fee],
+    }
+    table = sweep(data, grid, results, args.processes)
+    with pd.option_context("display.width", 200, "display.max_rows", 200):
+        print(table.round(2).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,24 +2,21 @@ def graph_readings_forecast(site, days):
     import sqlite3
     import pandas as pd
 
-    site2mkt = {
-        "KLAX": "KXHIGHLAX",
-        "KNYC": "KXHIGHNY",
-        "KMDW": "KXHIGHCHI",
-        "KAUS": "KXHIGHAUS",
-        "KMIA": "KXHIGHMIA",
-        "KDEN": "KXHIGHDEN",
-        "KPHL": "KXHIGHPHIL",
-    }
+    from weather_markets import site2mkt
+
     # ---- forecast ----------------------------------------------------------
+    # forecast_latest holds the newest revision per target hour: for past hours the last
+    # forecast issued before the hour, for future hours the current forecast
+    since = (pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=days + 1)).strftime("%Y-%m-%d")
     conn = sqlite3.connect("/opt/data/forecast.db")
-    fcast = pd.read_sql_query(f'select * from forecast where station == "{site}"', conn)
-    fcast["dt"] = pd.to_datetime(fcast["observation_time"], utc=False)
+    fcast = pd.read_sql_query(
+        "select observation_time, air_temp from forecast_latest "
+        "where station = ? and observation_time >= ? order by observation_time",
+        conn,
+        params=(site, since),
+    )
     conn.close()
-
-    fcast_current = fcast[fcast.idx == 0].sort_values(by="dt").tail(24 * days)
-    fcast_future = fcast.tail(47)
-    fcast = pd.concat([fcast_current, fcast_future])
+    fcast["dt"] = pd.to_datetime(fcast["observation_time"].str[:19])
 
     # ---- observations ------------------------------------------------------
     conn = sqlite3.connect("/opt/data/weather.db")
@@ -1,124 +1,31 @@
 import asyncio
-import base64
-import json
-import time
-import websockets
-from cryptography.hazmat.primitives import serialization, hashes
-from cryptography.hazmat.primitives.asymmetric import padding
 import requests
 
 import os
 
-# Configuration
-KEY_ID = os.getenv("PROD_KEYID")
-PRIVATE_KEY_PATH = os.getenv("PROD_KEYFILE")
+from kalshi_ref import KalshiWebSocketClient
 
-WS_URL = "wss://api.elections.kalshi.com/trade-api/ws/v2"
+# Configuration
+API_URL = os.getenv("KALSHI_API_URL", "https://api.elections.kalshi.com")
 
 response = requests.get(
-    "https://api.elections.kalshi.com/trade-api/v2/markets",
+    API_URL + "/trade-api/v2/markets",
     {"series_ticker": "KXHIGHNY", "status": "open"},
 )
 MARKET_TICKER = [i["ticker"] for i in response.json()["markets"]]
 
 
-def sign_pss_text(private_key, text: str) -> str:
-    """Sign message using RSA-PSS"""
-    message = text.encode("utf-8")
-    signature = private_key.sign(
-        message,
-        padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.DIGEST_LENGTH),
-        hashes.SHA256(),
-    )
-    return base64.b64encode(signature).decode("utf-8")
-
-
-def create_headers(private_key, method: str, path: str) -> dict:
-    """Create authentication headers"""
-    timestamp = str(int(time.time() * 1000))
-    msg_string = timestamp + method + path.split("?")[0]
-    signature = sign_pss_text(private_key, msg_string)
-
-    return {
-        "Content-Type": "application/json",
-        "KALSHI-ACCESS-KEY": KEY_ID,
-        "KALSHI-ACCESS-SIGNATURE": signature,
-        "KALSHI-ACCESS-TIMESTAMP": timestamp,
-    }
-
-
 async def orderbook_websocket():
-    """Connect to WebSocket and subscribe to orderbook"""
-    # Load private key
-    with open(PRIVATE_KEY_PATH, "rb") as f:
-        private_key = serialization.load_pem_private_key(f.read(), password=None)
-
-    # Create WebSocket headers
-    ws_headers = create_headers(private_key, "GET", "/trade-api/ws/v2")
-
-    async with websockets.connect(WS_URL, additional_headers=ws_headers) as websocket:
-        print(f"Connected! Subscribing to orderbook for {MARKET_TICKER}")
-
-        # Subscribe to orderbook
-        ob_subscribe_msg = {
-            "id": 1,
-            "cmd": "subscribe",
-            "params": {
-                "channels": ["orderbook_delta"],
-                "market_tickers": MARKET_TICKER,
-            },
-        }
-        await websocket.send(json.dumps(ob_subscribe_msg))
-
-        lifecycle_subscribe_msg = {
-            "id": 2,
-            "cmd": "subscribe",
-            "params": {
-                "channels": ["market_lifecycle_v2"],
-            },
-        }
-        await websocket.send(json.dumps(lifecycle_subscribe_msg))
-
-        mkt_pos_subscribe_msg = {
-            "id": 3,
-            "cmd": "subscribe",
-            "params": {
-                "channels": ["market_positions"],
-            },
-        }
-        await websocket.send(json.dumps(mkt_pos_subscribe_msg))
-
-        # Process messages
-        async for message in websocket:
-            data = json.loads(message)
-            msg_type = data.get("type")
-
-            if msg_type == "subscribed":
-                print(f"Subscribed: {data}")
-
-            elif msg_type == "orderbook_snapshot":
-                print(f"Orderbook snapshot: {data}")
-
-            elif msg_type == "orderbook_delta":
-                print(f"Orderbook update: {data}")
-
-            elif msg_type == "fill":
-                print(f"User Fills: {data}")
-
-            elif msg_type == "market_position":
-                print(f"Market position: {data}")
-
-            elif msg_type == "market_lifecycle_v2":
-                print(f"market_lifecycle: {data}")
-
-            elif msg_type == "event_lifecycle":
-                print(f"event_lifecycel: {data}")
+    """Subscribe to orderbook, lifecycle and portfolio channels over one connection"""
+    client = KalshiWebSocketClient.from_env()
 
-            elif msg_type == "error":
-                print(f"Error: {data}")
+    print(f"Subscribing to orderbook for {MARKET_TICKER}")
+    await client.subscribe(["orderbook_delta"], MARKET_TICKER, lambda data: print(f"Orderbook update: {data}"))
+    await client.subscribe(["market_lifecycle_v2"], handler=lambda data: print(f"market_lifecycle: {data}"))
+    await client.subscribe(["market_positions"], handler=lambda data: print(f"Market position: {data}"))
+    await client.subscribe(["fill"], handler=lambda data: print(f"User Fills: {data}"))
 
-            else:
-                print(f"{data}")
+    await client.run()
 
 
 # Run the example
@@ -0,0 +1,241 @@
+#!.venv/bin/python
+"""
+Bulk historical trades downloader.
+
+Every market of each series is paged through /markets/trades by a bounded pool of workers
+sharing one async rate limiter. Pages are written as parquet part files, hive-partitioned
+as <out>/series=<series>/date=<YYYY-MM-DD>/<ticker>-<n>.parquet, so new data only ever
+adds files. After each page the ticker's cursor is checkpointed to <out>/_checkpoint.json;
+a restarted run continues from the saved cursors. A page written just before a crash can
+be fetched twice, so readers should drop duplicate trade_ids.
+
+`--refresh` re-downloads only trades newer than each ticker's stored max_ts.
+
+    python download_trades.py --series KXHIGHNY KXHIGHCHI --out data/trades
+    python download_trades.py --series KXHIGHNY --out data/trades --refresh
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from kalshi_ref import KalshiHttpClient
+from weather_markets import site2mkt
+
+logger = logging.getLogger("download_trades")
+
+SCHEMA = pa.schema(
+    [
+        ("trade_id", pa.string()),
+        ("ticker", pa.string()),
+        ("yes_price", pa.int16()),
+        ("no_price", pa.int16()),
+        ("count", pa.int32()),
+        ("taker_side", pa.string()),
+        ("ts", pa.int64()),
+        ("created_time", pa.string()),
+    ]
+)
+
+
+class RateLimiter:
+    """Spaces request starts at least 1/rate seconds apart across all workers."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self.next = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self.lock:
+            now = time.monotonic()
+            if self.next > now:
+                await asyncio.sleep(self.next - now)
+            self.next = max(now, self.next) + self.interval
+
+
+class TradesDownloader:
+    def __init__(
+        self,
+        client: KalshiHttpClient,
+        out: str,
+        concurrency: int = 4,
+        rate: float = 8.0,
+    ):
+        self.client = client
+        self.out = out
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.checkpoint_path = os.path.join(out, "_checkpoint.json")
+        self.checkpoint: Dict[str, Dict[str, Any]] = {}
+        self.counters = defaultdict(int)
+        os.makedirs(out, exist_ok=True)
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                self.checkpoint = json.load(f)
+
+    def _save_checkpoint(self) -> None:
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.checkpoint, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    async def _get(self, fn, *args, attempts: int = 6, **kwargs) -> Dict:
+        """Calls `fn` in a thread through the rate limiter, retrying with backoff; re-raises the last error."""
+        for attempt in range(attempts):
+            await self.limiter.wait()
+            try:
+                self.counters["requests"] += 1
+                return await asyncio.to_thread(fn, *args, **kwargs)
+            except Exception as e:
+                if attempt == attempts - 1:
+                    raise
+                self.counters["retries"] += 1
+                logger.warning("Request failed (%s), retrying", e)
+                await asyncio.sleep(2**attempt)
+
+    # ---------- discovery ----------
+    async def tickers(self, series: str) -> List[str]:
+        tickers, cursor = [], None
+        while True:
+            response = await self._get(
+                self.client.get_markets, series_ticker=series, limit=1000, cursor=cursor
+            )
+            tickers.extend(m["ticker"] for m in response.get("markets", []))
+            cursor = response.get("cursor")
+            if not cursor:
+                return tickers
+
+    def stored_max_ts(self, series: str) -> Dict[str, int]:
+        """Newest stored trade per ticker, read from the parquet files themselves."""
+        path = os.path.join(self.out, f"series={series}")
+        if not os.path.isdir(path):
+            return {}
+        table = ds.dataset(path, format="parquet", partitioning="hive").to_table(
+            columns=["ticker", "ts"]
+        )
+        grouped = table.group_by("ticker").aggregate([("ts", "max")])
+        return dict(zip(grouped["ticker"].to_pylist(), grouped["ts_max"].to_pylist()))
+
+    # ---------- download ----------
+    def _write(self, series: str, ticker: str, state: Dict, rows: List[Dict]) -> None:
+        by_date = defaultdict(list)
+        for r in rows:
+            by_date[time.strftime("%Y-%m-%d", time.gmtime(r["ts"]))].append(r)
+        for date, group in by_date.items():
+            directory = os.path.join(self.out, f"series={series}", f"date={date}")
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pylist(
+                [{k: r.get(k) for k in SCHEMA.names} for r in group], schema=SCHEMA
+            )
+            state["part"] += 1
+            pq.write_table(
+                table, os.path.join(directory, f"{ticker}-{state['part']}.parquet")
+            )
+        self.counters["trades"] += len(rows)
+
+    async def download_ticker(
+        self, series: str, ticker: str, min_ts: int | None
+    ) -> None:
+        state = self.checkpoint.get(ticker)
+        if state is None or (min_ts is not None and state.get("done")):
+            part = state["part"] if state else 0
+            state = self.checkpoint[ticker] = {
+                "series": series,
+                "cursor": None,
+                "done": False,
+                "min_ts": min_ts,
+                "part": part,
+            }
+        if state["done"]:
+            return
+        while True:
+            response = await self._get(
+                self.client.get_trades,
+                ticker=ticker,
+                limit=1000,
+                cursor=state["cursor"],
+                min_ts=state["min_ts"],
+            )
+            rows = response.get("trades", [])
+            if rows:
+                await asyncio.to_thread(self._write, series, ticker, state, rows)
+            state["cursor"] = response.get("cursor") or None
+            state["done"] = state["cursor"] is None
+            self._save_checkpoint()
+            if state["done"]:
+                self.counters["tickers"] += 1
+                return
+
+    async def run(
+        self, series_list: List[str], refresh: bool = False
+    ) -> Dict[str, int]:
+        queue: asyncio.Queue = asyncio.Queue()
+        for series in series_list:
+            max_ts = (
+                await asyncio.to_thread(self.stored_max_ts, series) if refresh else {}
+            )
+            for ticker in await self.tickers(series):
+                # trade ts has 1s resolution: start from the stored second, duplicates are dropped on read
+                queue.put_nowait(
+                    (series, ticker, max_ts.get(ticker) if refresh else None)
+                )
+        logger.info("Downloading trades for %d markets", queue.qsize())
+
+        async def worker():
+            while not queue.empty():
+                series, ticker, min_ts = queue.get_nowait()
+                try:
+                    await self.download_ticker(series, ticker, min_ts)
+                except Exception:
+                    self.counters["failed"] += 1
+                    logger.exception("Giving up on %s for this run", ticker)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return dict(self.counters)
+
+
+def read_trades(out: str, series: str | None = None):
+    """Loads the stored trades (optionally one series) as a pandas DataFrame without duplicates."""
+    path = os.path.join(out, f"series={series}") if series else out
+    table = ds.dataset(
+        path, format="parquet", partitioning="hive", exclude_invalid_files=True
+    ).to_table()
+    return table.to_pandas().drop_duplicates("trade_id")
+
+
+async def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--series", nargs="+", default=sorted(site2mkt.values()))
+    parser.add_argument("--out", default="data/trades")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--rate", type=float, default=8.0, help="requests per second across all workers"
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="only fetch trades newer than the stored max_ts",
+    )
+    args = parser.parse_args()
+
+    downloader = TradesDownloader(
+        KalshiHttpClient.from_env(), args.out, args.concurrency, args.rate
+    )
+    stats = await downloader.run(args.series, args.refresh)
+    logger.info("Done: %s", stats)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,225 @@
+"""
+Revision-based forecast storage.
+
+`forecast_revision` gets a row only when the forecast for a station and target hour
+changes: a new revision records the values and when they were issued. The AFTER INSERT
+trigger keeps `forecast_latest` (one row per station and target hour) equal to the newest
+revision, so the current forecast is a primary-key range read:
+
+    SELECT * FROM forecast_latest WHERE station = 'KNYC' AND observation_time >= ?
+
+ForecastStore keeps the latest values in memory (loaded from `forecast_latest` on start)
+and only queues rows that differ; the INSERT also re-checks against `forecast_latest`,
+so a second writer or a restart without `load` cannot store a duplicate revision.
+Revisions in a batch that fails to commit are queued again (up to MAX_ATTEMPTS times,
+then forgotten in memory so the next page listing them queues them anew).
+"""
+import datetime as dt
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from storage import Database
+
+logger = logging.getLogger("forecast_store")
+
+VALUE_COLUMNS = ("air_temp", "dew_point", "wind_speed", "relative_humidity")
+MAX_ATTEMPTS = 3  # commits tried per revision
+
+FORECAST_DDL = """
+CREATE TABLE IF NOT EXISTS forecast_revision (
+    station           TEXT NOT NULL,
+    observation_time  TEXT NOT NULL,
+    issued_at         TEXT NOT NULL,
+    air_temp          REAL,
+    dew_point         REAL,
+    wind_speed        REAL,
+    relative_humidity REAL,
+    PRIMARY KEY (station, observation_time, issued_at)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS forecast_latest (
+    station           TEXT NOT NULL,
+    observation_time  TEXT NOT NULL,
+    issued_at         TEXT NOT NULL,
+    air_temp          REAL,
+    dew_point         REAL,
+    wind_speed        REAL,
+    relative_humidity REAL,
+    revisions         INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (station, observation_time)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS forecast_revision_latest AFTER INSERT ON forecast_revision
+BEGIN
+    INSERT INTO forecast_latest
+        (station, observation_time, issued_at, air_temp, dew_point, wind_speed, relative_humidity)
+    VALUES
+        (NEW.station, NEW.observation_time, NEW.issued_at, NEW.air_temp, NEW.dew_point, NEW.wind_speed, NEW.relative_humidity)
+    ON CONFLICT (station, observation_time) DO UPDATE SET
+        issued_at = excluded.issued_at,
+        air_temp = excluded.air_temp,
+        dew_point = excluded.dew_point,
+        wind_speed = excluded.wind_speed,
+        relative_humidity = excluded.relative_humidity,
+        revisions = forecast_latest.revisions + 1
+    WHERE excluded.issued_at >= forecast_latest.issued_at;
+END;
+"""
+
+INSERT_REVISION_SQL = """
+INSERT OR IGNORE INTO forecast_revision
+    (station, observation_time, issued_at, air_temp, dew_point, wind_speed, relative_humidity)
+SELECT :station, :observation_time, :issued_at, :air_temp, :dew_point, :wind_speed, :relative_humidity
+WHERE NOT EXISTS (
+    SELECT 1 FROM forecast_latest
+    WHERE station = :station AND observation_time = :observation_time
+      AND air_temp IS :air_temp AND dew_point IS :dew_point
+      AND wind_speed IS :wind_speed AND relative_humidity IS :relative_humidity
+)
+"""
+
+LATEST_SQL = """
+SELECT observation_time, issued_at, air_temp, dew_point, wind_speed, relative_humidity
+FROM forecast_latest
+WHERE station = ? AND observation_time >= ?
+ORDER BY observation_time
+"""
+
+# Converts the legacy per-scrape `forecast` table (one row per idx and scrape) into
+# revisions: per station and hour, the first scrape and every scrape whose values differ
+# from the previous one. Rows are inserted oldest first so the trigger ends on the newest.
+MIGRATE_LEGACY_SQL = """
+INSERT OR IGNORE INTO forecast_revision
+    (station, observation_time, issued_at, air_temp, dew_point, wind_speed, relative_humidity)
+SELECT station, observation_time, inserted_at, air_temp, dew_point, wind_speed, relative_humidity
+FROM (
+    SELECT *,
+        LAG(air_temp) OVER w AS prev_air_temp,
+        LAG(dew_point) OVER w AS prev_dew_point,
+        LAG(wind_speed) OVER w AS prev_wind_speed,
+        LAG(relative_humidity) OVER w AS prev_relative_humidity,
+        ROW_NUMBER() OVER w AS n
+    FROM (
+        SELECT station, observation_time, inserted_at,
+            MIN(air_temp) AS air_temp, MIN(dew_point) AS dew_point,
+            MIN(wind_speed) AS wind_speed, MIN(relative_humidity) AS relative_humidity
+        FROM forecast
+        GROUP BY station, observation_time, inserted_at
+    )
+    WINDOW w AS (PARTITION BY station, observation_time ORDER BY inserted_at)
+)
+WHERE n = 1
+    OR prev_air_temp IS NOT air_temp OR prev_dew_point IS NOT dew_point
+    OR prev_wind_speed IS NOT wind_speed OR prev_relative_humidity IS NOT relative_humidity
+ORDER BY inserted_at
+"""
+
+
+class ForecastStore:
+    def __init__(self, db: Database):
+        self.db = db
+        self.db.add_ddl(FORECAST_DDL)
+        self.db.flush_listeners.append(self._on_flush)
+        self.latest: Dict[
+            tuple[str, str], tuple
+        ] = {}  # (station, observation_time) -> values
+        self.issued: Dict[
+            tuple[str, str], str
+        ] = {}  # (station, observation_time) -> latest issued_at
+        self.unconfirmed: Dict[int, list] = defaultdict(
+            list
+        )  # db batch -> [(key, row, attempt)]
+        self.counters = {"rows": 0, "revisions": 0, "retries": 0, "lost": 0}
+
+    async def load(self, since: str = "") -> None:
+        """Seeds the in-memory latest values from `forecast_latest` (target times >= `since`)."""
+        rows = await self.db.fetchall(
+            "SELECT station, observation_time, issued_at, air_temp, dew_point, wind_speed, relative_humidity "
+            "FROM forecast_latest WHERE observation_time >= ?",
+            (since,),
+        )
+        self.latest = {(r[0], r[1]): tuple(r[3:]) for r in rows}
+        self.issued = {(r[0], r[1]): r[2] for r in rows}
+        logger.info("Loaded %d latest forecast hours", len(self.latest))
+
+    def prune(self, before: str) -> None:
+        """Forgets target times before `before`; the page no longer lists them."""
+        self.latest = {k: v for k, v in self.latest.items() if k[1] >= before}
+        self.issued = {k: v for k, v in self.issued.items() if k[1] >= before}
+
+    def add(self, rows: Iterable[Dict], issued_at: str) -> int:
+        """
+        Queues a revision for every row whose values changed; returns how many.
+
+        A revision's issued_at must be later than the hour's previous one (it is part of
+        the key, and the trigger only moves forecast_latest forward). When `issued_at` is
+        not, e.g. the page changed without a new Last-Modified, the row's fetch time is
+        used, or failing that the previous issued_at plus a microsecond.
+        """
+        changed = 0
+        for row in rows:
+            self.counters["rows"] += 1
+            key = (row["station"], row["observation_time"])
+            values = tuple(row[c] for c in VALUE_COLUMNS)
+            if self.latest.get(key) == values:
+                continue
+            issued = _after(self.issued.get(key), issued_at, row.get("inserted_at"))
+            self.latest[key] = values
+            self.issued[key] = issued
+            self._write(
+                key,
+                {
+                    "station": key[0],
+                    "observation_time": key[1],
+                    "issued_at": issued,
+                    **dict(zip(VALUE_COLUMNS, values)),
+                },
+            )
+            changed += 1
+        self.counters["revisions"] += changed
+        return changed
+
+    def _write(self, key: tuple[str, str], row: Dict, attempt: int = 0) -> None:
+        self.unconfirmed[self.db.batch].append((key, row, attempt))
+        self.db.write(INSERT_REVISION_SQL, row)
+
+    def _on_flush(self, batch: int, committed: bool) -> None:
+        rows = self.unconfirmed.pop(batch, [])
+        if committed:
+            return
+        for key, row, attempt in rows:
+            if attempt + 1 < MAX_ATTEMPTS:
+                self.counters["retries"] += 1
+                self._write(key, row, attempt + 1)
+                continue
+            self.counters["lost"] += 1
+            logger.error(
+                "Dropping forecast revision %s %s after %d attempts", *key, MAX_ATTEMPTS
+            )
+            if self.latest.get(key) == tuple(row[c] for c in VALUE_COLUMNS):
+                del self.latest[
+                    key
+                ]  # so the next page listing these values queues them again
+
+    async def current(self, station: str, since: str = "") -> List[tuple]:
+        """Latest forecast for `station` from target time `since` (same ISO format) on."""
+        return await self.db.fetchall(LATEST_SQL, (station, since))
+
+    def stats(self) -> Dict:
+        rows = self.counters["rows"]
+        return {
+            **self.counters,
+            "hours": len(self.latest),
+            "unconfirmed": sum(len(v) for v in self.unconfirmed.values()),
+            "revision_rate": round(self.counters["revisions"] / rows, 3)
+            if rows
+            else None,
+        }
+
+
+def _after(previous: str | None, *candidates: str | None) -> str:
+    """The first candidate later than `previous` (ISO timestamps), else `previous` + 1 µs."""
+    for candidate in candidates:
+        if candidate and (previous is None or candidate > previous):
+            return candidate
+    bumped = dt.datetime.fromisoformat(previous) + dt.timedelta(microseconds=1)
+    return bumped.isoformat(timespec="microseconds")
@@ -2,7 +2,38 @@ const ws   = new WebSocket(import.meta.env.VITE_SOCKET_URL);
 const rows = new Map();   // ticker → <tr>
 const books= new Map();   // eventKey → <table class=book>
 const nonWeatherBooks = new Map(); // ticker → <table class=book>
-ws.onopen  = () => console.log("📡 connected");
+const sensorRuns = new Map(); // site → [[HH:MM, temp], ...] runs, oldest first
+const forecasts = new Map();  // site → Map(observation_time → temp)
+const climateReports = new Map(); // site → latest parsed CLI report
+const streamSeq = new Map();  // "type" or "type:site" → last applied seq
+const awaitingSnapshot = new Set();
+ws.onopen  = () => {
+    console.log("📡 connected");
+    ws.send(JSON.stringify({ type: "snapshot" }));
+};
+
+/* Weather packets are numbered deltas per stream. Returns true if msg should be applied:
+   a full snapshot always, a delta only if it is the next seq. On a gap, asks the server
+   for a snapshot of that stream and drops deltas until it arrives. */
+function inSequence(msg) {
+    const key = msg.site ? `${msg.type}:${msg.site}` : msg.type;
+    const last = streamSeq.get(key);
+    if (msg.full) {
+        streamSeq.set(key, msg.seq);
+        awaitingSnapshot.delete(key);
+        return true;
+    }
+    if (last !== undefined && msg.seq <= last) return false;   // already in a snapshot
+    if (last !== undefined && msg.seq === last + 1) {
+        streamSeq.set(key, msg.seq);
+        return true;
+    }
+    if (!awaitingSnapshot.has(key)) {
+        awaitingSnapshot.add(key);
+        ws.send(JSON.stringify({ type: "snapshot", source: msg.type, site: msg.site }));
+    }
+    return false;
+}
 ws.onclose = () => console.log("❌ closed");
 
 document.title = import.meta.env.VITE_PAGE_TITLE
@@ -93,12 +124,23 @@ ws.onmessage = (evt) => {
         }
 
     } else if (msg.type === "SensorPoll") {
-        const siteToRows = msg.payload || {};
+        if (!inSequence(msg)) return;
+        // full packets replace every site's runs; deltas patch the sites they list
+        if (msg.full) sensorRuns.clear();
+        for (const [siteKey, update] of Object.entries(msg.payload || {})) {
+            if (msg.full) {
+                sensorRuns.set(siteKey, update);
+                continue;
+            }
+            const runs = (sensorRuns.get(siteKey) || []).slice(update.drop);
+            if (update.head) runs[0] = update.head;
+            sensorRuns.set(siteKey, runs.concat(update.runs));
+        }
         [...master.tBodies[0].rows].forEach(row => {
                 const siteKey = row.dataset.siteKey;
                 const cell    = getOrCreateSensorCol(row, 'sensorCol');
 
-                const rowsForSite = siteToRows[siteKey] || [];
+                const rowsForSite = sensorRuns.get(siteKey) || [];
                 if (!rowsForSite.length) {
                 cell.innerHTML = '';
                 return;
@@ -126,12 +168,18 @@ ws.onmessage = (evt) => {
     }
     else if (msg.type === "ForecastPoll") {
         const siteKey = msg.site;
+        if (!inSequence(msg)) return;
+        const hours = msg.full ? new Map() : (forecasts.get(siteKey) || new Map());
+        for (const t of msg.remove || []) hours.delete(t);
+        for (const [t, v] of msg.payload || []) hours.set(t, v);
+        forecasts.set(siteKey, hours);
+
         const row     = master.tBodies[0].querySelector(`tr[data-site-key="${siteKey}"]`);
         if (!row) return;
 
         const cell = getOrCreateForecastCol(row);
 
-        const rows = msg.payload || [];
+        const rows = [...hours].sort(([a], [b]) => (a < b ? -1 : a > b ? 1 : 0));
         let inner = '';
 
         if (rows.length) {
@@ -155,6 +203,10 @@ ws.onmessage = (evt) => {
         }
         cell.innerHTML = inner;
     }
+    else if (msg.type === "ClimateReportPoll") {
+        if (!inSequence(msg)) return;
+        climateReports.set(msg.site, { issued_at: msg.issued_at, report: msg.payload });
+    }
     else if (msg.type === "positionUpdate") {
         const { ticker, pos } = msg;
 
@@ -0,0 +1,118 @@
+import time
+from typing import Dict
+
+from storage import Database
+
+JOURNAL_DDL = """
+CREATE TABLE IF NOT EXISTS positions (
+    strategy TEXT,
+    ticker TEXT,
+    price INTEGER,
+    quantity INTEGER,
+    order_id UUID
+);
+CREATE TABLE IF NOT EXISTS orders (
+    strategy TEXT,
+    ticker TEXT,
+    price INTEGER,
+    quantity INTEGER,
+    order_id UUID PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS decisions (
+    ts REAL,
+    strategy TEXT,
+    ticker TEXT,
+    p_yes INTEGER,
+    p_no INTEGER,
+    position INTEGER,
+    max_price INTEGER,
+    min_spread INTEGER,
+    action TEXT,
+    quantity INTEGER,
+    price INTEGER
+);
+"""
+INSERT_ORDER_SQL = "INSERT OR IGNORE INTO orders VALUES (?, ?, ?, ?, ?)"
+INSERT_POSITION_SQL = "INSERT INTO positions VALUES (?, ?, ?, ?, ?)"
+INSERT_DECISION_SQL = "INSERT INTO decisions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+class TradeJournal:
+    """
+    Write-behind journal for decisions, orders and position changes.
+
+    The record methods only queue a row on a storage.Database, which writes the queue with
+    executemany in one transaction every `flush_interval` seconds or as soon as
+    `batch_size` rows are pending. Pass `db` to share a StorageService database (its
+    owner runs it); otherwise the journal opens its own and `run` drives it.
+    """
+
+    def __init__(
+        self,
+        db_file: str | None = None,
+        flush_interval: float = 0.5,
+        batch_size: int = 500,
+        db: Database | None = None,
+    ):
+        if db is None:
+            db = Database(
+                db_file,
+                JOURNAL_DDL,
+                flush_interval=flush_interval,
+                batch_size=batch_size,
+            )
+        else:
+            db.add_ddl(JOURNAL_DDL)
+        self.db = db
+        self.db_file = db.path
+
+    # ---------- hot path ----------
+    def decision(
+        self,
+        strategy: str,
+        ticker: str,
+        p_yes: int,
+        p_no: int,
+        position: int,
+        max_price: int,
+        min_spread: int,
+        qty: int,
+        price: int | None,
+    ) -> None:
+        action = "hold" if qty == 0 else ("buy_yes" if qty > 0 else "buy_no")
+        self.db.write(
+            INSERT_DECISION_SQL,
+            (
+                time.time(),
+                strategy,
+                ticker,
+                p_yes,
+                p_no,
+                position,
+                max_price,
+                min_spread,
+                action,
+                qty,
+                price,
+            ),
+        )
+
+    def order(
+        self, strategy: str, ticker: str, price: int, qty: int, order_id: str
+    ) -> None:
+        self.db.write(INSERT_ORDER_SQL, (strategy, ticker, price, qty, order_id))
+
+    def position(
+        self, strategy: str, ticker: str, price: int, qty: int, order_id: str
+    ) -> None:
+        self.db.write(INSERT_POSITION_SQL, (strategy, ticker, price, qty, order_id))
+
+    # ---------- writer ----------
+    async def run(self) -> None:
+        await self.db.run()
+
+    async def flush(self) -> None:
+        await self.db.flush()
+
+    def stats(self) -> Dict:
+        return self.db.stats()
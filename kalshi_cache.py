@@ -0,0 +1,214 @@
+import atexit
+import copy
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+# (path regex, ttl in seconds). First match wins; paths not listed are never cached.
+# Markets are left out: their bodies carry live prices.
+DEFAULT_TTLS = [
+    (r"^/trade-api/v2/exchange/status$", 10),
+    (r"^/trade-api/v2/exchange/schedule$", 3600),
+    (r"^/trade-api/v2/events$", 300),
+    (r"^/trade-api/v2/events/[^/]+$", 300),
+    (r"^/trade-api/v2/series$", 3600),
+    (r"^/trade-api/v2/series/[^/]+$", 3600),
+]
+
+# loader(etag) -> (status_code, body, etag); a 304 status means "reuse the cached body"
+Loader = Callable[[Optional[str]], Tuple[int, Any, Optional[str]]]
+
+
+class _Flight:
+    """One upstream request that concurrent callers for the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.body: Any = None
+        self.error: BaseException | None = None
+
+    def wait(self) -> Any:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.body
+
+
+class ResponseCache:
+    """TTL cache for rarely changing GET endpoints.
+
+    Expired entries that carry an ETag are revalidated with If-None-Match instead of
+    being refetched, and concurrent misses for the same key share one upstream request.
+    Callers get their own copy of a body. At most `max_entries` are kept, least recently
+    used first out. With a `path`, changes are written to it at most every
+    `save_interval` seconds from a background timer, and once more at exit.
+    """
+
+    def __init__(
+        self,
+        ttls=DEFAULT_TTLS,
+        path: Optional[str] = None,
+        max_entries: int = 1024,
+        save_interval: float = 5.0,
+    ):
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in ttls]
+        self.path = path
+        self.max_entries = max_entries
+        self.save_interval = save_interval
+        self._entries: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_timer: threading.Timer | None = None
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "revalidations": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "evictions": 0,
+            "saves": 0,
+        }
+        if path:
+            self._load()
+            atexit.register(self.flush)
+
+    def ttl_for(self, path: str) -> Optional[float]:
+        """Returns the TTL configured for `path`, or None if it should not be cached."""
+        for pattern, ttl in self.ttls:
+            if pattern.match(path):
+                return ttl or None
+        return None
+
+    @staticmethod
+    def key(path: str, params: Dict[str, Any]) -> str:
+        if not params:
+            return path
+        return path + "?" + json.dumps(params, sort_keys=True, default=str)
+
+    def fetch(self, key: str, ttl: float, loader: Loader) -> Any:
+        """Returns a copy of the cached body for `key`, calling `loader` at most once per miss."""
+        # bodies are replaced, never mutated, so copies are taken outside the lock
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires"] > time.time():
+                self.counters["hits"] += 1
+                self._entries.move_to_end(key)
+                hit = True
+            else:
+                hit = False
+                flight = self._inflight.get(key)
+                if flight is not None:
+                    self.counters["coalesced"] += 1
+                    leader = False
+                else:
+                    flight = self._inflight[key] = _Flight()
+                    leader = True
+
+        if hit:
+            return copy.deepcopy(entry["body"])
+        if not leader:
+            return copy.deepcopy(flight.wait())
+
+        try:
+            status, body, etag = loader(entry["etag"] if entry else None)
+            with self._lock:
+                if status == 304 and entry is not None:
+                    self.counters["revalidations"] += 1
+                    entry["expires"] = time.time() + ttl
+                    body = entry["body"]
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                else:
+                    self.counters["misses"] += 1
+                    self._entries[key] = {
+                        "body": body,
+                        "etag": etag,
+                        "expires": time.time() + ttl,
+                    }
+                    self._entries.move_to_end(key)
+                    self._evict()
+            flight.body = body
+        except BaseException as e:
+            with self._lock:
+                self.counters["errors"] += 1
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+        if self.path:
+            self._schedule_save()
+        return copy.deepcopy(body)
+
+    def invalidate(self, prefix: str = "") -> None:
+        """Drops every entry whose key starts with `prefix` (everything by default)."""
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries)}
+
+    def flush(self) -> None:
+        """Writes pending changes to `path` now instead of waiting for the timer."""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is None:
+            return
+        timer.cancel()
+        self._save()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _schedule_save(self) -> None:
+        """Starts the save timer unless one is pending; misses until it fires share one write."""
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_interval, self._timed_save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _timed_save(self) -> None:
+        with self._lock:
+            self._save_timer = None
+        self._save()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r") as f:
+                self._entries = OrderedDict(json.load(f))
+            with self._lock:
+                self._evict()
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable response cache {}: {}", self.path, e)
+
+    def _save(self) -> None:
+        with self._lock:
+            snapshot = json.dumps(self._entries)
+        tmp = f"{self.path}.tmp"
+        with self._save_lock:
+            try:
+                with open(tmp, "w") as f:
+                    f.write(snapshot)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                logger.warning("Failed to persist response cache {}: {}", self.path, e)
+                return
+        with self._lock:
+            self.counters["saves"] += 1
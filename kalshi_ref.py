@@ -1,7 +1,10 @@
 import requests
+import asyncio
 import base64
+import inspect
 import time
-from typing import Any, Dict, Optional
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional
 from datetime import datetime, timedelta
 from enum import Enum
 import json
@@ -16,6 +19,8 @@ from cryptography.exceptions import InvalidSignature
 
 import websockets
 
+from kalshi_cache import ResponseCache
+
 
 class Environment(Enum):
     DEMO = "demo"
@@ -41,8 +46,16 @@ class KalshiBaseClient:
         self.private_key = private_key
         self.last_api_call = datetime.now()
 
-        self.u = "https://api.elections.kalshi.com"
-        self.w = "wss://api.elections.kalshi.com"
+        # Override to point at a local exchange, e.g. kalshi_sim.py
+        self.u = os.getenv("KALSHI_API_URL", "https://api.elections.kalshi.com")
+        self.w = os.getenv("KALSHI_WS_URL", "wss://api.elections.kalshi.com")
+
+    @classmethod
+    def from_env(cls, *args, **kwargs):
+        """Builds a client from the PROD_KEYID and PROD_KEYFILE environment variables."""
+        with open(os.environ["PROD_KEYFILE"], "rb") as f:
+            private_key = serialization.load_pem_private_key(f.read(), password=None)
+        return cls(os.environ["PROD_KEYID"], private_key, *args, **kwargs)
 
     def request_headers(self, method: str, path: str) -> Dict[str, Any]:
         """Generates the required authentication headers for API requests."""
@@ -87,12 +100,17 @@ class KalshiHttpClient(KalshiBaseClient):
         self,
         key_id: str,
         private_key: rsa.RSAPrivateKey,
+        cache: Optional[ResponseCache] = None,
     ):
         super().__init__(key_id, private_key)
         self.host = self.u
         self.exchange_url = "/trade-api/v2/exchange"
         self.markets_url = "/trade-api/v2/markets"
+        self.events_url = "/trade-api/v2/events"
+        self.series_url = "/trade-api/v2/series"
         self.portfolio_url = "/trade-api/v2/portfolio"
+        self.cache = cache
+        self.timeout = 10  # seconds, per request
 
     def rate_limit(self) -> None:
         """Built-in rate limiter to prevent exceeding API rate limits."""
@@ -112,24 +130,48 @@ class KalshiHttpClient(KalshiBaseClient):
     def post(self, path: str, body: dict) -> Any:
         """Performs an authenticated POST request to the Kalshi API."""
         self.rate_limit()
-        response = requests.post(self.host + path, json=body, headers=self.request_headers("POST", path))
+        response = requests.post(
+            self.host + path, json=body, headers=self.request_headers("POST", path), timeout=self.timeout
+        )
         self.raise_if_bad_response(response)
         return response.json()
 
     def get(self, path: str, params: Dict[str, Any] = {}) -> Any:
         """Performs an authenticated GET request to the Kalshi API."""
+        if self.cache is not None:
+            ttl = self.cache.ttl_for(path)
+            if ttl is not None:
+                return self.cache.fetch(
+                    self.cache.key(path, params), ttl, lambda etag: self.conditional_get(path, params, etag)
+                )
         self.rate_limit()
-        response = requests.get(self.host + path, headers=self.request_headers("GET", path), params=params)
+        response = requests.get(
+            self.host + path, headers=self.request_headers("GET", path), params=params, timeout=self.timeout
+        )
         self.raise_if_bad_response(response)
         return response.json()
 
-    def delete(self, path: str, params: Dict[str, Any] = {}) -> Any:
+    def conditional_get(self, path: str, params: Dict[str, Any], etag: Optional[str]) -> tuple:
+        """Performs a GET with If-None-Match; returns (status_code, body, etag)."""
+        self.rate_limit()
+        headers = self.request_headers("GET", path)
+        if etag:
+            headers["If-None-Match"] = etag
+        response = requests.get(self.host + path, headers=headers, params=params, timeout=self.timeout)
+        if response.status_code == 304:
+            return 304, None, etag
+        self.raise_if_bad_response(response)
+        return response.status_code, response.json(), response.headers.get("ETag")
+
+    def delete(self, path: str, params: Dict[str, Any] = {}, body: Optional[dict] = None) -> Any:
         """Performs an authenticated DELETE request to the Kalshi API."""
         self.rate_limit()
         response = requests.delete(
             self.host + path,
             headers=self.request_headers("DELETE", path),
             params=params,
+            json=body,
+            timeout=self.timeout,
         )
         self.raise_if_bad_response(response)
         return response.json()
@@ -142,6 +184,23 @@ class KalshiHttpClient(KalshiBaseClient):
         """Retrieves the exchange status."""
         return self.get(self.exchange_url + "/status")
 
+    def get_market(self, ticker: str) -> Dict[str, Any]:
+        """Retrieves a single market."""
+        return self.get(f"{self.markets_url}/{ticker}")
+
+    def get_markets(self, **filters) -> Dict[str, Any]:
+        """Retrieves one page of markets matching the given filters."""
+        params = {k: v for k, v in filters.items() if v is not None}
+        return self.get(self.markets_url, params=params)
+
+    def get_event(self, event_ticker: str) -> Dict[str, Any]:
+        """Retrieves an event and its markets."""
+        return self.get(f"{self.events_url}/{event_ticker}")
+
+    def get_series(self, series_ticker: str) -> Dict[str, Any]:
+        """Retrieves a series description."""
+        return self.get(f"{self.series_url}/{series_ticker}")
+
     def get_trades(
         self,
         ticker: Optional[str] = None,
@@ -163,8 +222,45 @@ class KalshiHttpClient(KalshiBaseClient):
         return self.get(self.markets_url + "/trades", params=params)
 
 
+# Message types delivered on each websocket channel.
+CHANNEL_MESSAGE_TYPES = {
+    "orderbook_delta": ("orderbook_snapshot", "orderbook_delta"),
+    "fill": ("fill",),
+    "market_positions": ("market_position",),
+    "trade": ("trade",),
+    "ticker": ("ticker",),
+    "ticker_v2": ("ticker_v2",),
+    "market_lifecycle_v2": ("market_lifecycle_v2", "event_lifecycle"),
+}
+
+
+class Subscription:
+    """A channel subscription that survives reconnects; the server sid changes on each one."""
+
+    def __init__(self, channel: str, market_tickers: Optional[list] = None):
+        self.channel = channel
+        self.market_tickers = list(market_tickers or [])
+        self.handlers: list[Callable] = []
+        self.sid: Optional[int] = None
+        self.seq: Optional[int] = None
+        self.requested = False
+
+    def params(self) -> Dict[str, Any]:
+        params: Dict[str, Any] = {"channels": [self.channel]}
+        if self.market_tickers:
+            params["market_tickers"] = self.market_tickers
+        return params
+
+
 class KalshiWebSocketClient(KalshiBaseClient):
-    """Client for handling WebSocket connections to the Kalshi API."""
+    """Single multiplexed WebSocket connection to the Kalshi API.
+
+    Consumers call `subscribe` with an async (or plain) handler; messages are routed by sid
+    to the handlers of the subscription they belong to, and `on` registers handlers for a
+    message type regardless of subscription. `run` owns the connection: it reconnects with
+    backoff and re-subscribes everything, and a sequence gap triggers a resubscribe so the
+    channel restarts from a fresh snapshot.
+    """
 
     def __init__(
         self,
@@ -175,58 +271,216 @@ class KalshiWebSocketClient(KalshiBaseClient):
         self.ws = None
         self.url_suffix = "/trade-api/ws/v2"
         self.message_id = 1  # Add counter for message IDs
+        self.reconnect_delay = 1
+        self.max_reconnect_delay = 60
+        self.command_timeout = 10
+
+        self.subscriptions: list[Subscription] = []
+        self.by_sid: Dict[int, Subscription] = {}
+        self.handlers: Dict[str, list[Callable]] = defaultdict(list)
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.subscribing: Dict[int, Subscription] = {}
+        self.unsubscribe_waiters: Dict[int, asyncio.Future] = {}
+        self.connected = asyncio.Event()
+        self.connections = 0
+        self._tasks: set[asyncio.Task] = set()
+
+    # ---------- consumer API ----------
+    def on(self, msg_type: str, handler: Callable) -> None:
+        """Registers `handler(data)` for every message of `msg_type`."""
+        self.handlers[msg_type].append(handler)
+
+    async def subscribe(
+        self, channels: list[str], market_tickers: Optional[list] = None, handler: Optional[Callable] = None
+    ) -> list[Subscription]:
+        """Subscribes to each channel; sent now if connected, otherwise on connect."""
+        subs = []
+        for channel in channels:
+            sub = Subscription(channel, market_tickers)
+            if handler is not None:
+                sub.handlers.append(handler)
+            self.subscriptions.append(sub)
+            subs.append(sub)
+            if self.connected.is_set():
+                await self._send_subscribe(sub)
+        return subs
+
+    async def unsubscribe(self, sub: Subscription) -> None:
+        if sub in self.subscriptions:
+            self.subscriptions.remove(sub)
+        await self._send_unsubscribe(sub)
+
+    async def resubscribe(self, sub: Subscription) -> None:
+        """Unsubscribes and subscribes again, e.g. to receive a fresh orderbook snapshot."""
+        if not self.connected.is_set():
+            return
+        await self._send_unsubscribe(sub)
+        await self._send_subscribe(sub)
+
+    async def update_markets(self, sub: Subscription, add: list = (), remove: list = ()) -> None:
+        """Adds or removes market tickers on an existing subscription."""
+        for action, tickers in (("add_markets", list(add)), ("delete_markets", list(remove))):
+            if not tickers:
+                continue
+            if action == "add_markets":
+                sub.market_tickers.extend(t for t in tickers if t not in sub.market_tickers)
+            else:
+                sub.market_tickers = [t for t in sub.market_tickers if t not in tickers]
+            if sub.sid is not None:
+                await self.command(
+                    "update_subscription", {"sids": [sub.sid], "market_tickers": tickers, "action": action}
+                )
+
+    async def command(
+        self, cmd: str, params: Dict[str, Any], sid: Optional[int] = None, sub: Optional[Subscription] = None
+    ) -> Dict[str, Any]:
+        """Sends a command and waits for the response carrying its id (or `sid`, for unsubscribe).
 
-    async def connect(self, tickers):
-        """Establishes a WebSocket connection using authentication."""
-        host = self.w + self.url_suffix
-        auth_headers = self.request_headers("GET", self.url_suffix)
-        async with websockets.connect(host, additional_headers=auth_headers) as websocket:
-            self.ws = websocket
-            await self.on_open(tickers)
-            await self.handler()
-
-    async def on_open(self, tickers):
-        """Callback when WebSocket connection is opened."""
-        logger.info("WebSocket connection opened.")
-        await self.subscribe_to_tickers(tickers)
-
-    async def subscribe_to_tickers(self, tickers):
+        `sub` is bound to its new sid as soon as the ack is read, so that the snapshot
+        following it on the wire is routed correctly.
+        """
         if self.ws is None:
-            raise ValueError
-        """Subscribe to ticker updates for all markets."""
-        subscription_message = {
-            "id": self.message_id,
-            "cmd": "subscribe",
-            "params": {"channels": ["orderbook_delta"], "market_tickers": tickers},
-        }
-        await self.ws.send(json.dumps(subscription_message))
+            raise ConnectionError("WebSocket is not connected")
+        cmd_id = self.message_id
         self.message_id += 1
-
-    async def handler(self):
-        """Handle incoming messages."""
-        if self.ws is None:
-            raise ValueError("self.ws is None")
+        fut = asyncio.get_running_loop().create_future()
+        self.pending[cmd_id] = fut
+        if sub is not None:
+            self.subscribing[cmd_id] = sub
+        if sid is not None:
+            # some server versions answer unsubscribe without the command id
+            self.unsubscribe_waiters[sid] = fut
         try:
-            async for message in self.ws:
-                await self.on_message(message)
-        except websockets.ConnectionClosedOK as e:
-            await self.on_close(e.code, e.reason)
-        except Exception as e:
-            await self.on_error(e)
-
-    async def on_message(self, message):
-        """Callback for handling incoming messages."""
-        logger.info("Received message:", message)
-
-    async def on_error(self, error):
-        """Callback for handling errors."""
-        logger.info("WebSocket error:", error)
-
-    async def on_close(self, close_status_code, close_msg):
-        """Callback when WebSocket connection is closed."""
-        logger.info(
-            "WebSocket connection closed with code:",
-            close_status_code,
-            "and message:",
-            close_msg,
-        )
+            await self.ws.send(json.dumps({"id": cmd_id, "cmd": cmd, "params": params}))
+            response = await asyncio.wait_for(fut, self.command_timeout)
+        finally:
+            self.pending.pop(cmd_id, None)
+            self.subscribing.pop(cmd_id, None)
+            if sid is not None:
+                self.unsubscribe_waiters.pop(sid, None)
+        if response.get("type") == "error":
+            raise ValueError(f"{cmd} failed: {response.get('msg')}")
+        return response
+
+    # ---------- connection ----------
+    async def run(self) -> None:
+        """Keeps the connection open, reconnecting with exponential backoff."""
+        host = self.w + self.url_suffix
+        delay = self.reconnect_delay
+        while True:
+            try:
+                # fresh signature/timestamp for every attempt
+                auth_headers = self.request_headers("GET", self.url_suffix)
+                async with websockets.connect(host, additional_headers=auth_headers) as websocket:
+                    self.ws = websocket
+                    self.connections += 1
+                    self.connected.set()
+                    delay = self.reconnect_delay
+                    logger.info("WebSocket connected to {}", host)
+                    self._spawn(self._restore_subscriptions())
+                    async for message in websocket:
+                        await self.on_message(message)
+                logger.warning("WebSocket closed by server; reconnecting in {}s", delay)
+            except (websockets.ConnectionClosed, OSError, asyncio.TimeoutError) as e:
+                logger.warning("WebSocket closed ({}); reconnecting in {}s", e, delay)
+            finally:
+                self._on_disconnect()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def on_message(self, message) -> None:
+        """Resolves command responses and routes data messages to handlers."""
+        try:
+            data = json.loads(message)
+        except json.JSONDecodeError:
+            logger.warning("Failed to decode WebSocket message: {}", message)
+            return
+
+        typ = data.get("type")
+        if typ in ("subscribed", "unsubscribed", "ok", "error"):
+            sub = self.subscribing.pop(data.get("id"), None)
+            if sub is not None and typ == "subscribed":
+                sub.sid = data["msg"]["sid"]
+                sub.seq = None
+                self.by_sid[sub.sid] = sub
+            fut = self.pending.get(data.get("id"))
+            if fut is None and typ == "unsubscribed":
+                fut = self.unsubscribe_waiters.pop(data.get("sid"), None)
+            if fut is not None and not fut.done():
+                fut.set_result(data)
+            elif typ == "error":
+                logger.error("WebSocket error: {}", data)
+            return
+
+        sub = self.by_sid.get(data.get("sid"))
+        if sub is not None:
+            seq = data.get("seq")
+            if seq is not None:
+                if sub.seq is not None and seq != sub.seq + 1:
+                    logger.warning("Sequence gap on {} sid {}: {} -> {}", sub.channel, sub.sid, sub.seq, seq)
+                    self._spawn(self.resubscribe(sub))
+                sub.seq = seq
+            for handler in sub.handlers:
+                await self._call(handler, data)
+        for handler in self.handlers.get(typ, ()):
+            await self._call(handler, data)
+
+    # ---------- internals ----------
+    async def _send_subscribe(self, sub: Subscription) -> None:
+        if sub.requested:
+            return
+        sub.requested = True
+        try:
+            await self.command("subscribe", sub.params(), sub=sub)
+        except Exception:
+            sub.requested = False
+            raise
+
+    async def _send_unsubscribe(self, sub: Subscription) -> None:
+        sid = sub.sid
+        sub.sid, sub.seq, sub.requested = None, None, False
+        if sid is None or self.ws is None:
+            return
+        self.by_sid.pop(sid, None)
+        await self.command("unsubscribe", {"sids": [sid]}, sid=sid)
+
+    async def _restore_subscriptions(self) -> None:
+        for sub in list(self.subscriptions):
+            try:
+                await self._send_subscribe(sub)
+            except (ConnectionError, websockets.ConnectionClosed):
+                return
+            except Exception as e:
+                logger.error("Failed to subscribe to {}: {}", sub.channel, e)
+
+    def _on_disconnect(self) -> None:
+        self.ws = None
+        self.connected.clear()
+        self.by_sid.clear()
+        for sub in self.subscriptions:
+            sub.sid, sub.seq, sub.requested = None, None, False
+        for fut in self.pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError("WebSocket disconnected"))
+        self.pending.clear()
+        self.subscribing.clear()
+        self.unsubscribe_waiters.clear()
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("WebSocket background task failed: {}", task.exception())
+
+    @staticmethod
+    async def _call(handler: Callable, data: Dict[str, Any]) -> None:
+        try:
+            result = handler(data)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.exception("WebSocket handler {} failed", getattr(handler, "__qualname__", handler))
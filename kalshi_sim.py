@@ -0,0 +1,838 @@
+#!.venv/bin/python
+"""
+Local stand-in for the Kalshi exchange, for offline load and latency testing.
+
+Serves the REST endpoints our clients use (balance, positions, orders, markets, trades,
+exchange status) and the /trade-api/ws/v2 websocket (orderbook_snapshot/orderbook_delta,
+trade, ticker, fill, market_position and market_lifecycle_v2 messages). Orderbooks
+random-walk at --rate deltas per second and every response/message can be delayed by
+--latency-ms (+/- --jitter-ms).
+
+Point our services at it with:
+    KALSHI_API_URL=http://localhost:8765 KALSHI_WS_URL=ws://localhost:8765
+
+GET /sim/stats reports throughput and tick-to-trade latency, measured from the last
+orderbook message published for a ticker to the arrival of an order on that ticker.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import random
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict
+
+from aiohttp import WSMsgType, web
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+
+WS_PATH = "/trade-api/ws/v2"
+API = "/trade-api/v2"
+
+DEFAULT_SERIES = [
+    "KXHIGHNY",
+    "KXHIGHCHI",
+    "KXHIGHAUS",
+    "KXHIGHMIA",
+    "KXHIGHDEN",
+    "KXHIGHPHIL",
+    "KXHIGHLAX",
+]
+
+
+def percentile(values, q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Exchange:
+    """In-memory market, order and portfolio state plus the websocket fan-out."""
+
+    def __init__(
+        self,
+        tickers: list[str],
+        balance: int,
+        latency_ms: float,
+        jitter_ms: float,
+        public_key=None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.public_key = public_key
+        self.balance = balance
+        self.books: Dict[str, Dict[str, Dict[int, int]]] = {}
+        self.markets: Dict[str, Dict[str, Any]] = {}
+        for ticker in tickers:
+            self._init_market(ticker)
+        self.positions: Dict[str, Dict[str, int]] = {}
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.client_order_ids: set[str] = set()
+        self.trades: deque = deque(maxlen=100_000)
+
+        self.sessions: set["WsSession"] = set()
+        self.last_publish_ns: Dict[str, int] = {}
+        self.tick_to_trade_us: deque = deque(maxlen=100_000)
+        self.messages_sent = 0
+        self.orders_received = 0
+        self.started = time.time()
+
+    def _init_market(self, ticker: str) -> None:
+        mid = random.randint(10, 90)
+        self.books[ticker] = {
+            "yes": {
+                mid - 1 - k: random.randint(1, 500) for k in range(5) if mid - 1 - k > 0
+            },
+            "no": {
+                100 - mid - 1 - k: random.randint(1, 500)
+                for k in range(5)
+                if 100 - mid - 1 - k > 0
+            },
+        }
+        event_ticker = ticker.rsplit("-", 1)[0]
+        self.markets[ticker] = {
+            "ticker": ticker,
+            "event_ticker": event_ticker,
+            "series_ticker": event_ticker.split("-")[0],
+            "status": "active",
+            "last_price": mid,
+            "volume": 0,
+            "open_interest": 0,
+            "result": "",
+        }
+
+    # ---------- helpers ----------
+    async def delay(self) -> None:
+        if self.latency_ms or self.jitter_ms:
+            await asyncio.sleep(
+                max(
+                    0.0,
+                    self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms),
+                )
+                / 1000
+            )
+
+    def verify(self, headers, method: str, path: str) -> bool:
+        """Requires the PSS auth headers; verifies the signature if a public key was given."""
+        key = headers.get("KALSHI-ACCESS-KEY")
+        sig = headers.get("KALSHI-ACCESS-SIGNATURE")
+        ts = headers.get("KALSHI-ACCESS-TIMESTAMP")
+        if not (key and sig and ts):
+            return False
+        if self.public_key is None:
+            return True
+        try:
+            self.public_key.verify(
+                base64.b64decode(sig),
+                (ts + method + path).encode(),
+                padding.PSS(
+                    mgf=padding.MGF1(hashes.SHA256()),
+                    salt_length=padding.PSS.DIGEST_LENGTH,
+                ),
+                hashes.SHA256(),
+            )
+            return True
+        except (InvalidSignature, ValueError):
+            return False
+
+    def top(self, ticker: str) -> Dict[str, int | None]:
+        book = self.books[ticker]
+        yes_bid = max(book["yes"], default=None)
+        no_bid = max(book["no"], default=None)
+        return {
+            "yes_bid": yes_bid,
+            "no_bid": no_bid,
+            "yes_ask": 100 - no_bid if no_bid is not None else None,
+            "no_ask": 100 - yes_bid if yes_bid is not None else None,
+        }
+
+    def market_view(self, ticker: str) -> Dict[str, Any]:
+        return {
+            **self.markets[ticker],
+            **{k: v or 0 for k, v in self.top(ticker).items()},
+        }
+
+    def publish(
+        self, channel: str, typ: str, msg: Dict[str, Any], ticker: str | None = None
+    ) -> None:
+        for session in self.sessions:
+            session.publish(channel, typ, msg, ticker)
+
+    # ---------- market data ----------
+    def random_delta(self) -> None:
+        ticker = random.choice(list(self.books))
+        if self.markets[ticker]["status"] != "active":
+            return
+        side = random.choice(("yes", "no"))
+        levels = self.books[ticker][side]
+        other = self.books[ticker]["no" if side == "yes" else "yes"]
+        ceiling = 99 - max(other, default=0)
+        if ceiling < 1:
+            return
+        top = max(levels, default=ceiling - 2)
+        price = min(max(top + random.randint(-3, 1), 1), ceiling)
+        if price in levels and random.random() < 0.5:
+            delta = -random.randint(1, levels[price])
+        else:
+            delta = random.randint(1, 500)
+        self.apply_delta(ticker, side, price, delta)
+
+    def apply_delta(self, ticker: str, side: str, price: int, delta: int) -> None:
+        levels = self.books[ticker][side]
+        new = levels.get(price, 0) + delta
+        if new > 0:
+            levels[price] = new
+        else:
+            levels.pop(price, None)
+        self.last_publish_ns[ticker] = time.perf_counter_ns()
+        self.publish(
+            "orderbook_delta",
+            "orderbook_delta",
+            {
+                "market_ticker": ticker,
+                "price": price,
+                "delta": delta,
+                "side": side,
+                "ts": int(time.time()),
+            },
+            ticker,
+        )
+
+    def snapshot(self, ticker: str) -> Dict[str, Any]:
+        book = self.books[ticker]
+        return {
+            "market_ticker": ticker,
+            "yes": sorted([p, v] for p, v in book["yes"].items()),
+            "no": sorted([p, v] for p, v in book["no"].items()),
+        }
+
+    async def generate(self, rate: float) -> None:
+        """Emits orderbook deltas at `rate` per second, catching up in bursts if the loop lags."""
+        if rate <= 0:
+            return
+        start = time.perf_counter()
+        sent = 0
+        while True:
+            due = int((time.perf_counter() - start) * rate)
+            for _ in range(due - sent):
+                self.random_delta()
+            sent = due
+            await asyncio.sleep(max(1 / rate, 0.001))
+
+    # ---------- trading ----------
+    def create_order(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        ticker = body["ticker"]
+        now_ns = time.perf_counter_ns()
+        self.orders_received += 1
+        if ticker in self.last_publish_ns:
+            self.tick_to_trade_us.append(
+                (now_ns - self.last_publish_ns[ticker]) / 1_000
+            )
+
+        side, action, count = body["side"], body["action"], int(body["count"])
+        # Buying yes takes no bids and vice versa; selling yes at p is buying no at 100 - p.
+        taker_side = side if action == "buy" else ("no" if side == "yes" else "yes")
+        price = body.get(f"{side}_price")
+        if body.get("type", "limit") == "market" or price is None:
+            limit = 99
+        else:
+            limit = price if action == "buy" else 100 - price
+
+        order = {
+            "order_id": str(uuid.uuid4()),
+            "client_order_id": body.get("client_order_id", ""),
+            "ticker": ticker,
+            "side": side,
+            "action": action,
+            "type": body.get("type", "limit"),
+            "yes_price": limit if taker_side == "yes" else 100 - limit,
+            "no_price": limit if taker_side == "no" else 100 - limit,
+            "initial_count": count,
+            "remaining_count": count,
+            "status": "resting",
+            "created_time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        resting = self.books[ticker]["no" if taker_side == "yes" else "yes"]
+        while order["remaining_count"] and resting:
+            best = max(resting)
+            price = 100 - best
+            if price > limit:
+                break
+            qty = min(order["remaining_count"], resting[best])
+            self.fill(order, taker_side, price, qty)
+            self.apply_delta(ticker, "no" if taker_side == "yes" else "yes", best, -qty)
+
+        if order["remaining_count"] == 0:
+            order["status"] = "executed"
+        elif order["type"] == "market":
+            order["status"] = "canceled"
+        else:
+            self.apply_delta(ticker, taker_side, limit, order["remaining_count"])
+        self.orders[order["order_id"]] = order
+        return order
+
+    def fill(
+        self, order: Dict[str, Any], taker_side: str, price: int, qty: int
+    ) -> None:
+        ticker = order["ticker"]
+        order["remaining_count"] -= qty
+        yes_price = price if taker_side == "yes" else 100 - price
+        signed = qty if taker_side == "yes" else -qty
+        pos = self.positions.setdefault(
+            ticker,
+            {
+                "position": 0,
+                "market_exposure": 0,
+                "realized_pnl": 0,
+                "fees_paid": 0,
+                "total_traded": 0,
+            },
+        )
+        pos["position"] += signed
+        pos["market_exposure"] += price * qty
+        pos["total_traded"] += price * qty
+        self.balance -= price * qty
+        market = self.markets[ticker]
+        market["last_price"] = yes_price
+        market["volume"] += qty
+
+        ts = int(time.time())
+        trade = {
+            "trade_id": str(uuid.uuid4()),
+            "ticker": ticker,
+            "yes_price": yes_price,
+            "no_price": 100 - yes_price,
+            "count": qty,
+            "taker_side": taker_side,
+            "created_time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts)),
+            "ts": ts,
+        }
+        self.trades.append(trade)
+        self.publish("trade", "trade", {**trade, "market_ticker": ticker}, ticker)
+        self.publish(
+            "ticker",
+            "ticker",
+            {
+                "market_ticker": ticker,
+                "price": yes_price,
+                "volume": market["volume"],
+                "ts": ts,
+                **self.top(ticker),
+            },
+            ticker,
+        )
+        self.publish(
+            "fill",
+            "fill",
+            {
+                "trade_id": trade["trade_id"],
+                "order_id": order["order_id"],
+                "client_order_id": order["client_order_id"],
+                "market_ticker": ticker,
+                "is_taker": True,
+                "side": order["side"],
+                "action": order["action"],
+                "yes_price": yes_price,
+                "no_price": 100 - yes_price,
+                "count": qty,
+                "post_position": pos["position"],
+                "ts": ts,
+            },
+        )
+        self.publish(
+            "market_positions",
+            "market_position",
+            {
+                "market_ticker": ticker,
+                "position": pos["position"],
+                "position_cost": pos["market_exposure"] * 100,
+                "realized_pnl": pos["realized_pnl"] * 100,
+                "fees_paid": pos["fees_paid"] * 100,
+                "volume": pos["total_traded"],
+            },
+        )
+
+    def cancel_order(self, order_id: str) -> Dict[str, Any] | None:
+        order = self.orders.get(order_id)
+        if order is None:
+            return None
+        reduced = 0
+        if order["status"] == "resting":
+            reduced = order["remaining_count"]
+            taker_side = (
+                order["side"]
+                if order["action"] == "buy"
+                else ("no" if order["side"] == "yes" else "yes")
+            )
+            price = order[f"{taker_side}_price"]
+            self.apply_delta(order["ticker"], taker_side, price, -reduced)
+            order["remaining_count"] = 0
+            order["status"] = "canceled"
+        return {"order": order, "reduced_by": reduced}
+
+    def decrease_order(self, order_id: str, reduce_by: int) -> Dict[str, Any] | None:
+        order = self.orders.get(order_id)
+        if order is None or order["status"] != "resting":
+            return None
+        reduce_by = min(reduce_by, order["remaining_count"])
+        taker_side = (
+            order["side"]
+            if order["action"] == "buy"
+            else ("no" if order["side"] == "yes" else "yes")
+        )
+        self.apply_delta(
+            order["ticker"], taker_side, order[f"{taker_side}_price"], -reduce_by
+        )
+        order["remaining_count"] -= reduce_by
+        if order["remaining_count"] == 0:
+            order["status"] = "canceled"
+        return order
+
+    def amend_order(
+        self, order_id: str, body: Dict[str, Any]
+    ) -> tuple[Dict[str, Any], Dict[str, Any]] | None:
+        """Re-prices a resting order in place; `count` is the new resting size. Keeps the order_id."""
+        order = self.orders.get(order_id)
+        if order is None or order["status"] != "resting":
+            return None
+        old = dict(order)
+        self.cancel_order(order_id)
+        side = order["side"]
+        new = self.create_order(
+            {
+                "ticker": order["ticker"],
+                "side": side,
+                "action": order["action"],
+                "type": "limit",
+                "count": body.get("count", old["remaining_count"]),
+                f"{side}_price": body.get(f"{side}_price", old[f"{side}_price"]),
+                "client_order_id": body.get(
+                    "updated_client_order_id", old["client_order_id"]
+                ),
+            }
+        )
+        del self.orders[new["order_id"]]
+        new["order_id"] = order_id
+        self.orders[order_id] = new
+        return old, new
+
+    def settle(self, ticker: str, result: str) -> None:
+        self.markets[ticker]["status"] = "finalized"
+        self.markets[ticker]["result"] = result
+        self.publish(
+            "market_lifecycle_v2",
+            "market_lifecycle_v2",
+            {
+                "market_ticker": ticker,
+                "event_type": "determined",
+                "result": result,
+                "determination_ts": int(time.time()),
+            },
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = max(time.time() - self.started, 1e-9)
+        t2t = list(self.tick_to_trade_us)
+        return {
+            "uptime_s": round(elapsed, 3),
+            "ws_sessions": len(self.sessions),
+            "messages_sent": self.messages_sent,
+            "messages_per_s": round(self.messages_sent / elapsed, 1),
+            "orders_received": self.orders_received,
+            "tick_to_trade_us": {
+                "count": len(t2t),
+                "p50": percentile(t2t, 0.5),
+                "p90": percentile(t2t, 0.9),
+                "p99": percentile(t2t, 0.99),
+                "max": max(t2t, default=None),
+            },
+        }
+
+
+class WsSession:
+    """One websocket client: its subscriptions and a latency-delayed outbound queue."""
+
+    def __init__(self, exchange: Exchange, ws: web.WebSocketResponse):
+        self.exchange = exchange
+        self.ws = ws
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.subs: Dict[
+            int, Dict[str, Any]
+        ] = {}  # sid -> {"channel", "tickers", "seq"}
+        self.next_sid = 1
+
+    def publish(
+        self, channel: str, typ: str, msg: Dict[str, Any], ticker: str | None
+    ) -> None:
+        for sid, sub in self.subs.items():
+            if sub["channel"] != channel:
+                continue
+            if ticker is not None and sub["tickers"] and ticker not in sub["tickers"]:
+                continue
+            sub["seq"] += 1
+            self.send({"type": typ, "sid": sid, "seq": sub["seq"], "msg": msg})
+
+    def send(self, data: Dict[str, Any]) -> None:
+        ex = self.exchange
+        delay = (
+            max(0.0, ex.latency_ms + random.uniform(-ex.jitter_ms, ex.jitter_ms)) / 1000
+        )
+        self.outbox.put_nowait((time.perf_counter() + delay, json.dumps(data)))
+
+    async def sender(self) -> None:
+        while True:
+            due, raw = await self.outbox.get()
+            wait = due - time.perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await self.ws.send_str(raw)
+            self.exchange.messages_sent += 1
+
+    def handle(self, data: Dict[str, Any]) -> None:
+        cmd_id = data.get("id")
+        params = data.get("params", {})
+        cmd = data.get("cmd")
+        if cmd == "subscribe":
+            tickers = params.get("market_tickers") or (
+                [params["market_ticker"]] if "market_ticker" in params else []
+            )
+            for channel in params.get("channels", []):
+                sid = self.next_sid
+                self.next_sid += 1
+                self.subs[sid] = {"channel": channel, "tickers": set(tickers), "seq": 0}
+                self.send(
+                    {
+                        "id": cmd_id,
+                        "type": "subscribed",
+                        "msg": {"channel": channel, "sid": sid},
+                    }
+                )
+                if channel == "orderbook_delta":
+                    for ticker in tickers or self.exchange.books:
+                        if ticker in self.exchange.books:
+                            self.subs[sid]["seq"] += 1
+                            snap = self.exchange.snapshot(ticker)
+                            self.send(
+                                {
+                                    "type": "orderbook_snapshot",
+                                    "sid": sid,
+                                    "seq": self.subs[sid]["seq"],
+                                    "msg": snap,
+                                }
+                            )
+                            self.exchange.last_publish_ns[
+                                ticker
+                            ] = time.perf_counter_ns()
+                elif channel == "market_lifecycle_v2":
+                    for ticker, market in self.exchange.markets.items():
+                        if market["status"] == "active":
+                            msg = {"market_ticker": ticker, "event_type": "activated"}
+                            self.send(
+                                {"type": "market_lifecycle_v2", "sid": sid, "msg": msg}
+                            )
+        elif cmd == "unsubscribe":
+            for sid in params.get("sids", []):
+                self.subs.pop(sid, None)
+                self.send({"id": cmd_id, "type": "unsubscribed", "sid": sid})
+        elif cmd == "update_subscription":
+            sid = (params.get("sids") or [None])[0]
+            sub = self.subs.get(sid)
+            if sub is None:
+                self.send(
+                    {
+                        "id": cmd_id,
+                        "type": "error",
+                        "msg": {"code": 6, "msg": "Unknown sid"},
+                    }
+                )
+                return
+            tickers = set(params.get("market_tickers", []))
+            if params.get("action") == "delete_markets":
+                sub["tickers"] -= tickers
+            else:
+                sub["tickers"] |= tickers
+            self.send(
+                {
+                    "id": cmd_id,
+                    "type": "ok",
+                    "sid": sid,
+                    "msg": {"market_tickers": sorted(sub["tickers"])},
+                }
+            )
+        else:
+            self.send(
+                {
+                    "id": cmd_id,
+                    "type": "error",
+                    "msg": {"code": 5, "msg": f"Unknown command {cmd}"},
+                }
+            )
+
+
+def build_app(exchange: Exchange, rate: float) -> web.Application:
+    routes = web.RouteTableDef()
+
+    @web.middleware
+    async def latency_and_auth(request: web.Request, handler):
+        if request.path.startswith(API + "/portfolio") and not exchange.verify(
+            request.headers, request.method, request.path
+        ):
+            return web.json_response({"error": {"code": "unauthorized"}}, status=401)
+        await exchange.delay()
+        return await handler(request)
+
+    def page(items: list, request: web.Request) -> tuple[list, str]:
+        limit = int(request.query.get("limit", 100))
+        start = int(request.query.get("cursor") or 0)
+        nxt = start + limit
+        return items[start:nxt], (str(nxt) if nxt < len(items) else "")
+
+    @routes.get(API + "/exchange/status")
+    async def exchange_status(request):
+        return web.json_response({"exchange_active": True, "trading_active": True})
+
+    @routes.get(API + "/portfolio/balance")
+    async def balance(request):
+        return web.json_response({"balance": exchange.balance})
+
+    @routes.get(API + "/portfolio/positions")
+    async def positions(request):
+        ticker = request.query.get("ticker")
+        rows = [
+            {"ticker": t, **p}
+            for t, p in exchange.positions.items()
+            if (ticker is None or t == ticker)
+            and (request.query.get("count_filter") != "position" or p["position"])
+        ]
+        rows, cursor = page(rows, request)
+        return web.json_response(
+            {"market_positions": rows, "event_positions": [], "cursor": cursor}
+        )
+
+    @routes.get(API + "/portfolio/orders")
+    async def list_orders(request):
+        status, ticker = request.query.get("status"), request.query.get("ticker")
+        rows = [
+            o
+            for o in exchange.orders.values()
+            if (status is None or o["status"] == status)
+            and (ticker is None or o["ticker"] == ticker)
+        ]
+        rows, cursor = page(rows, request)
+        return web.json_response({"orders": rows, "cursor": cursor})
+
+    @routes.post(API + "/portfolio/orders")
+    async def create_order(request):
+        body = await request.json()
+        if body.get("ticker") not in exchange.books:
+            return web.json_response(
+                {"error": {"code": "market_not_found"}}, status=404
+            )
+        if body.get("client_order_id") in exchange.client_order_ids:
+            return web.json_response(
+                {"error": {"code": "order_already_exists"}}, status=409
+            )
+        exchange.client_order_ids.add(body.get("client_order_id"))
+        return web.json_response({"order": exchange.create_order(body)}, status=201)
+
+    @routes.post(API + "/portfolio/orders/batched")
+    async def batch_create_orders(request):
+        results = []
+        for body in (await request.json()).get("orders", []):
+            if body.get("ticker") not in exchange.books:
+                results.append({"order": None, "error": {"code": "market_not_found"}})
+            elif body.get("client_order_id") in exchange.client_order_ids:
+                results.append(
+                    {"order": None, "error": {"code": "order_already_exists"}}
+                )
+            else:
+                exchange.client_order_ids.add(body.get("client_order_id"))
+                results.append({"order": exchange.create_order(body), "error": None})
+        return web.json_response({"orders": results}, status=201)
+
+    @routes.delete(API + "/portfolio/orders/batched")
+    async def batch_cancel_orders(request):
+        results = []
+        for order_id in (await request.json()).get("ids", []):
+            result = exchange.cancel_order(order_id)
+            results.append(
+                {**result, "error": None}
+                if result
+                else {"order": None, "error": {"code": "not_found"}}
+            )
+        return web.json_response({"orders": results})
+
+    @routes.post(API + "/portfolio/orders/{order_id}/amend")
+    async def amend_order(request):
+        result = exchange.amend_order(
+            request.match_info["order_id"], await request.json()
+        )
+        if result is None:
+            return web.json_response({"error": {"code": "not_found"}}, status=404)
+        return web.json_response({"old_order": result[0], "order": result[1]})
+
+    @routes.post(API + "/portfolio/orders/{order_id}/decrease")
+    async def decrease_order(request):
+        order = exchange.decrease_order(
+            request.match_info["order_id"], int((await request.json())["reduce_by"])
+        )
+        if order is None:
+            return web.json_response({"error": {"code": "not_found"}}, status=404)
+        return web.json_response({"order": order})
+
+    @routes.delete(API + "/portfolio/orders/{order_id}")
+    async def cancel_order(request):
+        result = exchange.cancel_order(request.match_info["order_id"])
+        if result is None:
+            return web.json_response({"error": {"code": "not_found"}}, status=404)
+        return web.json_response(result)
+
+    @routes.get(API + "/markets")
+    async def markets(request):
+        series, status = request.query.get("series_ticker"), request.query.get("status")
+        tickers = set(filter(None, request.query.get("tickers", "").split(",")))
+        status = {"open": "active"}.get(status, status)
+        rows = [
+            exchange.market_view(t)
+            for t, m in exchange.markets.items()
+            if (series is None or m["series_ticker"] == series)
+            and (status is None or m["status"] == status)
+            and (not tickers or t in tickers)
+        ]
+        rows, cursor = page(rows, request)
+        return web.json_response({"markets": rows, "cursor": cursor})
+
+    @routes.get(API + "/markets/trades")
+    async def trades(request):
+        ticker = request.query.get("ticker")
+        min_ts, max_ts = int(request.query.get("min_ts", 0)), int(
+            request.query.get("max_ts", 2**62)
+        )
+        rows = [
+            t
+            for t in reversed(exchange.trades)
+            if (ticker is None or t["ticker"] == ticker) and min_ts <= t["ts"] <= max_ts
+        ]
+        rows, cursor = page(rows, request)
+        return web.json_response({"trades": rows, "cursor": cursor})
+
+    @routes.get(API + "/markets/{ticker}")
+    async def market(request):
+        ticker = request.match_info["ticker"]
+        if ticker not in exchange.markets:
+            return web.json_response({"error": {"code": "not_found"}}, status=404)
+        return web.json_response({"market": exchange.market_view(ticker)})
+
+    @routes.get(API + "/markets/{ticker}/orderbook")
+    async def orderbook(request):
+        snap = exchange.snapshot(request.match_info["ticker"])
+        return web.json_response({"orderbook": {"yes": snap["yes"], "no": snap["no"]}})
+
+    @routes.post("/sim/markets/{ticker}/settle")
+    async def settle(request):
+        exchange.settle(
+            request.match_info["ticker"], request.query.get("result", "yes")
+        )
+        return web.json_response({"ok": True})
+
+    @routes.get("/sim/stats")
+    async def stats(request):
+        return web.json_response(exchange.stats())
+
+    @routes.get(WS_PATH)
+    async def websocket(request):
+        if not exchange.verify(request.headers, "GET", WS_PATH):
+            return web.json_response({"error": {"code": "unauthorized"}}, status=401)
+        ws = web.WebSocketResponse(heartbeat=10)
+        await ws.prepare(request)
+        session = WsSession(exchange, ws)
+        exchange.sessions.add(session)
+        sender = asyncio.create_task(session.sender())
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT:
+                    try:
+                        session.handle(json.loads(msg.data))
+                    except (ValueError, KeyError, TypeError):
+                        session.send(
+                            {
+                                "type": "error",
+                                "msg": {"code": 1, "msg": "Unable to process message"},
+                            }
+                        )
+        finally:
+            exchange.sessions.discard(session)
+            sender.cancel()
+        return ws
+
+    async def start_generator(app):
+        app["generator"] = asyncio.create_task(exchange.generate(rate))
+
+    async def stop_generator(app):
+        app["generator"].cancel()
+
+    app = web.Application(middlewares=[latency_and_auth])
+    app.add_routes(routes)
+    app.on_startup.append(start_generator)
+    app.on_cleanup.append(stop_generator)
+    return app
+
+
+def default_tickers(series: list[str], strikes: int) -> list[str]:
+    date = time.strftime("%y%b%d", time.localtime()).upper()
+    return [f"{s}-{date}-B{60 + 2 * i + 0.5}" for s in series for i in range(strikes)]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=100.0,
+        help="orderbook deltas per second, all markets",
+    )
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=0.0,
+        help="added to every response and message",
+    )
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--series", nargs="*", default=DEFAULT_SERIES)
+    parser.add_argument("--strikes", type=int, default=6, help="markets per series")
+    parser.add_argument(
+        "--tickers", nargs="*", help="explicit market tickers (overrides --series)"
+    )
+    parser.add_argument(
+        "--balance", type=int, default=100_000, help="starting balance in cents"
+    )
+    parser.add_argument(
+        "--public-key", help="PEM public key used to verify PSS signatures"
+    )
+    args = parser.parse_args()
+
+    public_key = None
+    if args.public_key:
+        with open(args.public_key, "rb") as f:
+            public_key = serialization.load_pem_public_key(f.read())
+
+    tickers = args.tickers or default_tickers(args.series, args.strikes)
+    exchange = Exchange(
+        tickers, args.balance, args.latency_ms, args.jitter_ms, public_key
+    )
+    logging.info("Simulating %d markets at %.0f deltas/s", len(tickers), args.rate)
+    web.run_app(build_app(exchange, args.rate), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
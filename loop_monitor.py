@@ -0,0 +1,213 @@
+"""
+Event-loop stall detector.
+
+LoopMonitor measures scheduling delay continuously (a task that sleeps `interval` and
+records how late it wakes). A watchdog thread samples the loop thread's stack whenever
+the loop has not ticked for `threshold` seconds, and offenders are aggregated by call
+site: the innermost frame that belongs to this repo. Optionally every asyncio callback
+is timed as well, which attributes stalls to the task that caused them.
+
+Enable from any entry point with
+
+    LOOP_MONITOR_MS=50 python stream_orderbook2.py
+
+(keep the task `start_from_env` returns and pass it to `stop` on shutdown, which logs
+a final report) or start `LoopMonitor(...).run()` as a task yourself.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, defaultdict, deque
+
+logger = logging.getLogger("loop_monitor")
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _call_site(frame) -> str:
+    """Innermost frame inside the repo (not this module), else the innermost frame."""
+    innermost = frame
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if path.startswith(REPO_DIR) and path != __file__:
+            return f"{os.path.relpath(path, REPO_DIR)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return f"{innermost.f_code.co_filename}:{innermost.f_lineno} {innermost.f_code.co_name}"
+
+
+def _describe(handle: asyncio.Handle) -> str:
+    callback = handle._callback
+    task = getattr(callback, "__self__", None)
+    if isinstance(task, asyncio.Task):
+        coro = task.get_coro()
+        return f"task {task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+    return getattr(callback, "__qualname__", repr(callback))
+
+
+class LoopMonitor:
+    def __init__(
+        self,
+        threshold: float = 0.05,
+        interval: float = 0.01,
+        report_every: float = 60.0,
+    ):
+        self.threshold = threshold
+        self.interval = interval
+        self.report_every = report_every
+
+        self.lags: deque = deque(maxlen=10_000)  # seconds
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.offenders: Counter = Counter()  # call site -> samples taken while blocked
+        self.examples: dict[str, str] = {}  # call site -> one full stack
+        self.slow_callbacks: defaultdict = defaultdict(
+            lambda: [0, 0.0]
+        )  # callback -> [count, seconds]
+
+        self._heartbeat = time.perf_counter()
+        self._loop_thread: int | None = None
+        self._stop = threading.Event()
+        self._orig_handle_run = None
+
+    # ---------- lag measurement ----------
+    async def run(self, instrument_callbacks: bool = True) -> None:
+        self._loop_thread = threading.get_ident()
+        watchdog = threading.Thread(
+            target=self._watchdog, name="loop-watchdog", daemon=True
+        )
+        watchdog.start()
+        if instrument_callbacks:
+            self.instrument_callbacks()
+        last_report = time.perf_counter()
+        try:
+            while True:
+                start = time.perf_counter()
+                await asyncio.sleep(self.interval)
+                now = time.perf_counter()
+                self._heartbeat = now
+                lag = now - start - self.interval
+                self.lags.append(lag)
+                self.max_lag = max(self.max_lag, lag)
+                if now - last_report >= self.report_every:
+                    self.log_report()
+                    last_report = now
+        finally:
+            self._stop.set()
+            self.uninstrument_callbacks()
+            if self.lags:
+                self.log_report()
+
+    def _watchdog(self) -> None:
+        blocked = False
+        period = self.threshold / 2
+        while not self._stop.wait(period):
+            if time.perf_counter() - self._heartbeat < self.interval + self.threshold:
+                blocked = False
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            if not blocked:
+                self.stalls += 1
+                blocked = True
+            site = _call_site(frame)
+            self.offenders[site] += 1
+            if site not in self.examples:
+                self.examples[site] = "".join(traceback.format_stack(frame, limit=15))
+
+    # ---------- slow callbacks ----------
+    def instrument_callbacks(self) -> None:
+        """Times every callback the loop runs and records those slower than `threshold`."""
+        if self._orig_handle_run is not None:
+            return
+        orig = self._orig_handle_run = asyncio.Handle._run
+        monitor = self
+
+        def _run(handle):
+            start = time.perf_counter()
+            orig(handle)
+            elapsed = time.perf_counter() - start
+            if elapsed >= monitor.threshold:
+                stats = monitor.slow_callbacks[_describe(handle)]
+                stats[0] += 1
+                stats[1] += elapsed
+
+        asyncio.Handle._run = _run
+
+    def uninstrument_callbacks(self) -> None:
+        if self._orig_handle_run is not None:
+            asyncio.Handle._run = self._orig_handle_run
+            self._orig_handle_run = None
+
+    # ---------- reporting ----------
+    def report(self, top: int = 10) -> dict:
+        lags = sorted(self.lags)
+
+        def pct(q):
+            return (
+                round(lags[min(len(lags) - 1, int(q * len(lags)))] * 1000, 3)
+                if lags
+                else None
+            )
+
+        period_ms = self.threshold / 2 * 1000
+        return {
+            "lag_ms": {
+                "p50": pct(0.5),
+                "p99": pct(0.99),
+                "max": round(self.max_lag * 1000, 3),
+            },
+            "stalls": self.stalls,
+            "offenders": [
+                {"site": site, "samples": n, "approx_blocked_ms": round(n * period_ms)}
+                for site, n in self.offenders.most_common(top)
+            ],
+            "slow_callbacks": [
+                {"callback": name, "count": count, "total_ms": round(total * 1000, 3)}
+                for name, (count, total) in sorted(
+                    self.slow_callbacks.items(), key=lambda kv: -kv[1][1]
+                )[:top]
+            ],
+        }
+
+    def log_report(self) -> None:
+        r = self.report()
+        logger.info(
+            "event loop lag p50=%sms p99=%sms max=%sms stalls=%d",
+            *r["lag_ms"].values(),
+            r["stalls"],
+        )
+        for o in r["offenders"]:
+            logger.info("  blocked ~%dms at %s", o["approx_blocked_ms"], o["site"])
+        for c in r["slow_callbacks"]:
+            logger.info(
+                "  slow callback %s: %d calls, %sms",
+                c["callback"],
+                c["count"],
+                c["total_ms"],
+            )
+
+
+def start_from_env() -> asyncio.Task | None:
+    """Starts a LoopMonitor task if LOOP_MONITOR_MS is set; call from inside the running loop."""
+    threshold_ms = os.getenv("LOOP_MONITOR_MS")
+    if not threshold_ms:
+        return None
+    monitor = LoopMonitor(
+        threshold=float(threshold_ms) / 1000,
+        report_every=float(os.getenv("LOOP_MONITOR_REPORT_S", "60")),
+    )
+    logger.info("Loop monitor enabled: threshold %sms", threshold_ms)
+    return asyncio.create_task(monitor.run(), name="loop_monitor")
+
+
+async def stop(task: asyncio.Task | None) -> None:
+    """Stops a task from start_from_env (None is a no-op); the monitor logs a last report."""
+    if task is None:
+        return
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
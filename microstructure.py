@@ -0,0 +1,227 @@
+"""
+Per-ticker orderbook microstructure metrics, updated in constant time per book change.
+
+Prices are in yes terms: bid = best yes bid, ask = 100 - best no bid.
+
+    spread       ask - bid
+    microprice   size-weighted mid, (bid * ask_size + ask * bid_size) / (bid_size + ask_size)
+    imbalance    depth-weighted (bid depth - ask depth) / (bid depth + ask depth) over the top
+                 `depth` levels, level i weighted 1 / (i + 1); in [-1, 1]
+    ret_mean/ret_std   mean and std of mid changes (cents) over the last `window` changes
+    update_rate  book updates per second over the last `window` updates
+    since_change seconds since the top of book (prices or sizes) last changed
+
+Rolling windows are fixed-size numpy ring buffers, one row per ticker, with running sums
+so an update never scans the window.
+"""
+import time
+from typing import Dict, Iterable
+
+import numpy as np
+
+FIELDS = (
+    "bid",
+    "ask",
+    "bid_size",
+    "ask_size",
+    "spread",
+    "mid",
+    "microprice",
+    "imbalance",
+    "last_change",
+)
+
+
+class Microstructure:
+    def __init__(self, tickers: Iterable[str] = (), window: int = 256, depth: int = 5):
+        self.window = window
+        self.depth = depth
+        self.weights = 1.0 / np.arange(1, depth + 1)
+        self.tickers: list[str] = []
+        self.index: Dict[str, int] = {}
+        self.capacity = 0
+        tickers = list(tickers)
+        self._allocate(max(len(tickers), 8))
+        for ticker in tickers:
+            self.slot(ticker)
+
+    def _allocate(self, capacity: int) -> None:
+        def grow(old: np.ndarray | None, shape, fill) -> np.ndarray:
+            new = np.full(shape, fill, dtype=np.float64)
+            if old is not None:
+                new[: old.shape[0]] = old
+            return new
+
+        self.state = {
+            f: grow(getattr(self, "state", {}).get(f), capacity, np.nan) for f in FIELDS
+        }
+        self.returns = grow(
+            getattr(self, "returns", None), (capacity, self.window), 0.0
+        )
+        self.update_ts = grow(
+            getattr(self, "update_ts", None), (capacity, self.window), np.nan
+        )
+        self.ret_pos = grow(getattr(self, "ret_pos", None), capacity, 0).astype(
+            np.int64
+        )
+        self.ret_count = grow(getattr(self, "ret_count", None), capacity, 0).astype(
+            np.int64
+        )
+        self.ret_sum = grow(getattr(self, "ret_sum", None), capacity, 0.0)
+        self.ret_sumsq = grow(getattr(self, "ret_sumsq", None), capacity, 0.0)
+        self.ts_pos = grow(getattr(self, "ts_pos", None), capacity, 0).astype(np.int64)
+        self.updates = grow(getattr(self, "updates", None), capacity, 0).astype(
+            np.int64
+        )
+        self.capacity = capacity
+
+    def slot(self, ticker: str) -> int:
+        i = self.index.get(ticker)
+        if i is None:
+            i = self.index[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+            if i >= self.capacity:
+                self._allocate(self.capacity * 2)
+        return i
+
+    # ---------- update ----------
+    def update(
+        self, ticker: str, yes_levels, no_levels, now: float | None = None
+    ) -> None:
+        """
+        Feeds the current book for `ticker`. `yes_levels` / `no_levels` map price -> size and
+        iterate best (highest) price first, as KalshiOrderBook's SortedDicts do.
+        """
+        now = time.time() if now is None else now
+        i = self.slot(ticker)
+        s = self.state
+
+        # update rate: ring of update timestamps
+        n = self.window
+        self.update_ts[i, self.ts_pos[i]] = now
+        self.ts_pos[i] = (self.ts_pos[i] + 1) % n
+        self.updates[i] += 1
+
+        yes_top = next(iter(yes_levels), None)
+        no_top = next(iter(no_levels), None)
+        bid = float(yes_top) if yes_top is not None else np.nan
+        ask = float(100 - no_top) if no_top is not None else np.nan
+        bid_size = float(yes_levels[yes_top]) if yes_top is not None else 0.0
+        ask_size = float(no_levels[no_top]) if no_top is not None else 0.0
+
+        if (
+            bid != s["bid"][i]
+            or ask != s["ask"][i]
+            or bid_size != s["bid_size"][i]
+            or ask_size != s["ask_size"][i]
+        ):
+            if not (
+                np.isnan(bid)
+                and np.isnan(s["bid"][i])
+                and np.isnan(ask)
+                and np.isnan(s["ask"][i])
+            ):
+                s["last_change"][i] = now
+
+        old_mid = s["mid"][i]
+        mid = (bid + ask) / 2
+        s["bid"][i], s["ask"][i] = bid, ask
+        s["bid_size"][i], s["ask_size"][i] = bid_size, ask_size
+        s["spread"][i] = ask - bid
+        s["mid"][i] = mid
+        total = bid_size + ask_size
+        s["microprice"][i] = (
+            (bid * ask_size + ask * bid_size) / total if total else np.nan
+        )
+
+        bid_depth = self._depth(yes_levels)
+        ask_depth = self._depth(no_levels)
+        depth = bid_depth + ask_depth
+        s["imbalance"][i] = (bid_depth - ask_depth) / depth if depth else np.nan
+
+        if mid == mid and old_mid == old_mid and mid != old_mid:
+            r = mid - old_mid
+            p = self.ret_pos[i]
+            old = self.returns[i, p]
+            if self.ret_count[i] == n:
+                self.ret_sum[i] -= old
+                self.ret_sumsq[i] -= old * old
+            else:
+                self.ret_count[i] += 1
+            self.returns[i, p] = r
+            self.ret_sum[i] += r
+            self.ret_sumsq[i] += r * r
+            self.ret_pos[i] = (p + 1) % n
+
+    def _depth(self, levels) -> float:
+        total = 0.0
+        for k, price in enumerate(levels):
+            if k == self.depth:
+                break
+            total += self.weights[k] * levels[price]
+        return total
+
+    # ---------- queries ----------
+    def arrays(self, now: float | None = None) -> Dict[str, np.ndarray]:
+        """Every metric for every ticker, aligned with `self.tickers`."""
+        now = time.time() if now is None else now
+        n = len(self.tickers)
+        s = {f: v[:n] for f, v in self.state.items()}
+        count = self.ret_count[:n]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, self.ret_sum[:n] / count, np.nan)
+            var = np.where(
+                count > 1,
+                (self.ret_sumsq[:n] - count * mean**2) / (count - 1),
+                np.nan,
+            )
+            ts = self.update_ts[:n]
+            oldest = ts[
+                np.arange(n),
+                np.where(self.updates[:n] >= self.window, self.ts_pos[:n], 0),
+            ]
+            seen = np.minimum(self.updates[:n], self.window)
+            rate = np.where(now > oldest, seen / (now - oldest), np.nan)
+        return {
+            "spread": s["spread"],
+            "mid": s["mid"],
+            "microprice": s["microprice"],
+            "imbalance": s["imbalance"],
+            "ret_mean": mean,
+            "ret_std": np.sqrt(np.maximum(var, 0)),
+            "update_rate": rate,
+            "since_change": now - s["last_change"],
+        }
+
+    def metrics(self, ticker: str, now: float | None = None) -> Dict[str, float | None]:
+        """One ticker's metrics as a JSON-friendly dict (NaN -> None)."""
+        now = time.time() if now is None else now
+        i = self.index[ticker]
+        s = self.state
+        count = self.ret_count[i]
+        mean = self.ret_sum[i] / count if count else None
+        std = None
+        if count > 1:
+            std = float(
+                np.sqrt(
+                    max((self.ret_sumsq[i] - count * mean * mean) / (count - 1), 0.0)
+                )
+            )
+        seen = min(self.updates[i], self.window)
+        oldest = self.update_ts[
+            i, self.ts_pos[i] if self.updates[i] >= self.window else 0
+        ]
+        rate = seen / (now - oldest) if seen and now > oldest else None
+
+        def val(x):
+            return None if x != x else round(float(x), 4)
+
+        return {
+            "spread": val(s["spread"][i]),
+            "microprice": val(s["microprice"][i]),
+            "imbalance": val(s["imbalance"][i]),
+            "ret_mean": val(mean) if mean is not None else None,
+            "ret_std": val(std) if std is not None else None,
+            "update_rate": val(rate) if rate is not None else None,
+            "since_change": val(now - s["last_change"][i]),
+        }
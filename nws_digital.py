@@ -0,0 +1,191 @@
+"""
+Targeted parser for the NWS "digital" (tabular hourly) forecast page.
+
+The page is never parsed as a document. A regex scan over <table> tags locates the digital
+table (the fifth <table> in document order, as BeautifulSoup's find_all numbers them);
+its rows are split out and only the rows we store (Date, the hour row and COLUMNS) have
+their cells extracted. Each row is `label, value, value, ...` and the page repeats the
+labels once per 24-hour block, so values are appended per label.
+
+Cell text follows BeautifulSoup's get_text(strip=True): every text fragment between
+tags is unescaped and stripped, and the fragments are joined without a separator.
+
+    table = find_table(html)
+    columns = parse_table(table, "US/Eastern")   # typed lists, one entry per hour
+"""
+import datetime as dt
+import html as htmllib
+import re
+from typing import Callable, Dict, Iterator, List
+from zoneinfo import ZoneInfo
+
+DIGITAL_TABLE_INDEX = 4
+HOUR_PREFIX = "Hour"  # "Hour (EDT)", "Hour (CST)", ...
+
+# label on the page -> stored column
+COLUMNS = {
+    "Temperature (°F)": "air_temp",
+    "Dewpoint (°F)": "dew_point",
+    "Surface Wind (mph)": "wind_speed",
+    "Relative Humidity (%)": "relative_humidity",
+}
+
+_TABLE_TAG = re.compile(r"<(/?)table\b[^>]*>", re.I)
+_ROW_TAG = re.compile(r"<(/?)(tr|table)\b[^>]*>", re.I)
+_CELL_START = re.compile(r"<t[dh]\b[^>]*>", re.I)
+_CELL_TAG = re.compile(r"<(/?)(td|th|table)\b[^>]*>", re.I)
+_ANY_TAG = re.compile(r"<[^>]*>")
+
+
+def find_table(html: str, index: int = DIGITAL_TABLE_INDEX) -> str | None:
+    """The markup of the `index`-th <table> (0-based, nested tables counted), or None."""
+    seen = 0
+    start = depth = None
+    for m in _TABLE_TAG.finditer(html):
+        closing = m.group(1) == "/"
+        if start is None:
+            if not closing:
+                if seen == index:
+                    start, depth = m.start(), 1
+                seen += 1
+            continue
+        depth += -1 if closing else 1
+        if depth == 0:
+            return html[start : m.end()]
+    return html[start:] if start is not None else None
+
+
+def _text(fragment: str) -> str:
+    text = _ANY_TAG.sub("", fragment) if "<" in fragment else fragment
+    if "&" in text:
+        text = htmllib.unescape(text)
+    words = text.split()
+    if len(words) <= 1:
+        return words[0] if words else ""
+    # inner whitespace: strip each fragment between tags separately, like get_text(strip=True)
+    return "".join(
+        part.strip() for part in map(htmllib.unescape, _ANY_TAG.split(fragment))
+    )
+
+
+def _rows(table: str) -> Iterator[str]:
+    """The inner markup of each <tr> directly inside `table`."""
+    depth = 0
+    start = None
+    for m in _ROW_TAG.finditer(table):
+        closing, tag = m.group(1) == "/", m.group(2).lower()
+        if tag == "table":
+            depth += -1 if closing else 1
+            if depth == 0 and start is not None:
+                yield table[start : m.start()]
+                start = None
+        elif depth == 1:
+            if start is not None:
+                yield table[start : m.start()]
+                start = None
+            if not closing:
+                start = m.end()
+    if start is not None:
+        yield table[start:]
+
+
+def _cells(row: str, label_only: bool = False) -> List[str]:
+    """Inner markup of the row's cells (closing tags included; _text drops them)."""
+    if "<table" not in row and "<TABLE" not in row:
+        return _CELL_START.split(row, 2 if label_only else 0)[
+            1 : 2 if label_only else None
+        ]
+    # a nested table stays part of its enclosing cell
+    cells, depth, start = [], 0, None
+    for m in _CELL_TAG.finditer(row):
+        closing, tag = m.group(1) == "/", m.group(2).lower()
+        if tag == "table":
+            depth += -1 if closing else 1
+        elif depth == 0:
+            if start is not None:
+                cells.append(row[start : m.start()])
+            start = None if closing else m.end()
+    if start is not None:
+        cells.append(row[start:])
+    return cells
+
+
+def table_rows(
+    table: str, wanted: Callable[[str], bool] | None = None
+) -> Dict[str, List[str]]:
+    """
+    Row label -> concatenated cell texts, for the rows directly inside `table`. With
+    `wanted`, only rows whose label it accepts have their cells extracted.
+    """
+    rows: Dict[str, List[str]] = {}
+    for row in _rows(table):
+        first = _cells(row, label_only=True)
+        if not first:
+            continue
+        label = _text(first[0])
+        if not label or (wanted is not None and not wanted(label)):
+            continue
+        rows.setdefault(label, []).extend(_text(c) for c in _cells(row)[1:])
+    return rows
+
+
+def _number(text: str) -> int | float | None:
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return None
+
+
+def parse_table(
+    table: str, tz_name: str, today: dt.date | None = None
+) -> Dict[str, list] | None:
+    """
+    Typed columns of the digital table: `observation_time` (ISO 8601 with UTC offset, local
+    to `tz_name`) and one int/float/None list per COLUMNS entry. None if the table lacks a
+    Date or hour row.
+
+    Dates carry no year. Each takes the year of `today` (local), or the next year when that
+    would put it more than half a year in the past, so a late-December page rolls over.
+    """
+    rows = table_rows(
+        table,
+        lambda label: label == "Date"
+        or label in COLUMNS
+        or label.startswith(HOUR_PREFIX),
+    )
+    hour_label = next((label for label in rows if label.startswith(HOUR_PREFIX)), None)
+    if "Date" not in rows or hour_label is None:
+        return None
+    dates, hours = rows["Date"], rows[hour_label]
+    n = min(len(dates), len(hours))
+    tz = ZoneInfo(tz_name)
+    today = today or dt.datetime.now(tz).date()
+
+    observation_time: List[str] = []
+    day = None
+    cache: Dict[str, dt.date] = {}
+    for i in range(n):
+        if dates[i]:
+            day = cache.get(dates[i])
+            if day is None:
+                month, dom = map(int, dates[i].split("/")[:2])
+                day = dt.date(today.year, month, dom)
+                if (today - day).days > 183:
+                    day = day.replace(year=today.year + 1)
+                cache[dates[i]] = day
+        if day is None:
+            return None
+        # fold=1: a repeated fall-back hour is read as standard time
+        local = dt.datetime(
+            day.year, day.month, day.day, int(hours[i]), tzinfo=tz, fold=1
+        )
+        observation_time.append(local.strftime("%Y-%m-%dT%H:%M:%S%z"))
+
+    columns: Dict[str, list] = {"observation_time": observation_time}
+    for label, name in COLUMNS.items():
+        values = rows.get(label, [])
+        columns[name] = [_number(v) for v in values[:n]] + [None] * (n - len(values))
+    return columns
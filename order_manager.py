@@ -0,0 +1,301 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict
+
+import requests
+
+from journal import TradeJournal
+from kalshi_ref import KalshiHttpClient
+from order_placer import urls
+
+if TYPE_CHECKING:
+    from risk import RiskEngine
+
+logger = logging.getLogger("order_manager")
+
+
+@dataclass
+class OrderIntent:
+    """A signed yes-contract change: qty > 0 buys yes, qty < 0 buys no."""
+
+    strategy: str
+    ticker: str
+    qty: int
+    price: int
+    order_type: str = "market"
+    client_order_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    created_ns: int = field(default_factory=time.perf_counter_ns)
+    order_id: str | None = None
+    status: str = "queued"  # queued -> sent -> acked -> done | failed
+    attempts: int = 0
+    filled: int = 0
+    acked_at: float = 0.0
+
+    def body(self) -> Dict:
+        side = "yes" if self.qty > 0 else "no"
+        body = {
+            "ticker": self.ticker,
+            "action": "buy",
+            "side": side,
+            "type": self.order_type,
+            "count": abs(self.qty),
+            "client_order_id": self.client_order_id,
+        }
+        if self.order_type == "limit":
+            body[f"{side}_price"] = self.price
+        return body
+
+
+class OrderManager:
+    """
+    Non-blocking order submission.
+
+    `submit` only enqueues: at most one order per strategy and ticker is in flight, and a
+    strategy's intents for a ticker where it has an order in flight are dropped (other
+    strategies' orders on the ticker do not block it). An order stays in flight until its fills
+    cover it, the exchange cancels it, or `in_flight_timeout` passes after the ack.
+    Workers POST off the event loop and retry transient failures with the same
+    client_order_id, so a retry after a lost response cannot create a second order.
+    Acks are journaled to the `orders` table and fills to `positions` through a
+    TradeJournal.
+    """
+
+    def __init__(
+        self,
+        client: KalshiHttpClient,
+        db_file: str | None = None,
+        workers: int = 2,
+        max_attempts: int = 3,
+        retry_delay: float = 0.25,
+        in_flight_timeout: float = 10.0,
+        risk: "RiskEngine | None" = None,
+        journal: TradeJournal | None = None,
+    ):
+        self.client = client
+        self.db_file = db_file
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.in_flight_timeout = in_flight_timeout
+        self.risk = risk
+        # a journal passed in is shared and run by its owner; one built from db_file is run here
+        self.journal = journal or (TradeJournal(db_file) if db_file else None)
+        self._owns_journal = journal is None and self.journal is not None
+
+        self.queue: asyncio.Queue[OrderIntent] = asyncio.Queue()
+        self.in_flight: Dict[
+            tuple[str, str], OrderIntent
+        ] = {}  # (strategy, ticker) -> intent
+        self.by_order_id: Dict[str, OrderIntent] = {}
+        # fills can beat the POST response over the websocket; hold them until the ack
+        self.early_fills: OrderedDict[str, list] = OrderedDict()
+        # called with (intent, signed qty, price) for every fill, e.g. per-strategy position books
+        self.fill_listeners: list[Callable[[OrderIntent, int, int], None]] = []
+        if risk is not None:
+            self.fill_listeners.append(risk.on_fill)
+
+        self.ack_latency_us: deque = deque(maxlen=10_000)
+        self.fill_latency_us: deque = deque(maxlen=10_000)
+        self.counters = {
+            "submitted": 0,
+            "suppressed": 0,
+            "acked": 0,
+            "retries": 0,
+            "failed": 0,
+            "filled": 0,
+            "rejected": 0,
+        }
+
+    # ---------- hot path ----------
+    def submit(self, intent: OrderIntent) -> bool:
+        """
+        Queues `intent` unless its strategy already has an order in flight on the ticker or
+        risk rejects it. Never awaits.
+        """
+        key = (intent.strategy, intent.ticker)
+        if key in self.in_flight:
+            self.counters["suppressed"] += 1
+            return False
+        if self.risk is not None and not self.risk.reserve(intent):
+            self.counters["rejected"] += 1
+            return False
+        self.in_flight[key] = intent
+        self.queue.put_nowait(intent)
+        self.counters["submitted"] += 1
+        return True
+
+    def is_in_flight(self, strategy: str, ticker: str) -> bool:
+        return (strategy, ticker) in self.in_flight
+
+    # ---------- workers ----------
+    async def run(self) -> None:
+        tasks = [
+            asyncio.create_task(self._worker(), name=f"order_worker_{i}")
+            for i in range(self.workers)
+        ]
+        tasks.append(asyncio.create_task(self._expire(), name="order_expiry"))
+        if self._owns_journal:
+            tasks.append(asyncio.create_task(self.journal.run(), name="order_journal"))
+        await asyncio.gather(*tasks)
+
+    async def _worker(self) -> None:
+        while True:
+            intent = await self.queue.get()
+            try:
+                await self._send(intent)
+            except Exception:
+                logger.exception("Unexpected error sending %s", intent.client_order_id)
+                self._finish(intent, "failed")
+            finally:
+                self.queue.task_done()
+
+    async def _expire(self) -> None:
+        """Releases tickers whose acked order never reported fills (e.g. no fill feed)."""
+        while True:
+            await asyncio.sleep(1)
+            cutoff = time.monotonic() - self.in_flight_timeout
+            for intent in [
+                i
+                for i in self.in_flight.values()
+                if i.status == "acked" and i.acked_at < cutoff
+            ]:
+                self._finish(intent, "done")
+
+    async def _send(self, intent: OrderIntent) -> None:
+        while True:
+            intent.attempts += 1
+            intent.status = "sent"
+            try:
+                response = await asyncio.to_thread(
+                    self.client.post, urls["orders"], intent.body()
+                )
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status == 409:
+                    # an earlier attempt already created this client_order_id
+                    await self._recover_duplicate(intent)
+                    return
+                if status is not None and status < 500 and status != 429:
+                    logger.error(
+                        "Order %s rejected (%s): %s", intent.client_order_id, status, e
+                    )
+                    self._finish(intent, "failed")
+                    return
+                error = e
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                self._on_ack(intent, response["order"])
+                return
+
+            if intent.attempts >= self.max_attempts:
+                logger.error(
+                    "Order %s failed after %d attempts: %s",
+                    intent.client_order_id,
+                    intent.attempts,
+                    error,
+                )
+                self._finish(intent, "failed")
+                return
+            self.counters["retries"] += 1
+            await asyncio.sleep(self.retry_delay * 2 ** (intent.attempts - 1))
+
+    async def _recover_duplicate(self, intent: OrderIntent) -> None:
+        response = await asyncio.to_thread(
+            self.client.get, urls["orders"], {"ticker": intent.ticker, "limit": 100}
+        )
+        for order in response.get("orders", []):
+            if order.get("client_order_id") == intent.client_order_id:
+                self._on_ack(intent, order)
+                return
+        logger.error(
+            "Order %s reported as duplicate but not found", intent.client_order_id
+        )
+        self._finish(intent, "failed")
+
+    def _on_ack(self, intent: OrderIntent, order: Dict) -> None:
+        intent.order_id = order["order_id"]
+        intent.acked_at = time.monotonic()
+        self.ack_latency_us.append((time.perf_counter_ns() - intent.created_ns) / 1_000)
+        self.counters["acked"] += 1
+        self.by_order_id[intent.order_id] = intent
+        if self.journal is not None:
+            self.journal.order(
+                intent.strategy,
+                intent.ticker,
+                intent.price,
+                intent.qty,
+                intent.order_id,
+            )
+        intent.status = "acked"
+        for data in self.early_fills.pop(intent.order_id, []):
+            self._apply_fill(intent, data["msg"])
+        if order.get("status") == "canceled" or intent.filled >= abs(intent.qty):
+            self._finish(intent, "done")
+
+    def _finish(self, intent: OrderIntent, status: str) -> None:
+        intent.status = status
+        if status == "failed":
+            self.counters["failed"] += 1
+        key = (intent.strategy, intent.ticker)
+        if self.in_flight.get(key) is intent:
+            del self.in_flight[key]
+        if self.risk is not None:
+            self.risk.release(intent)
+        if intent.filled >= abs(intent.qty):
+            self.by_order_id.pop(intent.order_id, None)
+
+    # ---------- fills (wire to KalshiWebSocketClient "fill") ----------
+    async def on_fill(self, data: Dict) -> None:
+        msg = data.get("msg", {})
+        order_id = msg.get("order_id")
+        intent = self.by_order_id.get(order_id)
+        if intent is None:
+            self.early_fills.setdefault(order_id, []).append(data)
+            while len(self.early_fills) > 1000:
+                self.early_fills.popitem(last=False)
+            return
+        self._apply_fill(intent, msg)
+
+    def _apply_fill(self, intent: OrderIntent, msg: Dict) -> None:
+        self.counters["filled"] += 1
+        intent.filled += msg["count"]
+        self.fill_latency_us.append(
+            (time.perf_counter_ns() - intent.created_ns) / 1_000
+        )
+        price = msg["yes_price"] if msg["side"] == "yes" else msg["no_price"]
+        signed = msg["count"] if msg["side"] == "yes" else -msg["count"]
+        if self.journal is not None:
+            self.journal.position(
+                intent.strategy, intent.ticker, price, signed, intent.order_id
+            )
+        for listener in self.fill_listeners:
+            listener(intent, signed, price)
+        if intent.status == "acked" and intent.filled >= abs(intent.qty):
+            self._finish(intent, "done")
+
+    def stats(self) -> Dict:
+        def pct(values, q):
+            ordered = sorted(values)
+            return (
+                round(ordered[min(len(ordered) - 1, int(q * len(ordered)))])
+                if ordered
+                else None
+            )
+
+        return {
+            **self.counters,
+            "in_flight": len(self.in_flight),
+            "ack_latency_us": {
+                "p50": pct(self.ack_latency_us, 0.5),
+                "p99": pct(self.ack_latency_us, 0.99),
+            },
+            "fill_latency_us": {
+                "p50": pct(self.fill_latency_us, 0.5),
+                "p99": pct(self.fill_latency_us, 0.99),
+            },
+        }
@@ -7,6 +7,12 @@ placement/cancellation order approximation: 16.3 seconds for 100 orders
 ~ 161ms per order with rate_limit = 100ms
 """
 
+urls = {
+    "orders": "/trade-api/v2/portfolio/orders",
+    "positions": "/trade-api/v2/portfolio/positions",
+    "batched": "/trade-api/v2/portfolio/orders/batched",
+}
+
 
 def place_order(
     client, ticker, action, price, quantity, limit_order=True, expiration_ts=None, post_only=False
@@ -39,32 +45,48 @@ def cancel_order(client, public_order_id):
     return order_status == "canceled"
 
 
-def get_resting_orders(client, ticker):
+def get_resting_order_rows(client, ticker=None, event_ticker=None):
+    """Raw resting orders for one market, one event, or the whole account, following the cursor."""
     assert isinstance(client, KalshiHttpClient)
-    params = {"ticker": ticker, "status": "resting", "limit": 1000}
+    params = {"status": "resting", "limit": 1000}
+    if ticker is not None:
+        params["ticker"] = ticker
+    if event_ticker is not None:
+        params["event_ticker"] = event_ticker
     response = client.get(f"{urls['orders']}", params)
     orders = response["orders"]
-    while response["cursor"] != "":
+    while response.get("cursor"):
         params["cursor"] = response["cursor"]
         response = client.get(f"{urls['orders']}", params)
         orders.extend(response["orders"])
+    return orders
+
+
+def get_resting_orders(client, ticker):
     resting_orders = set()
-    for order in orders:
+    for order in get_resting_order_rows(client, ticker):
         resting_orders.add(
             (order["order_id"], order["yes_price"], order["remaining_count"])
         )
     return resting_orders
 
 
-def get_positions(client):
+def get_market_positions(client, count_filter="position"):
+    """All market positions, following the cursor across pages."""
     assert isinstance(client, KalshiHttpClient)
-    params = {"count_filter": "position", "limit": 1000}
+    params = {"count_filter": count_filter, "limit": 1000}
     response = client.get(f"{urls['positions']}", params)
     assert isinstance(response, dict)
-    while response["cursor"] != "":
-        params["cusor"] = response["cursor"]
-        response = client.get(f"{urls['positions']}", params)
     positions_list = response["market_positions"]
+    while response.get("cursor"):
+        params["cursor"] = response["cursor"]
+        response = client.get(f"{urls['positions']}", params)
+        positions_list.extend(response["market_positions"])
+    return positions_list
+
+
+def get_positions(client):
+    positions_list = get_market_positions(client)
 
     positions = {}
     for position in positions_list:
@@ -88,17 +110,18 @@ if __name__ == "__main__":
 
     response = client.get('/trade-api/v2/portfolio/positions')
     print(response['market_positions'][0].keys())
+    rows = []
     for i in response['market_positions']:
         if 'KXHIGH' in i['ticker'] and i['position'] != 0:
             #print(f'{i['ticker'].ljust(40)}, {i['market_exposure'] + i['fees_paid']/ abs(i['position'])},  {i['position']}')
             print(i)
-            conn = sqlite3.connect(os.getenv("ORDERS_DB_PATH"))
-            conn.execute("INSERT INTO positions VALUES (?,?,?,?,'') ON CONFLICT DO NOTHING",
-                        ("MomentumBot", i['ticker'],
-                        i['market_exposure'] + i['fees_paid']/ abs(i['position']),
-                        i['position']))
-            conn.commit()  # Add commit to save changes
-            conn.close()
+            rows.append(("MomentumBot", i['ticker'],
+                         i['market_exposure'] + i['fees_paid']/ abs(i['position']),
+                         i['position']))
+    # one connection and one transaction for every row
+    with sqlite3.connect(os.getenv("ORDERS_DB_PATH")) as conn:
+        conn.executemany("INSERT INTO positions VALUES (?,?,?,?,'') ON CONFLICT DO NOTHING", rows)
+    conn.close()
 
 
     # public_order_id = client.post('/trade-api/v2/portfolio/orders', {'ticker': 'KXHIGHAUS-25AUG17-B97.5',
@@ -1,12 +1,22 @@
-import asyncio, aiosqlite
-from kalshi_ref import KalshiHttpClient
+import asyncio
+from kalshi_ref import KalshiHttpClient, KalshiWebSocketClient
+from portfolio_state import PortfolioState
+from order_manager import OrderIntent, OrderManager
+from strategy_host import Strategy
+from risk import RiskEngine
+from journal import TradeJournal
 from cryptography.hazmat.primitives import serialization
-import sqlite3
 import sys, logging,os,uuid,time
+import numpy as np
 
 logger = logging.getLogger("orderbook_trader")
 logger.setLevel(logging.INFO)
 
+MAX_PRICE = 97  # skip markets where either side costs more than this
+MIN_SPREAD = 66  # skip markets where |p_no - p_yes| is below this
+POLL_RECONCILE_INTERVAL = 5.0  # seconds between portfolio REST refreshes without a websocket
+
+
 def decide_trade(pos_qty: int, p_yes: int, p_no: int) -> tuple[int, int | None]:
     """
     Returns (order_qty, price) based on current position and market prices.
@@ -23,62 +33,126 @@ def decide_trade(pos_qty: int, p_yes: int, p_no: int) -> tuple[int, int | None]:
             return 1, p_yes
     return 0, None
 
+
+def decide_trades(
+    pos_qty: np.ndarray,
+    p_yes: np.ndarray,
+    p_no: np.ndarray,
+    max_price: int = MAX_PRICE,
+    min_spread: int = MIN_SPREAD,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized price filters + decide_trade over aligned arrays (one slot per ticker).
+    Missing prices are encoded as -1. Returns (order_qty, price); price is 0 where
+    order_qty is 0.
+    """
+    tradable = (
+        (p_yes >= 0)
+        & (p_no >= 0)
+        & (p_yes <= max_price)
+        & (p_no <= max_price)
+        & (np.abs(p_no - p_yes) >= min_spread)
+    )
+    yes_cheaper = p_yes < p_no
+    no_cheaper = p_no < p_yes
+    qty = np.select(
+        [
+            (pos_qty == 1) & yes_cheaper,
+            (pos_qty == -1) & no_cheaper,
+            (pos_qty == 0) & yes_cheaper,
+            (pos_qty == 0) & no_cheaper,
+        ],
+        [-2, 2, -1, 1],
+        default=0,
+    )
+    qty = np.where(tradable, qty, 0)
+    price = np.where(qty < 0, p_no, np.where(qty > 0, p_yes, 0))
+    return qty, price
+
+
+class SpreadStrategy(Strategy):
+    """OrderbookTrader's price/spread filters and decide_trade, for running under a StrategyHost."""
+
+    name = "MomentumBot"
+
+    def __init__(self, tickers=(), max_price: int = MAX_PRICE, min_spread: int = MIN_SPREAD, name: str | None = None):
+        super().__init__(tickers, name)
+        self.max_price = max_price
+        self.min_spread = min_spread
+
+    def on_book(self, ticker: str, p_yes: int, p_no: int) -> None:
+        if p_yes < 0 or p_no < 0 or p_yes > self.max_price or p_no > self.max_price:
+            return
+        if abs(p_no - p_yes) < self.min_spread:
+            return
+        pos = self.position(ticker)
+        qty, price = decide_trade(pos, p_yes, p_no)
+        if self.host.journal is not None:
+            self.host.journal.decision(self.name, ticker, p_yes, p_no, pos, self.max_price, self.min_spread, qty, price)
+        if qty != 0 and price is not None:
+            self.submit(ticker, qty, price)
+
+
 class OrderbookTrader:
-    def __init__(self, queue: asyncio.Queue, db_file, tickers=[]):
+    def __init__(
+        self,
+        queue: asyncio.Queue,
+        db_file,
+        tickers=[],
+        portfolio: PortfolioState | None = None,
+        batch_interval: float | None = None,
+        orders: OrderManager | None = None,
+        risk: RiskEngine | None = None,
+        journal: TradeJournal | None = None,
+        ws: KalshiWebSocketClient | None = None,
+    ):
         self.queue = queue
         self.db_file = db_file
         self.name = "MomentumBot"
         self.tickers = set(tickers)
-        self._positions: dict[str, dict] = {}
         self.times = []
+
+        # Batch mode: on_message only records top-of-book; run_batches() evaluates all
+        # dirty tickers every batch_interval seconds.
+        self.batch_interval = batch_interval
+        self.ticker_list = sorted(self.tickers)
+        self.index = {t: i for i, t in enumerate(self.ticker_list)}
+        self.p_yes = np.full(len(self.ticker_list), -1, dtype=np.int64)
+        self.p_no = np.full(len(self.ticker_list), -1, dtype=np.int64)
+        self.dirty = np.zeros(len(self.ticker_list), dtype=bool)
+        self.client = None
         try:
             with open(os.getenv("PROD_KEYFILE"), "rb") as f:
                 private_key = serialization.load_pem_private_key(f.read(), password=None)
             self.client = KalshiHttpClient(os.getenv("PROD_KEYID"), private_key)
         except Exception as e:
             logger.error(e)
+        # Positions and balance follow `ws` pushes; without a websocket client they are
+        # only refreshed by REST reconciles, so reconcile as often as the old polling did.
+        self.portfolio = portfolio or PortfolioState(
+            self.client, ws=ws, queue=queue, reconcile_interval=60.0 if ws is not None else POLL_RECONCILE_INTERVAL
+        )
+        # Live orders go through the OrderManager; without one, trades are only simulated in memory.
+        self.orders = orders
+        # Pre-trade limits; with an OrderManager they are enforced there (pass the same engine to it).
+        self.risk = risk if risk is not None else getattr(orders, "risk", None)
+        # Decisions and paper fills are journaled write-behind; run journal.run() alongside.
+        self.journal = journal if journal is not None else getattr(orders, "journal", None)
 
-    async def update_balance(self):
-        while True:
-            self.balance = self.client.get_balance()['balance']
-            await asyncio.sleep(1)
-
-    async def _sync_ticker_position(self, ticker: str, emit_update: bool = False):
-        """
-        Pull position from Kalshi and store it in _positions.
-        """
-        positions = self.client.get(
-            '/trade-api/v2/portfolio/positions', {'ticker': ticker})
-        if not positions['market_positions']:
-            qty = 0
-            price = 0
-        else:
-            pos = positions['market_positions'][0]
-            qty = pos['position']
-            price = pos['market_exposure'] + pos['fees_paid']
-
-        self._positions[ticker] = {'price': price, 'quantity': qty, 'order_id': ''}
-
-        if emit_update:
-            await self.queue.put(
-                {"type": "positionUpdate", "ticker": ticker, "pos": qty})
     # ---------- init ----------
     async def initialize_positions(self):
-        for ticker in self.tickers:
-            await self._sync_ticker_position(ticker, emit_update=True)
-            logger.info("Initialized position for %s", ticker)
+        await self.portfolio.start()
+        if self.risk is not None:
+            self.risk.seed(self.portfolio, self.name)
+        logger.info("Initialized positions for %d tickers", len(self.tickers))
 
     # ---------- periodic update ----------
     async def update_positions(self):
-        while True:
-            for ticker in self.tickers:
-                await self._sync_ticker_position(ticker, emit_update=True)
-            await asyncio.sleep(5)
+        await self.portfolio.run()
 
     async def update_balance(self):
-        while True:
-            self.balance = self.client.get_balance()['balance']
-            await asyncio.sleep(1)
+        """Balance is maintained by PortfolioState; kept so existing entry points still run."""
+        return
 
     # AN ORDERBOOK MESSAGE LOOKS LIKE THIS
     # mkt = {
@@ -117,6 +191,15 @@ class OrderbookTrader:
                 self.times.append(end-start)
                 self.maybe_output_stats()
                 return
+            if self.batch_interval is not None:
+                i = self.index[ticker]
+                self.p_yes[i] = -1 if msg['yes'] == "N/A" else int(msg['yes'].split("@")[0])
+                self.p_no[i] = -1 if msg['no'] == "N/A" else int(msg['no'].split("@")[0])
+                self.dirty[i] = True
+                end = time.perf_counter_ns()
+                self.times.append(end - start)
+                self.maybe_output_stats()
+                return
             if msg['yes'] == "N/A" or msg['no'] == "N/A":
                 logger.debug("%s incomplete", ticker)
                 end = time.perf_counter_ns()
@@ -129,13 +212,13 @@ class OrderbookTrader:
             p_yes = int(p_yes_str)
             p_no = int(p_no_str)
 
-            if p_yes > 97 or p_no > 97:
+            if p_yes > MAX_PRICE or p_no > MAX_PRICE:
                 logger.debug("%s not profitable", ticker)
                 end = time.perf_counter_ns()
                 self.times.append(end - start)
                 self.maybe_output_stats()
                 return
-            if abs(p_no - p_yes) < 66:
+            if abs(p_no - p_yes) < MIN_SPREAD:
                 logger.debug("%s spread too tight (%d vs %d), skipping",
                              ticker, p_yes, p_no)
                 end = time.perf_counter_ns()
@@ -144,40 +227,13 @@ class OrderbookTrader:
                 return
 
             # read current position
-            pos = self._positions.get(ticker, {'quantity': 0, 'price': 0})
-            pos_qty = pos['quantity']
+            pos_qty = self.portfolio.position(ticker)
             order_pos_qty, price = decide_trade(pos_qty, p_yes, p_no)
+            if self.journal is not None:
+                self.journal.decision(self.name, ticker, p_yes, p_no, pos_qty, MAX_PRICE, MIN_SPREAD, order_pos_qty, price)
 
-            if order_pos_qty != 0 and price is not None and self.balance > abs(order_pos_qty) * 100:
-                uid = str(uuid.uuid4())
-                side = 'yes'
-                action = 'buy'
-                order_position = order_pos_qty
-                if order_pos_qty < 0:
-                    side = 'no'
-                    order_position = abs(order_pos_qty)
-
-                order = {
-                    'ticker': ticker,
-                    'action': action,
-                    'side': side,
-                    'type': 'market',
-                    'count': order_position,
-                    'client_order_id': uid
-                }
-                logger.info(order)
-                #order_id = self.client.post('/trade-api/v2/portfolio/orders', order)
-
-                # update in-memory position
-                new_qty = pos_qty + order_pos_qty
-                self._positions[ticker] = {
-                    'price': price,
-                    'quantity': new_qty,
-                    'order_id': ''
-                }
-
-                await self.queue.put(
-                    {"type": "positionUpdate", "ticker": ticker, "pos": new_qty})
+            if order_pos_qty != 0 and price is not None:
+                self.execute(ticker, order_pos_qty, price)
             else:
                 logger.debug("Ticker %s: no trade", ticker)
 
@@ -188,3 +244,75 @@ class OrderbookTrader:
             logger.exception("Error in on_message for ticker %s: %s",
                              ticker if 'ticker' in locals() else "?", e)
             raise
+
+    def execute(self, ticker: str, order_pos_qty: int, price: int) -> None:
+        if self.risk is None and self.portfolio.balance <= abs(order_pos_qty) * 100:
+            logger.debug("Ticker %s: insufficient balance", ticker)
+            return
+        if self.orders is not None:
+            # never awaits: the OrderManager drops it if this ticker already has an order in flight
+            if self.orders.submit(OrderIntent(self.name, ticker, order_pos_qty, price)):
+                logger.info("Submitted %s %+d @ %d", ticker, order_pos_qty, price)
+            return
+        if self.risk is not None and not self.risk.check(self.name, ticker, order_pos_qty, price)[0]:
+            return
+        uid = str(uuid.uuid4())
+        side = 'yes'
+        action = 'buy'
+        order_position = order_pos_qty
+        if order_pos_qty < 0:
+            side = 'no'
+            order_position = abs(order_pos_qty)
+
+        order = {
+            'ticker': ticker,
+            'action': action,
+            'side': side,
+            'type': 'market',
+            'count': order_position,
+            'client_order_id': uid
+        }
+        logger.info(order)
+        #order_id = self.client.post('/trade-api/v2/portfolio/orders', order)
+
+        # update in-memory position; emits the positionUpdate
+        self.portfolio.apply_fill(ticker, order_pos_qty, price)
+        if self.journal is not None:
+            self.journal.order(self.name, ticker, price, order_pos_qty, uid)
+            self.journal.position(self.name, ticker, price, order_pos_qty, uid)
+        if self.risk is not None:
+            self.risk.apply_fill(self.name, ticker, order_pos_qty, price)
+
+    def evaluate_dirty(self) -> int:
+        """Runs decide_trades over every ticker updated since the last call; returns orders sent."""
+        idx = np.flatnonzero(self.dirty)
+        if idx.size == 0:
+            return 0
+        self.dirty[idx] = False
+        pos = np.fromiter((self.portfolio.position(self.ticker_list[i]) for i in idx), dtype=np.int64, count=idx.size)
+        qty, price = decide_trades(pos, self.p_yes[idx], self.p_no[idx])
+        if self.journal is not None:
+            # journal the tickers that passed the filters, as on_message does
+            p_yes, p_no = self.p_yes[idx], self.p_no[idx]
+            passed = (
+                (p_yes >= 0) & (p_no >= 0) & (p_yes <= MAX_PRICE) & (p_no <= MAX_PRICE)
+                & (np.abs(p_no - p_yes) >= MIN_SPREAD)
+            )
+            for j in np.flatnonzero(passed):
+                self.journal.decision(
+                    self.name, self.ticker_list[idx[j]], int(p_yes[j]), int(p_no[j]), int(pos[j]),
+                    MAX_PRICE, MIN_SPREAD, int(qty[j]), int(price[j]) if qty[j] else None,
+                )
+        hits = np.flatnonzero(qty)
+        for j in hits:
+            self.execute(self.ticker_list[idx[j]], int(qty[j]), int(price[j]))
+        return hits.size
+
+    async def run_batches(self):
+        """Micro-tick loop for batch mode."""
+        while True:
+            await asyncio.sleep(self.batch_interval)
+            try:
+                self.evaluate_dirty()
+            except Exception:
+                logger.exception("Error evaluating batch")
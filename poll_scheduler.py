@@ -0,0 +1,222 @@
+"""
+Adaptive scheduling for the weather pollers.
+
+Every upstream publishes on a rhythm: NWS forecast pages roughly hourly, ASOS stations
+every five minutes, the CLI climate report once a day. A Cadence describes that rhythm
+(period and offset, both learned from the updates actually seen) and the scheduler polls
+each source fast around the expected update, slowly the rest of the time, and backs off
+exponentially while a source fails. Every delay gets +/- `jitter` so sources sharing a
+host do not fire in lockstep.
+
+A source is an async callable that returns the publish time (epoch seconds) of new data,
+True for new data without a known publish time, or None when there is nothing new; an
+exception is a failed poll. Each update records its ingest lag (found minus published).
+
+    scheduler = PollScheduler()
+    scheduler.add("forecast:KNYC", partial(forecast.update_site, "KNYC"), NWS_HOURLY)
+    await scheduler.run()   # one task per source, plus periodic stats
+"""
+import asyncio
+import logging
+import random
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Awaitable, Callable, Dict
+
+logger = logging.getLogger("poll_scheduler")
+
+
+@dataclass
+class Cadence:
+    """When a source publishes, and how hard to poll it. Times in seconds."""
+
+    period: float
+    offset: float = 0.0  # expected update, seconds past each UTC period boundary
+    lead: float = 0.0  # start polling fast this long before the expected update
+    window: float = 60.0  # and keep polling fast this long after it
+    fast: float = 5.0
+    slow: float = 60.0
+    max_backoff: float = 300.0
+    jitter: float = 0.1  # fraction of each delay
+    learn: bool = True  # move `offset` to where updates are actually found
+
+
+# gridded forecasts are re-issued about hourly, at times that differ by office
+NWS_HOURLY = Cadence(period=3600, offset=0, lead=120, window=900, fast=15, slow=120)
+# 5-minute ASOS observations, as they reach Synoptic
+ASOS_5MIN = Cadence(period=300, offset=60, lead=30, window=120, fast=5, slow=30)
+# the morning CLI report for the previous day (a preliminary one may follow in the afternoon)
+CLI_DAILY = Cadence(
+    period=86400, offset=6.5 * 3600, lead=1800, window=2 * 3600, fast=60, slow=1800
+)
+
+MIN_SAMPLES = 3  # updates needed before the learned offset is used
+
+
+class PollSource:
+    def __init__(self, name: str, poll: Callable[[], Awaitable], cadence: Cadence):
+        self.name = name
+        self.poll = poll
+        self.cadence = replace(cadence)  # `offset` is learned per source
+        self.failures = 0
+        self.updated_at: float | None = None
+        self.last_delay = cadence.fast
+        self.phases: deque = deque(maxlen=50)  # where in the period updates were found
+        self.lags: deque = deque(maxlen=1000)  # seconds from publish to ingest
+        self.counters = {"polls": 0, "updates": 0, "errors": 0}
+
+    async def poll_once(self) -> float:
+        """Polls the source once; returns the delay until the next poll."""
+        self.counters["polls"] += 1
+        try:
+            published = await self.poll()
+        except Exception as e:
+            self.failures += 1
+            self.counters["errors"] += 1
+            delay = self.next_delay(time.time())
+            logger.warning(
+                "%s failed (%d in a row), retrying in %.0fs: %s",
+                self.name,
+                self.failures,
+                delay,
+                e,
+            )
+            return delay
+        self.failures = 0
+        now = time.time()
+        if published:
+            self.record(now, None if published is True else float(published))
+        return self.next_delay(now)
+
+    def record(self, found: float, published: float | None) -> None:
+        self.counters["updates"] += 1
+        self.updated_at = found
+        if published is not None:
+            self.lags.append(max(0.0, found - published))
+        # the update appeared somewhere in the last interval; take the middle
+        self.phases.append((found - self.last_delay / 2) % self.cadence.period)
+        self._learn()
+
+    def _learn(self) -> None:
+        c = self.cadence
+        if not c.learn or len(self.phases) < MIN_SAMPLES:
+            return
+        # phases relative to the current offset, wrapped to [-period/2, period/2)
+        shifts = [
+            (p - c.offset + c.period / 2) % c.period - c.period / 2 for p in self.phases
+        ]
+        c.offset = (c.offset + statistics.median(shifts)) % c.period
+
+    def next_delay(self, now: float) -> float:
+        c = self.cadence
+        if self.failures:
+            delay = min(c.fast * 2**self.failures, c.max_backoff)
+        else:
+            since = (now - c.offset) % c.period  # since the latest expected update
+            expected = (
+                now - since if c.period - since > c.lead else now - since + c.period
+            )
+            # fast from `lead` before an expected update until `window` after it, unless found
+            zone = expected - c.lead
+            updated = self.updated_at is not None and self.updated_at >= zone
+            if now <= expected + c.window and not updated:
+                delay = c.fast
+            else:
+                next_zone = zone + c.period if now >= zone else zone
+                delay = min(c.slow, max(c.fast, next_zone - now))
+        delay *= random.uniform(1 - c.jitter, 1 + c.jitter)
+        self.last_delay = delay
+        return delay
+
+    def stats(self) -> Dict:
+        ordered = sorted(self.lags)
+
+        def pct(q):
+            return (
+                round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+                if ordered
+                else None
+            )
+
+        return {
+            **self.counters,
+            "offset": round(self.cadence.offset, 1),
+            "interval": round(self.last_delay, 1),
+            "lag_s": {"p50": pct(0.5), "p90": pct(0.9), "max": pct(1.0)},
+        }
+
+
+class PollScheduler:
+    """
+    Runs every registered source in its own task. Sources can be added and removed while
+    the scheduler runs (a poller registers its sources once its client and state are up).
+    """
+
+    def __init__(self, report_interval: float = 300.0):
+        self.report_interval = report_interval
+        self.sources: Dict[str, PollSource] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.running = False
+
+    def add(
+        self, name: str, poll: Callable[[], Awaitable], cadence: Cadence
+    ) -> PollSource:
+        self.remove(name)
+        source = self.sources[name] = PollSource(name, poll, cadence)
+        if self.running:
+            self._start(source)
+        return source
+
+    def remove(self, name: str) -> None:
+        self.sources.pop(name, None)
+        task = self.tasks.pop(name, None)
+        if task is not None:
+            task.cancel()
+
+    def _start(self, source: PollSource) -> None:
+        self.tasks[source.name] = asyncio.create_task(
+            self._poll_forever(source), name=f"poll:{source.name}"
+        )
+
+    async def _poll_forever(self, source: PollSource) -> None:
+        await asyncio.sleep(
+            random.uniform(0, source.cadence.fast)
+        )  # spread the first polls
+        while True:
+            await asyncio.sleep(await source.poll_once())
+
+    async def run(self) -> None:
+        self.running = True
+        for source in self.sources.values():
+            if source.name not in self.tasks:
+                self._start(source)
+        try:
+            while True:
+                await asyncio.sleep(self.report_interval)
+                self.log_stats()
+        finally:
+            self.running = False
+            tasks = list(self.tasks.values())
+            self.tasks.clear()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Dict]:
+        return {name: source.stats() for name, source in self.sources.items()}
+
+    def log_stats(self) -> None:
+        for name, s in self.stats().items():
+            logger.info(
+                "%s: %d polls, %d updates, %d errors, every %.0fs, offset %.0fs, ingest lag (s) p50 %s p90 %s",
+                name,
+                s["polls"],
+                s["updates"],
+                s["errors"],
+                s["interval"],
+                s["offset"],
+                s["lag_s"]["p50"],
+                s["lag_s"]["p90"],
+            )
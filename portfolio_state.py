@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict
+
+from kalshi_ref import KalshiHttpClient, KalshiWebSocketClient
+from order_placer import get_market_positions
+
+logger = logging.getLogger("portfolio_state")
+
+
+class PortfolioState:
+    """
+    Positions, exposure and balance kept current from `fill` / `market_positions` pushes.
+
+    Bootstraps with one paginated positions fetch and one balance fetch, then applies
+    websocket events as they arrive. REST is only called again every `reconcile_interval`
+    seconds, after a websocket reconnect, or when a fill's post_position disagrees with the
+    position after applying it. A position push is authoritative and is applied as is (it
+    often arrives before its fill). Fees come from the pushes' cumulative `fees_paid` and
+    are taken off the balance as they grow.
+    All lookups are plain dict reads. Without an `http` client (no credentials) nothing
+    is fetched: the portfolio starts empty and only tracks fills applied locally.
+    """
+
+    def __init__(
+        self,
+        http: KalshiHttpClient | None,
+        ws: KalshiWebSocketClient | None = None,
+        queue: asyncio.Queue | None = None,
+        reconcile_interval: float = 60.0,
+    ):
+        self.http = http
+        self.ws = ws
+        self.queue = queue
+        self.reconcile_interval = reconcile_interval
+
+        self._position: Dict[str, int] = {}
+        self._exposure: Dict[str, int] = {}  # cents
+        self._avg_price: Dict[str, float] = {}
+        self._fees_paid: Dict[str, int] = {}  # cents, cumulative per market
+        self.total_exposure = 0
+        self.balance = 0
+
+        self.drift = asyncio.Event()
+        self.last_reconcile = 0.0
+        self.counters = {
+            "fills": 0,
+            "position_updates": 0,
+            "reconciles": 0,
+            "drifts": 0,
+        }
+        self._ws_connections_seen = 0
+
+    # ---------- lookups ----------
+    def position(self, ticker: str) -> int:
+        return self._position.get(ticker, 0)
+
+    def exposure(self, ticker: str) -> int:
+        return self._exposure.get(ticker, 0)
+
+    def avg_price(self, ticker: str) -> float:
+        return self._avg_price.get(ticker, 0.0)
+
+    def positions(self) -> Dict[str, int]:
+        return dict(self._position)
+
+    # ---------- mutation ----------
+    def _set(self, ticker: str, qty: int, exposure: int) -> None:
+        old_qty = self._position.get(ticker, 0)
+        self.total_exposure += exposure - self._exposure.get(ticker, 0)
+        self._position[ticker] = qty
+        self._exposure[ticker] = exposure
+        self._avg_price[ticker] = exposure / abs(qty) if qty else 0.0
+        if qty != old_qty and self.queue is not None:
+            try:
+                self.queue.put_nowait(
+                    {"type": "positionUpdate", "ticker": ticker, "pos": qty}
+                )
+            except asyncio.QueueFull:
+                logger.warning("Queue full; dropped position update for %s", ticker)
+
+    def apply_fill(self, ticker: str, qty_delta: int, price: int) -> int:
+        """Applies a signed yes-contract change bought/sold at `price` cents; returns the new position."""
+        qty = self.position(ticker)
+        exposure = self.exposure(ticker)
+        new_qty = qty + qty_delta
+        if qty == 0 or (qty > 0) == (qty_delta > 0):
+            exposure += abs(qty_delta) * price
+        elif abs(qty_delta) <= abs(qty):
+            exposure -= round(self.avg_price(ticker) * abs(qty_delta))
+        else:
+            # flipped through zero: what is left is the new side's cost
+            exposure = abs(new_qty) * price
+        if new_qty == 0:
+            exposure = 0
+        self._set(ticker, new_qty, max(exposure, 0))
+        return new_qty
+
+    # ---------- websocket events ----------
+    async def on_fill(self, data: Dict[str, Any]) -> None:
+        msg = data.get("msg", {})
+        ticker = msg["market_ticker"]
+        count = msg["count"]
+        # buying yes or selling no adds yes contracts
+        buys_yes = (msg["side"] == "yes") == (msg.get("action", "buy") == "buy")
+        price = msg["yes_price"] if msg["side"] == "yes" else msg["no_price"]
+        self.balance += (-price if msg.get("action", "buy") == "buy" else price) * count
+        self.counters["fills"] += 1
+        post = msg.get("post_position")
+        if post is not None and post == self.position(ticker):
+            return  # a market_position push for this fill arrived first
+        new_qty = self.apply_fill(ticker, count if buys_yes else -count, price)
+        if post is not None and post != new_qty:
+            self._flag_drift(f"{ticker} fill implies {post}, local {new_qty}")
+
+    async def on_market_position(self, data: Dict[str, Any]) -> None:
+        msg = data.get("msg", {})
+        ticker = msg["market_ticker"]
+        qty = msg["position"]
+        self.counters["position_updates"] += 1
+        # position_cost and fees_paid are in centi-cents
+        if "fees_paid" in msg:
+            fees = msg["fees_paid"] // 100
+            self.balance -= fees - self._fees_paid.get(ticker, 0)
+            self._fees_paid[ticker] = fees
+        self._set(ticker, qty, msg.get("position_cost", 0) // 100)
+
+    def _flag_drift(self, reason: str) -> None:
+        self.counters["drifts"] += 1
+        logger.warning("Portfolio drift: %s", reason)
+        self.drift.set()
+
+    # ---------- REST ----------
+    async def reconcile(self) -> None:
+        """Replaces local state with one bulk positions fetch and one balance fetch."""
+        rows = await asyncio.to_thread(get_market_positions, self.http)
+        balance = await asyncio.to_thread(self.http.get_balance)
+        seen = set()
+        for row in rows:
+            ticker = row["ticker"]
+            seen.add(ticker)
+            self._set(ticker, row["position"], row["market_exposure"])
+            self._fees_paid[ticker] = row.get("fees_paid", 0)
+        for ticker in [t for t in self._position if t not in seen]:
+            self._set(ticker, 0, 0)
+        self.balance = balance["balance"]
+        self.last_reconcile = time.monotonic()
+        self.counters["reconciles"] += 1
+        self.drift.clear()
+
+    async def start(self) -> None:
+        """Bootstraps from REST and subscribes to portfolio pushes."""
+        if self.http is None:
+            logger.warning(
+                "No REST client; portfolio starts empty and only tracks local fills"
+            )
+            return
+        await self.reconcile()
+        if self.ws is not None:
+            await self.ws.subscribe(["fill"], handler=self.on_fill)
+            await self.ws.subscribe(
+                ["market_positions"], handler=self.on_market_position
+            )
+            self._ws_connections_seen = self.ws.connections
+        logger.info(
+            "Portfolio bootstrapped: %d positions, balance %d",
+            len(self._position),
+            self.balance,
+        )
+
+    async def run(self) -> None:
+        """Reconciles on a slow cadence, on drift, and after each websocket (re)connect."""
+        if self.http is None:
+            return
+        while True:
+            try:
+                await asyncio.wait_for(self.drift.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+            # events may have been missed while the websocket was down
+            reconnected = (
+                self.ws is not None and self.ws.connections != self._ws_connections_seen
+            )
+            due = time.monotonic() - self.last_reconcile >= self.reconcile_interval
+            if not (self.drift.is_set() or reconnected or due):
+                continue
+            if self.ws is not None:
+                self._ws_connections_seen = self.ws.connections
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error("Portfolio reconcile failed: %s", e)
+                self.drift.clear()
+                self.last_reconcile = time.monotonic()
@@ -0,0 +1,367 @@
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List
+
+import requests
+
+from kalshi_ref import KalshiHttpClient
+from order_placer import get_resting_order_rows, urls
+
+logger = logging.getLogger("quoting")
+
+BATCH_LIMIT = 20  # orders per batched create/cancel call
+PER_TICKER_SYNC = 5  # resyncs of up to this many tickers fetch each ticker's orders
+
+
+@dataclass(frozen=True)
+class Quote:
+    """A desired resting yes-side limit order."""
+
+    action: str  # "buy" or "sell"
+    price: int  # yes price, cents
+    count: int
+
+
+@dataclass
+class RestingOrder:
+    order_id: str
+    ticker: str
+    action: str
+    price: int
+    count: int
+
+
+@dataclass
+class QuotePlan:
+    """The calls needed to move resting orders to the desired quotes."""
+
+    cancels: List[RestingOrder] = field(default_factory=list)
+    decreases: List[tuple[RestingOrder, int]] = field(
+        default_factory=list
+    )  # (order, reduce_by)
+    amends: List[tuple[RestingOrder, Quote]] = field(default_factory=list)
+    creates: List[tuple[str, Quote]] = field(default_factory=list)  # (ticker, quote)
+    kept: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.cancels or self.decreases or self.amends or self.creates)
+
+
+def diff_ticker(
+    ticker: str,
+    resting: Iterable[RestingOrder],
+    desired: Iterable[Quote],
+    plan: QuotePlan,
+) -> None:
+    """
+    Adds to `plan` the fewest calls that turn `resting` into `desired` for one ticker.
+
+    Orders already at a desired (action, price) are kept, decreased, or topped up with a
+    new order for the shortfall, so they keep their queue position. Leftover resting
+    orders are amended onto leftover desired quotes of the same action; anything still
+    unmatched is cancelled or created.
+    """
+    want: Dict[tuple[str, int], int] = defaultdict(int)
+    for q in desired:
+        if q.count > 0:
+            want[q.action, q.price] += q.count
+    spare: List[RestingOrder] = []
+    for order in sorted(resting, key=lambda o: -o.count):
+        key = (order.action, order.price)
+        need = want.get(key, 0)
+        if need == 0:
+            spare.append(order)
+        elif order.count <= need:
+            plan.kept += 1
+            want[key] = need - order.count
+        else:
+            plan.decreases.append((order, order.count - need))
+            want[key] = 0
+    missing = [
+        Quote(action, price, count)
+        for (action, price), count in want.items()
+        if count > 0
+    ]
+    for order in spare:
+        quote = next((q for q in missing if q.action == order.action), None)
+        if quote is None:
+            plan.cancels.append(order)
+        else:
+            missing.remove(quote)
+            plan.amends.append((order, quote))
+    plan.creates.extend((ticker, q) for q in missing)
+
+
+class QuoteEngine:
+    """
+    Keeps resting limit orders equal to a desired quote set with minimal API traffic.
+
+    Resting state is tracked locally (bootstrapped from REST, then updated from call
+    responses and `fill` pushes), so `update` only diffs and never lists orders. Cancels
+    and creates across every ticker in one update are sent as batched calls of up to
+    BATCH_LIMIT orders; amends and decreases are one call each.
+
+    The engine's orders carry client_order_ids starting with `order_prefix`, and only
+    those are tracked: orders placed on the same tickers by an OrderManager or other
+    strategies are never amended or cancelled.
+    """
+
+    def __init__(self, client: KalshiHttpClient, strategy: str = "QuoteEngine"):
+        self.client = client
+        self.strategy = strategy
+        self.order_prefix = f"{strategy}-"
+        self.resting: Dict[str, Dict[str, RestingOrder]] = defaultdict(
+            dict
+        )  # ticker -> order_id -> order
+        self.batch_supported = True
+        self.counters = defaultdict(int)
+        self._lock = asyncio.Lock()
+
+    # ---------- state ----------
+    async def sync(self, tickers: Iterable[str] | None = None) -> None:
+        """
+        Replaces local resting state for `tickers` (default: all) with the engine's own
+        resting orders: one fetch per ticker for a few tickers, else one paginated fetch.
+        """
+        wanted = set(tickers) if tickers is not None else None
+        if wanted is not None and len(wanted) <= PER_TICKER_SYNC:
+            rows = []
+            for ticker in wanted:
+                rows.extend(
+                    await asyncio.to_thread(get_resting_order_rows, self.client, ticker)
+                )
+        else:
+            rows = await asyncio.to_thread(get_resting_order_rows, self.client)
+        for ticker in list(self.resting):
+            if wanted is None or ticker in wanted:
+                del self.resting[ticker]
+        for row in rows:
+            if (
+                row.get("side", "yes") != "yes"
+                or not self.owns(row)
+                or (wanted is not None and row["ticker"] not in wanted)
+            ):
+                continue
+            self._track(row)
+        self.counters["syncs"] += 1
+
+    def owns(self, row: Dict) -> bool:
+        return (row.get("client_order_id") or "").startswith(self.order_prefix)
+
+    def _client_order_id(self) -> str:
+        return f"{self.order_prefix}{uuid.uuid4()}"
+
+    def _track(self, row: Dict) -> None:
+        ticker = row["ticker"]
+        if row.get("status", "resting") != "resting" or row["remaining_count"] <= 0:
+            self.resting[ticker].pop(row["order_id"], None)
+            return
+        self.resting[ticker][row["order_id"]] = RestingOrder(
+            row["order_id"],
+            ticker,
+            row["action"],
+            row["yes_price"],
+            row["remaining_count"],
+        )
+
+    async def on_fill(self, data: Dict) -> None:
+        msg = data.get("msg", {})
+        order = self.resting.get(msg.get("market_ticker"), {}).get(msg.get("order_id"))
+        if order is None:
+            return
+        order.count -= msg["count"]
+        if order.count <= 0:
+            del self.resting[order.ticker][order.order_id]
+
+    # ---------- diff ----------
+    def plan(self, desired: Dict[str, Iterable[Quote]]) -> QuotePlan:
+        """Plans every ticker in `desired`; tickers mapped to an empty list are pulled."""
+        plan = QuotePlan()
+        for ticker, quotes in desired.items():
+            diff_ticker(ticker, self.resting.get(ticker, {}).values(), quotes, plan)
+        return plan
+
+    async def update(self, desired: Dict[str, Iterable[Quote]]) -> QuotePlan:
+        async with self._lock:
+            plan = self.plan(desired)
+            self.counters["updates"] += 1
+            self.counters["kept"] += plan.kept
+            if plan:
+                await self._execute(plan)
+            return plan
+
+    # ---------- calls ----------
+    async def _call(self, fn, *args):
+        self.counters["calls"] += 1
+        return await asyncio.to_thread(fn, *args)
+
+    async def _execute(self, plan: QuotePlan) -> None:
+        # cancels first so freed exposure is available to the creates
+        for i in range(0, len(plan.cancels), BATCH_LIMIT):
+            await self._cancel(plan.cancels[i : i + BATCH_LIMIT])
+        for order, reduce_by in plan.decreases:
+            await self._guard(self._decrease(order, reduce_by))
+        for order, quote in plan.amends:
+            await self._guard(self._amend(order, quote))
+        for i in range(0, len(plan.creates), BATCH_LIMIT):
+            await self._create(plan.creates[i : i + BATCH_LIMIT])
+
+    async def _guard(self, coro) -> None:
+        try:
+            await coro
+        except requests.RequestException as e:
+            self.counters["errors"] += 1
+            logger.error("Quote call failed: %s", e)
+
+    def _batch_unsupported(self, e: requests.RequestException) -> bool:
+        response = getattr(e, "response", None)
+        if (
+            isinstance(e, requests.HTTPError)
+            and response is not None
+            and response.status_code in (404, 405)
+        ):
+            logger.warning(
+                "Batched order endpoints unavailable; falling back to single calls"
+            )
+            self.batch_supported = False
+            return True
+        return False
+
+    async def _resync(self, tickers: Iterable[str]) -> None:
+        """After a call that may or may not have taken effect, re-reads those tickers' orders."""
+        try:
+            await self.sync(set(tickers))
+        except requests.RequestException as e:
+            self.counters["errors"] += 1
+            logger.error("Resync after failed call failed: %s", e)
+
+    def _cancelled(self, order: RestingOrder) -> None:
+        self.resting[order.ticker].pop(order.order_id, None)
+        self.counters["cancelled"] += 1
+
+    async def _cancel(self, orders: List[RestingOrder]) -> None:
+        # local state is dropped only once the exchange confirms the cancel
+        if self.batch_supported and len(orders) > 1:
+            try:
+                response = await self._call(
+                    self.client.delete,
+                    urls["batched"],
+                    {},
+                    {"ids": [o.order_id for o in orders]},
+                )
+            except requests.RequestException as e:
+                if not self._batch_unsupported(e):
+                    self.counters["errors"] += 1
+                    logger.error("Batch cancel failed: %s", e)
+                    await self._resync(o.ticker for o in orders)
+                    return
+            else:
+                failed = {
+                    r.get("order_id")
+                    for r in (response or {}).get("orders", [])
+                    if r.get("error")
+                }
+                for order in orders:
+                    if order.order_id in failed:
+                        self.counters["errors"] += 1
+                        logger.error("Batch cancel error for %s", order.order_id)
+                    else:
+                        self._cancelled(order)
+                if failed:
+                    await self._resync(o.ticker for o in orders if o.order_id in failed)
+                return
+        for order in orders:
+            try:
+                await self._call(
+                    self.client.delete, f"{urls['orders']}/{order.order_id}"
+                )
+            except requests.RequestException as e:
+                response = getattr(e, "response", None)
+                if response is not None and response.status_code == 404:  # already gone
+                    self._cancelled(order)
+                    continue
+                self.counters["errors"] += 1
+                logger.error("Cancel failed for %s: %s", order.order_id, e)
+                await self._resync([order.ticker])
+                continue
+            self._cancelled(order)
+
+    async def _decrease(self, order: RestingOrder, reduce_by: int) -> None:
+        response = await self._call(
+            self.client.post,
+            f"{urls['orders']}/{order.order_id}/decrease",
+            {"reduce_by": reduce_by},
+        )
+        self.counters["decreased"] += 1
+        self._track(response["order"])
+
+    async def _amend(self, order: RestingOrder, quote: Quote) -> None:
+        body = {
+            "ticker": order.ticker,
+            "side": "yes",
+            "action": order.action,
+            "yes_price": quote.price,
+            "count": quote.count,
+            "updated_client_order_id": self._client_order_id(),
+        }
+        response = await self._call(
+            self.client.post, f"{urls['orders']}/{order.order_id}/amend", body
+        )
+        self.counters["amended"] += 1
+        if response["order"]["order_id"] != order.order_id:
+            self.resting[order.ticker].pop(order.order_id, None)
+        self._track(response["order"])
+
+    def _body(self, ticker: str, quote: Quote) -> Dict:
+        return {
+            "ticker": ticker,
+            "action": quote.action,
+            "side": "yes",
+            "type": "limit",
+            "yes_price": quote.price,
+            "count": quote.count,
+            "client_order_id": self._client_order_id(),
+        }
+
+    async def _create(self, creates: List[tuple[str, Quote]]) -> None:
+        bodies = [self._body(ticker, quote) for ticker, quote in creates]
+        if self.batch_supported and len(bodies) > 1:
+            try:
+                response = await self._call(
+                    self.client.post, urls["batched"], {"orders": bodies}
+                )
+            except requests.RequestException as e:
+                if not self._batch_unsupported(e):
+                    self.counters["errors"] += 1
+                    logger.error("Batch create failed: %s", e)
+                    # some orders may have been created before the failure
+                    await self._resync(body["ticker"] for body in bodies)
+                    return
+            else:
+                for result in response["orders"]:
+                    if result.get("error"):
+                        self.counters["errors"] += 1
+                        logger.error("Batch create error: %s", result["error"])
+                    else:
+                        self.counters["created"] += 1
+                        self._track(result["order"])
+                return
+        for body in bodies:
+            try:
+                response = await self._call(self.client.post, urls["orders"], body)
+            except requests.RequestException as e:
+                self.counters["errors"] += 1
+                logger.error("Create failed for %s: %s", body["ticker"], e)
+                if not isinstance(
+                    e, requests.HTTPError
+                ):  # no answer: the order may exist
+                    await self._resync([body["ticker"]])
+                continue
+            self.counters["created"] += 1
+            self._track(response["order"])
+
+    def stats(self) -> Dict:
+        return {**self.counters, "resting": sum(len(v) for v in self.resting.values())}
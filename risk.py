@@ -0,0 +1,206 @@
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict
+
+from order_manager import OrderIntent
+from portfolio_state import PortfolioState
+
+logger = logging.getLogger("risk")
+
+
+@dataclass
+class RiskLimits:
+    """Exposure limits in cents."""
+
+    max_order: int = 2_000
+    max_ticker: int = 5_000
+    max_event: int = 20_000
+    max_strategy: int = 50_000
+    max_total: int = 100_000
+
+
+def event_of(ticker: str) -> str:
+    """KXHIGHNY-25OCT19-B70 -> KXHIGHNY-25OCT19 (all strikes of one day share an event)."""
+    return ticker.rsplit("-", 1)[0]
+
+
+def projected_exposure(qty: int, exposure: int, qty_delta: int, price: int) -> int:
+    """Exposure after a signed fill, using PortfolioState.apply_fill's average-cost rules."""
+    new_qty = qty + qty_delta
+    if new_qty == 0:
+        return 0
+    if qty == 0 or (qty > 0) == (qty_delta > 0):
+        return exposure + abs(qty_delta) * price
+    if abs(qty_delta) <= abs(qty):
+        return max(exposure - round(exposure / abs(qty) * abs(qty_delta)), 0)
+    return abs(new_qty) * price
+
+
+class RiskEngine:
+    """
+    Pre-trade limits on exposure per ticker, per event, per strategy and in total.
+
+    Filled exposure is tracked per (strategy, ticker) and rolled into running aggregates
+    on every fill. An accepted intent reserves its worst-case exposure increase (and its
+    cash outlay) until the order finishes, so orders in flight count against the limits.
+    Every check is a handful of dict reads; nothing here touches the network. Balance
+    comes from PortfolioState, which is kept current by websocket pushes.
+    """
+
+    def __init__(
+        self, limits: RiskLimits | None = None, portfolio: PortfolioState | None = None
+    ):
+        self.limits = limits or RiskLimits()
+        self.portfolio = portfolio
+
+        self.book: Dict[
+            tuple[str, str], list[int]
+        ] = {}  # (strategy, ticker) -> [qty, exposure]
+        self.by_ticker: Counter = Counter()
+        self.by_event: Counter = Counter()
+        self.by_strategy: Counter = Counter()
+        self.total = 0
+        self.cash_reserved = 0
+        self.reservations: Dict[
+            str, tuple[str, str, str, int, int]
+        ] = {}  # client_order_id -> keys, exposure, cash
+        self.events: Dict[str, str] = {}
+
+        self.counters = {"checks": 0, "accepted": 0, "rejected": 0}
+        self.rejections: Counter = Counter()
+
+    def _event(self, ticker: str) -> str:
+        event = self.events.get(ticker)
+        if event is None:
+            event = self.events[ticker] = event_of(ticker)
+        return event
+
+    def _add(self, strategy: str, ticker: str, event: str, amount: int) -> None:
+        self.by_ticker[ticker] += amount
+        self.by_event[event] += amount
+        self.by_strategy[strategy] += amount
+        self.total += amount
+
+    # ---------- pre-trade ----------
+    def check(
+        self, strategy: str, ticker: str, qty: int, price: int
+    ) -> tuple[bool, str | None, int]:
+        """Returns (ok, reason, exposure increase) for a signed order of `qty` contracts at `price`."""
+        self.counters["checks"] += 1
+        limits = self.limits
+        cost = abs(qty) * price
+        pos_qty, exposure = self.book.get((strategy, ticker), (0, 0))
+        increase = max(projected_exposure(pos_qty, exposure, qty, price) - exposure, 0)
+        event = self._event(ticker)
+        reason = None
+        if cost > limits.max_order:
+            reason = "order"
+        elif self.by_ticker[ticker] + increase > limits.max_ticker:
+            reason = "ticker"
+        elif self.by_event[event] + increase > limits.max_event:
+            reason = "event"
+        elif self.by_strategy[strategy] + increase > limits.max_strategy:
+            reason = "strategy"
+        elif self.total + increase > limits.max_total:
+            reason = "total"
+        elif (
+            self.portfolio is not None
+            and self.cash_reserved + cost > self.portfolio.balance
+        ):
+            reason = "balance"
+        if reason is not None:
+            self.counters["rejected"] += 1
+            self.rejections[reason] += 1
+            logger.debug(
+                "Rejected %s %s %+d @ %d: %s limit",
+                strategy,
+                ticker,
+                qty,
+                price,
+                reason,
+            )
+            return False, reason, 0
+        self.counters["accepted"] += 1
+        return True, None, increase
+
+    def reserve(self, intent: OrderIntent) -> bool:
+        """Checks `intent` and, if accepted, holds its exposure and cash until `release`."""
+        ok, _, increase = self.check(
+            intent.strategy, intent.ticker, intent.qty, intent.price
+        )
+        if not ok:
+            return False
+        event = self._event(intent.ticker)
+        cash = abs(intent.qty) * intent.price
+        self._add(intent.strategy, intent.ticker, event, increase)
+        self.cash_reserved += cash
+        self.reservations[intent.client_order_id] = (
+            intent.strategy,
+            intent.ticker,
+            event,
+            increase,
+            cash,
+        )
+        return True
+
+    def release(self, intent: OrderIntent) -> None:
+        """Drops the reservation of a finished (filled, cancelled or failed) order."""
+        reservation = self.reservations.pop(intent.client_order_id, None)
+        if reservation is None:
+            return
+        strategy, ticker, event, increase, cash = reservation
+        self._add(strategy, ticker, event, -increase)
+        self.cash_reserved -= cash
+
+    # ---------- post-trade ----------
+    def apply_fill(self, strategy: str, ticker: str, qty: int, price: int) -> None:
+        entry = self.book.setdefault((strategy, ticker), [0, 0])
+        new_exposure = projected_exposure(entry[0], entry[1], qty, price)
+        self._add(strategy, ticker, self._event(ticker), new_exposure - entry[1])
+        entry[0] += qty
+        entry[1] = new_exposure
+
+    def seed(self, portfolio: PortfolioState, strategy: str) -> None:
+        """Attributes the account's current positions to `strategy`, e.g. after PortfolioState.start()."""
+        for ticker, qty in portfolio.positions().items():
+            entry = self.book.setdefault((strategy, ticker), [0, 0])
+            exposure = portfolio.exposure(ticker)
+            self._add(strategy, ticker, self._event(ticker), exposure - entry[1])
+            entry[0], entry[1] = qty, exposure
+
+    def on_fill(self, intent: OrderIntent, qty: int, price: int) -> None:
+        """OrderManager fill listener."""
+        self.apply_fill(intent.strategy, intent.ticker, qty, price)
+
+    # ---------- reporting ----------
+    def utilization(self, top: int = 5) -> Dict:
+        limits = self.limits
+
+        def worst(counter: Counter, limit: int) -> Dict[str, float]:
+            return {k: round(v / limit, 3) for k, v in counter.most_common(top) if v}
+
+        return {
+            "total": round(self.total / limits.max_total, 3),
+            "ticker": worst(self.by_ticker, limits.max_ticker),
+            "event": worst(self.by_event, limits.max_event),
+            "strategy": worst(self.by_strategy, limits.max_strategy),
+            "cash_reserved": self.cash_reserved,
+        }
+
+    def stats(self) -> Dict:
+        return {
+            **self.counters,
+            "rejections": dict(self.rejections),
+            "utilization": self.utilization(),
+        }
+
+    def log_report(self) -> None:
+        s = self.stats()
+        logger.info(
+            "risk: total %.1f%% used, %d accepted, %d rejected %s",
+            s["utilization"]["total"] * 100,
+            s["accepted"],
+            s["rejected"],
+            s["rejections"],
+        )
@@ -0,0 +1,213 @@
+#!.venv/bin/python
+"""
+Benchmark the targeted NWS digital-table parser against the previous BeautifulSoup +
+pandas implementation, on recorded pages.
+
+    python script_bench_forecast_parser.py --record        # save every site's page to fixtures/nws/
+    python script_bench_forecast_parser.py                 # benchmark the recorded pages
+    python script_bench_forecast_parser.py --synthetic     # no fixtures: generated pages (labelled)
+
+Both parsers must produce the same rows (values compared as numbers, observation_time
+compared without the year, which the old parser hard-coded) before timings are reported.
+"""
+import argparse
+import asyncio
+import datetime as dt
+import os
+import sys
+import time
+from collections import defaultdict
+
+from nws_digital import find_table
+from weather_extract_forecast import nws_site2forecast, parse_forecast, tz_map
+from weather_http import WeatherHttp
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "nws")
+
+
+def parse_forecast_legacy(nws_site, html):
+    """The parser this benchmark replaces, kept verbatim apart from the pandas 3 string option."""
+    import numpy as np
+    import pandas as pd
+    import pytz
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find_all("table")[4]
+    forecast_dict = defaultdict(list)
+    for row in table.find_all("tr"):
+        row_data = [cell.get_text(strip=True) for cell in row.find_all(["td", "th"])]
+        if row_data and row_data[0]:
+            forecast_dict[row_data[0]].extend(row_data[1:])
+
+    tz = pytz.timezone(tz_map[nws_site])
+    with pd.option_context("future.infer_string", False):
+        df = pd.DataFrame.from_dict(forecast_dict)
+    df["Date"] = df["Date"].replace("", np.nan).ffill()
+    df["Date"] = df["Date"].apply(lambda x: x + "/2025")
+    df["Date"] = pd.to_datetime(df["Date"], format="%m/%d/%Y")
+    df.iloc[:, 1] = df.iloc[:, 1].astype(int)
+    df["Date"] = df["Date"] + pd.to_timedelta(df.iloc[:, 1], unit="h")
+    df["Date"] = df["Date"].dt.tz_localize(tz).dt.strftime("%Y-%m-%dT%H:%M:%S%z")
+
+    df.insert(0, "idx", range(len(df)))
+    df.insert(0, "station", nws_site)
+    df.insert(
+        0,
+        "inserted_at",
+        dt.datetime.now(dt.timezone.utc).isoformat(timespec="microseconds"),
+    )
+    rename_map = {
+        "Date": "observation_time",
+        "Temperature (°F)": "air_temp",
+        "Relative Humidity (%)": "relative_humidity",
+        "Dewpoint (°F)": "dew_point",
+        "Surface Wind (mph)": "wind_speed",
+    }
+    df = df.rename(columns=rename_map)
+    columns = [
+        "inserted_at",
+        "idx",
+        "station",
+        "observation_time",
+        "air_temp",
+        "dew_point",
+        "wind_speed",
+        "relative_humidity",
+    ]
+    return df[columns].to_dict(orient="records")
+
+
+def synthetic_page(start: dt.datetime, hours: int = 48) -> str:
+    """A generated page laid out like the digital forecast (NOT a recorded NWS page)."""
+    chrome = "".join(
+        f'<table width="100%"><tr><td><a href="/nav/{i}">Link {i}</a>&nbsp;<font size="1">{"x" * 400}</font></td></tr></table>'
+        for i in range(4)
+    )
+    script = "<script>" + "var a=1;" * 4000 + "</script>"
+    rows = []
+    for block in range(0, hours, 24):
+        times = [start + dt.timedelta(hours=block + h) for h in range(24)]
+
+        def row(label, values):
+            cells = "".join(
+                f'<td class="c"><font size="2">{v}</font></td>' for v in values
+            )
+            return f'<tr align="center"><td width="5%"><font size="1"><b>{label}</b></font></td>{cells}</tr>'
+
+        dates, previous = [], None
+        for t in times:
+            dates.append(t.strftime("%m/%d") if t.date() != previous else "")
+            previous = t.date()
+        rows += [
+            row("Date", dates),
+            row("Hour (EDT)", [t.strftime("%H") for t in times]),
+            row("Temperature (&deg;F)", [60 + t.hour % 12 for t in times]),
+            row("Dewpoint (&deg;F)", [40 + t.hour % 5 for t in times]),
+            row("Heat Index (&deg;F)", ["" for _ in times]),
+            row("Surface Wind (mph)", [5 + t.hour % 7 for t in times]),
+            row("Wind Dir", ["NW" for _ in times]),
+            row("Gust", ["" for _ in times]),
+            row("Sky Cover (%)", [30 for _ in times]),
+            row("Precipitation Potential (%)", [10 for _ in times]),
+            row("Relative Humidity (%)", [50 + t.hour % 20 for t in times]),
+            row("Rain", ["--" for _ in times]),
+            row("Thunder", ["--" for _ in times]),
+        ]
+    return f"<html><head>{script}</head><body>{chrome}<table>{''.join(rows)}</table><table><tr><td>footer</td></tr></table></body></html>"
+
+
+async def record() -> None:
+    os.makedirs(FIXTURES, exist_ok=True)
+    async with WeatherHttp() as http:
+        for site, url in nws_site2forecast.items():
+            response = await http.get(url)
+            response.raise_for_status()
+            path = os.path.join(FIXTURES, f"{site}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(response.text)
+            print(f"recorded {path} ({len(response.text)} chars)")
+
+
+def load_pages(synthetic: bool) -> list[tuple[str, str]]:
+    if synthetic:
+        start = dt.datetime.now().replace(minute=0, second=0, microsecond=0)
+        return [(site, synthetic_page(start)) for site in nws_site2forecast]
+    if not os.path.isdir(FIXTURES):
+        sys.exit(
+            f"No fixtures in {FIXTURES}; run with --record (network) or --synthetic"
+        )
+    pages = []
+    for name in sorted(os.listdir(FIXTURES)):
+        site = name.removesuffix(".html")
+        if site in tz_map:
+            with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+                pages.append((site, f.read()))
+    return pages
+
+
+def same_rows(new, old) -> bool:
+    def key(r):
+        numbers = [
+            None if r[c] in ("", None) else float(r[c])
+            for c in ("air_temp", "dew_point", "wind_speed", "relative_humidity")
+        ]
+        return (r["idx"], r["station"], r["observation_time"][4:], numbers)
+
+    return len(new) == len(old) and all(key(a) == key(b) for a, b in zip(new, old))
+
+
+def timeit(fn, pages, repeat: int) -> float:
+    """Best-of-`repeat` seconds to parse every page once."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for site, html in pages:
+            fn(site, html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="fetch and save every site's page, then exit",
+    )
+    parser.add_argument(
+        "--synthetic",
+        action="store_true",
+        help="benchmark generated pages instead of fixtures",
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.record:
+        asyncio.run(record())
+        return
+
+    pages = load_pages(args.synthetic)
+    source = "synthetic pages" if args.synthetic else f"recorded pages from {FIXTURES}"
+    print(
+        f"{len(pages)} {source}, {sum(len(h) for _, h in pages) / len(pages) / 1024:.0f} KiB each on average"
+    )
+    for site, html in pages:
+        if not same_rows(parse_forecast(site, html), parse_forecast_legacy(site, html)):
+            sys.exit(f"{site}: parsers disagree")
+
+    legacy = timeit(parse_forecast_legacy, pages, max(1, args.repeat // 10))
+    targeted = timeit(parse_forecast, pages, args.repeat)
+    locate = timeit(lambda site, html: find_table(html), pages, args.repeat)
+    per_page = 1000 / len(pages)
+    print(f"legacy (bs4 + pandas)  {legacy * per_page:8.2f} ms/page")
+    print(
+        f"targeted               {targeted * per_page:8.2f} ms/page  ({legacy / targeted:.0f}x faster)"
+    )
+    print(f"  of which find_table  {locate * per_page:8.2f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
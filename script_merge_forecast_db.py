@@ -2,6 +2,8 @@
 import sqlite3
 import sys, os, pathlib
 
+from forecast_store import FORECAST_DDL
+
 DDL = """
     CREATE TABLE IF NOT EXISTS forecast (
         inserted_at      TEXT,
@@ -17,10 +19,10 @@ DDL = """
 """
 
 
-def count_rows(path: str) -> int:
-    """Return number of rows in forecast table."""
+def count_rows(path: str, table: str = "forecast") -> int:
+    """Return number of rows in `table` (default: the legacy forecast table)."""
     con = sqlite3.connect(path)
-    n = con.execute("SELECT COUNT(*) FROM forecast").fetchone()[0]
+    n = con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
     con.close()
     return n
 
@@ -29,17 +31,27 @@ def merge(master_path: str, src_path: str) -> None:
     db1 = sqlite3.connect(master_path)
     db2 = sqlite3.connect(src_path)
 
-    db1.executescript(DDL)
-    db2.executescript(DDL)
+    for db in (db1, db2):
+        db.executescript(DDL)
+        db.executescript(FORECAST_DDL)
 
     pre = count_rows(master_path)  # rows in master before
+    pre_revisions = count_rows(master_path, "forecast_revision")
 
     db1.execute("ATTACH DATABASE ? AS src", (src_path,))
     db1.execute("INSERT OR IGNORE INTO main.forecast SELECT * FROM src.forecast")
+    # oldest first, so the trigger leaves forecast_latest on the newest revision
+    db1.execute(
+        "INSERT OR IGNORE INTO main.forecast_revision "
+        "(station, observation_time, issued_at, air_temp, dew_point, wind_speed, relative_humidity) "
+        "SELECT station, observation_time, issued_at, air_temp, dew_point, wind_speed, relative_humidity "
+        "FROM src.forecast_revision ORDER BY issued_at"
+    )
     db1.commit()
 
     post = count_rows(master_path)  # rows in master after
     src_rows = count_rows(src_path)  # rows in src
+    post_revisions = count_rows(master_path, "forecast_revision")
 
     db1.close()
     db2.close()
@@ -47,6 +59,7 @@ def merge(master_path: str, src_path: str) -> None:
     print(f"master rows: {post}")
     print(f"src rows: {src_rows}")
     print(f"rows inserted: {post - pre}")
+    print(f"revisions inserted: {post_revisions - pre_revisions}")
 
 
 if __name__ == "__main__":
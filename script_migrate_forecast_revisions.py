@@ -0,0 +1,53 @@
+#!.venv/bin/python
+"""
+Converts the legacy `forecast` table into forecast_revision / forecast_latest.
+
+    ./script_migrate_forecast_revisions.py                 # $FORECAST_DB_PATH
+    ./script_migrate_forecast_revisions.py --drop-legacy   # then drop `forecast` and VACUUM
+"""
+import argparse
+import os
+import pathlib
+import sqlite3
+import sys
+
+from forecast_store import FORECAST_DDL, MIGRATE_LEGACY_SQL
+
+
+def migrate(path: str, drop_legacy: bool = False) -> None:
+    con = sqlite3.connect(path)
+    con.executescript(FORECAST_DDL)
+    legacy = con.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'forecast'"
+    ).fetchone()[0]
+    if not legacy:
+        sys.exit(f"{path} has no legacy forecast table")
+
+    legacy_rows = con.execute("SELECT COUNT(*) FROM forecast").fetchone()[0]
+    con.execute(MIGRATE_LEGACY_SQL)
+    con.commit()
+    revisions = con.execute("SELECT COUNT(*) FROM forecast_revision").fetchone()[0]
+    latest = con.execute("SELECT COUNT(*) FROM forecast_latest").fetchone()[0]
+    print(f"legacy rows: {legacy_rows}")
+    print(f"revisions: {revisions}")
+    print(f"latest hours: {latest}")
+
+    if drop_legacy:
+        before = os.path.getsize(path)
+        con.execute("DROP TABLE forecast")
+        con.commit()
+        con.execute("VACUUM")
+        print(f"size: {before / 1e6:.1f} MB -> {os.path.getsize(path) / 1e6:.1f} MB")
+    con.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("db", nargs="?", default=os.getenv("FORECAST_DB_PATH"))
+    parser.add_argument("--drop-legacy", action="store_true")
+    args = parser.parse_args()
+    if not args.db or not pathlib.Path(args.db).exists():
+        sys.exit("Missing or invalid database path (argument or FORECAST_DB_PATH)")
+    migrate(args.db, args.drop_legacy)
@@ -0,0 +1,84 @@
+#!.venv/bin/python
+"""
+Runs every weather source in one process: NWS forecast pages, Synoptic observations and
+the daily CLI reports share one PollScheduler, one HTTP client and one StorageService.
+
+    FORECAST_DB_PATH=... WEATHER_DB_PATH=... ./script_weather_pollers.py
+
+The scheduler logs, per source, polls, updates, the current poll interval, the learned
+publish offset and the ingest lag (how long after publication updates were found).
+"""
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+
+import loop_monitor
+import weather_extract_forecast
+import weather_sensor_reading
+from poll_scheduler import PollScheduler
+from storage import StorageService
+from weather_cli_report import ClimateReportPoll
+from weather_http import WeatherHttp
+
+
+async def consumer(queue: asyncio.Queue):
+    while True:
+        item = await queue.get()
+
+
+async def main():
+    for name in ("FORECAST_DB_PATH", "WEATHER_DB_PATH"):
+        path = os.getenv(name)
+        if path is None or not Path(path).exists():
+            sys.exit(f"Missing or invalid env var {name}")
+    monitor_task = loop_monitor.start_from_env()
+
+    queue = asyncio.Queue(maxsize=10_000)
+    storage = StorageService()
+    scheduler = PollScheduler()
+    forecast_db = storage.database(os.getenv("FORECAST_DB_PATH"))
+    weather_db = storage.database(
+        os.getenv("WEATHER_DB_PATH"), weather_sensor_reading.CREATE_TABLE_SQL
+    )
+    # the pollers share this client; it is closed here, after all of them stop
+    try:
+        async with WeatherHttp() as http:
+            producers = [
+                weather_extract_forecast.ForecastPoll(
+                    queue,
+                    forecast_db.path,
+                    http=http,
+                    db=forecast_db,
+                    scheduler=scheduler,
+                ),
+                weather_sensor_reading.SensorPoll(
+                    queue,
+                    weather_db.path,
+                    http=http,
+                    db=weather_db,
+                    scheduler=scheduler,
+                ),
+                ClimateReportPoll(queue, http=http, scheduler=scheduler),
+            ]
+            producer_tasks = [
+                asyncio.create_task(p.run(), name=p.__class__.__name__)
+                for p in producers
+            ]
+            scheduler_task = asyncio.create_task(scheduler.run(), name="poll_scheduler")
+            storage_task = asyncio.create_task(storage.run(), name="storage")
+            consumer_task = asyncio.create_task(consumer(queue))
+
+            await asyncio.gather(
+                *producer_tasks, scheduler_task, storage_task, consumer_task
+            )
+    finally:
+        await loop_monitor.stop(monitor_task)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(message)s", stream=sys.stdout
+    )
+    asyncio.run(main())
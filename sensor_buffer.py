@@ -0,0 +1,281 @@
+"""
+In-memory sensor observations: one fixed-size, columnar ring buffer per station.
+
+Each station's series is kept as NumPy arrays: epoch seconds (int64), the station's UTC
+offset at that time (int32, seconds) and the values (float32, NaN for missing), so both
+the UTC instant (for incremental fetches) and the local wall-clock string the `weather`
+table stores can be recovered without keeping strings around.
+
+Synoptic already sends parallel arrays per station; `parse_times` and `to_values` turn
+them into arrays in a few vectorized steps, and `observation_rows` feeds array views
+straight to executemany.
+
+Payloads carry runs of equal values rather than every reading; a RunLengthEncoder per
+station keeps those runs as readings arrive and reports only what changed.
+"""
+import datetime as dt
+from collections import deque
+from itertools import islice, repeat
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+import numpy as np
+
+VALUE_FIELDS = ("air_temp", "relative_humidity", "dew_point", "wind_speed")
+_ISO_LOCAL = len("2025-10-19T14:05:00-0400")
+
+
+def parse_time(text: str) -> tuple[int, int]:
+    """'2025-10-19T14:05:00-0400' -> (epoch seconds, UTC offset seconds)."""
+    t = dt.datetime.fromisoformat(text)
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=dt.timezone.utc)
+    return int(t.timestamp()), int(t.utcoffset().total_seconds())
+
+
+def parse_times(times: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+    """parse_time over a whole series: (int64 epoch seconds, int32 UTC offsets)."""
+    text = np.asarray(times, dtype=f"U{_ISO_LOCAL}")
+    if not len(text):
+        return np.zeros(0, np.int64), np.zeros(0, np.int32)
+    if any(
+        len(t) != _ISO_LOCAL for t in (times[0], times[-1])
+    ):  # not ±HHMM: take the slow path
+        parsed = np.array([parse_time(t) for t in times], dtype=np.int64).reshape(-1, 2)
+        return parsed[:, 0], parsed[:, 1].astype(np.int32)
+    local = text.astype("U19").astype("datetime64[s]").astype(np.int64)
+    chars = np.frombuffer(text.tobytes(), dtype=np.uint32).reshape(-1, _ISO_LOCAL)
+    digits = chars[:, 20:].astype(np.int32) - ord("0")
+    offset = (digits[:, 0] * 10 + digits[:, 1]) * 3600 + (
+        digits[:, 2] * 10 + digits[:, 3]
+    ) * 60
+    offset = np.where(chars[:, 19] == ord("-"), -offset, offset).astype(np.int32)
+    return local - offset, offset
+
+
+def format_times(ts: np.ndarray, utc_offset: np.ndarray) -> List[str]:
+    """Inverse of parse_times, in the format Synoptic sends with obtimezone=local."""
+    local = np.datetime_as_string((ts + utc_offset).astype("datetime64[s]"))
+    minutes = np.abs(utc_offset) // 60
+    suffix = [
+        f"{'-' if o < 0 else '+'}{m // 60:02d}{m % 60:02d}"
+        for o, m in zip(utc_offset.tolist(), minutes.tolist())
+    ]
+    return [t + s for t, s in zip(local.tolist(), suffix)]
+
+
+def to_values(columns: Sequence[Sequence[float | None] | None], n: int) -> np.ndarray:
+    """(n, len(columns)) float32 array; None and missing series become NaN."""
+    values = np.full((n, len(columns)), np.nan, dtype=np.float32)
+    for j, column in enumerate(columns):
+        if column:
+            values[:, j] = np.asarray(column, dtype=np.float32)
+    return values
+
+
+def observation_rows(
+    inserted_at: str, station: str, ts, utc_offset, values
+) -> Iterator[tuple]:
+    """`weather` rows (inserted_at, station, observation_time, *VALUE_FIELDS) from arrays."""
+    # float32 -> float64 widens 40.1 to 40.09999847; Synoptic reports at most 3 decimals
+    columns = np.round(values.astype(np.float64), 3).T.tolist()
+    return zip(
+        repeat(inserted_at), repeat(station), format_times(ts, utc_offset), *columns
+    )
+
+
+class ObservationRing:
+    """One station's most recent observations, oldest overwritten."""
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.int64)
+        self.utc_offset = np.zeros(capacity, dtype=np.int32)
+        self.values = np.full((capacity, len(VALUE_FIELDS)), np.nan, dtype=np.float32)
+        self.pos = 0
+        self.size = 0
+
+    @property
+    def last_ts(self) -> int | None:
+        return int(self.ts[self.pos - 1]) if self.size else None
+
+    def extend(
+        self, ts: np.ndarray, utc_offset: np.ndarray, values: np.ndarray
+    ) -> None:
+        n = len(ts)
+        if n > self.capacity:
+            ts, utc_offset, values = (
+                ts[-self.capacity :],
+                utc_offset[-self.capacity :],
+                values[-self.capacity :],
+            )
+            n = self.capacity
+        idx = (self.pos + np.arange(n)) % self.capacity
+        self.ts[idx] = ts
+        self.utc_offset[idx] = utc_offset
+        self.values[idx] = values
+        self.pos = (self.pos + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def recent(self, n: int | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(ts, utc_offset, values) of the newest `n` observations (all if None), oldest first."""
+        n = self.size if n is None else min(n, self.size)
+        idx = (self.pos - n + np.arange(n)) % self.capacity
+        return self.ts[idx], self.utc_offset[idx], self.values[idx]
+
+
+class SensorBuffers:
+    """ObservationRings by station, fed only with observations newer than each ring's last."""
+
+    def __init__(self, stations: Iterable[str], capacity: int = 1024):
+        self.capacity = capacity
+        self.rings: Dict[str, ObservationRing] = {
+            s: ObservationRing(capacity) for s in stations
+        }
+
+    def last_ts(self) -> Dict[str, int | None]:
+        return {s: r.last_ts for s, r in self.rings.items()}
+
+    def ingest(
+        self,
+        station: str,
+        times: Sequence[str],
+        columns: Sequence[Sequence[float | None] | None],
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Appends the observations newer than the station's last one (`columns` in
+        VALUE_FIELDS order) and returns them as (ts, utc_offset, values) arrays.
+        """
+        ring = self.rings.get(station)
+        if ring is None:
+            ring = self.rings[station] = ObservationRing(self.capacity)
+        ts, utc_offset = parse_times(times)
+        values = to_values(columns, len(ts))
+        last = ring.last_ts
+        if last is not None:
+            keep = ts > last
+            ts, utc_offset, values = ts[keep], utc_offset[keep], values[keep]
+        if len(ts):
+            ring.extend(ts, utc_offset, values)
+        return ts, utc_offset, values
+
+
+def encode_runs(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Run-length encoding of a float series: (start index, length) of every run of equal
+    values. Consecutive NaNs form one run.
+    """
+    n = len(values)
+    if not n:
+        return np.zeros(0, np.intp), np.zeros(0, np.intp)
+    missing = np.isnan(values)
+    change = np.empty(n, dtype=bool)
+    change[0] = True
+    change[1:] = (values[1:] != values[:-1]) & ~(missing[1:] & missing[:-1])
+    starts = np.flatnonzero(change)
+    return starts, np.diff(np.append(starts, n))
+
+
+class RunLengthEncoder:
+    """
+    (start label, value) runs over a station's newest `window` readings, kept up to date as
+    readings arrive instead of re-encoded from the window on every packet.
+
+    A missing reading (None) ends the current run and is not reported itself, so the value
+    after a gap always starts a new run. `delta()` reports what changed since the previous
+    `delta()` as {"drop": runs to remove from the front, "head": the first run if its start
+    moved, "runs": runs to append}; readings that only lengthen the last run change nothing
+    a reader can see. The first delta lists every run.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.labels: deque = deque()  # one per reading in the window, oldest first
+        self.runs: deque = (
+            deque()
+        )  # [start label, value, length, id]; id is None for gaps
+        self._next_id = 0
+        # what readers hold: the runs with ids in [_sent_start, _sent_end)
+        self._sent_start = self._sent_end = 0
+        self._head_moved = (
+            False  # the first visible run lost readings since it was sent
+        )
+
+    def extend(self, labels: Sequence[str], values: np.ndarray) -> None:
+        """Appends readings (float values, NaN for missing); amortized O(1) per reading."""
+        if len(values) >= self.window:  # the window is all new: re-encode it in bulk
+            labels, values = labels[-self.window :], values[-self.window :]
+            self.labels.clear()
+            self.runs.clear()
+        starts, lengths = encode_runs(values)
+        for start, length in zip(starts.tolist(), lengths.tolist()):
+            value = values[start]
+            value = None if value != value else float(value)
+            last = self.runs[-1] if self.runs else None
+            if last is not None and last[1] == value:
+                last[2] += length
+            else:
+                self.runs.append(
+                    [
+                        labels[start],
+                        value,
+                        length,
+                        self._new_id() if value is not None else None,
+                    ]
+                )
+        self.labels.extend(labels)
+        self._evict(len(self.labels) - self.window)
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id - 1
+
+    def _evict(self, n: int) -> None:
+        if n <= 0:
+            return
+        for _ in range(n):
+            self.labels.popleft()
+        while n:
+            head = self.runs[0]
+            if head[2] <= n:
+                n -= head[2]
+                self.runs.popleft()
+                self._head_moved = False
+            else:
+                head[2] -= n
+                head[0] = self.labels[0]
+                self._head_moved = head[3] is not None
+                n = 0
+
+    def _head(self) -> list | None:
+        # gaps never follow gaps, so the first visible run is one of the first two
+        for run in islice(self.runs, 2):
+            if run[3] is not None:
+                return run
+        return None
+
+    def snapshot(self) -> List[tuple]:
+        """Every visible run, oldest first (what the deltas so far add up to, after `delta()`)."""
+        return [(run[0], run[1]) for run in self.runs if run[3] is not None]
+
+    def delta(self) -> Dict[str, Any] | None:
+        """Changes since the last delta, or None if there are none."""
+        head = self._head()
+        first = head[3] if head else self._next_id
+        drop = min(first, self._sent_end) - self._sent_start
+        added = []
+        for run in reversed(self.runs):
+            if run[3] is None:
+                continue
+            if run[3] < self._sent_end:
+                break
+            added.append((run[0], run[1]))
+        added.reverse()
+        moved = self._head_moved and head is not None and head[3] < self._sent_end
+        self._sent_start, self._sent_end = first, self._next_id
+        self._head_moved = False
+        if not (drop or added or moved):
+            return None
+        packet: Dict[str, Any] = {"drop": drop, "runs": added}
+        if moved:
+            packet["head"] = (head[0], head[1])
+        return packet
@@ -0,0 +1,264 @@
+"""
+Shared SQLite storage: one long-lived connection per database file, written behind.
+
+Producers never touch a connection. `Database.write` / `write_many` append rows to an
+in-memory queue (grouped by statement) and return immediately; the database's writer
+task drains the queue with executemany in one transaction every `flush_interval`
+seconds, or as soon as `batch_size` rows are waiting. Every connection is opened with
+PRAGMAS (WAL, synchronous=NORMAL, mmap, a larger page cache), and each database reports
+commit latency percentiles and rows per second.
+
+    storage = StorageService()
+    weather = storage.database(os.getenv("WEATHER_DB_PATH"), CREATE_TABLE_SQL)
+    weather.write_many(INSERT_ROW_SQL, rows)
+    await storage.run()   # writer tasks for every database, plus periodic stats
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Dict, Iterable
+
+import aiosqlite
+
+logger = logging.getLogger("storage")
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # durable at checkpoints; a power cut can lose the last commits
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # KiB
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,  # ms; other processes (merge scripts, reports) read the same files
+}
+
+
+class Database:
+    def __init__(
+        self,
+        path: str,
+        ddl: str = "",
+        pragmas: Dict[str, Any] | None = None,
+        flush_interval: float = 0.5,
+        batch_size: int = 1000,
+        max_pending: int = 200_000,
+    ):
+        self.path = path
+        self.ddl = [ddl] if ddl else []
+        self.pragmas = {**PRAGMAS, **(pragmas or {})}
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.conn: aiosqlite.Connection | None = None
+        self._applied_ddl = 0
+        self.pending: Dict[str, list] = defaultdict(list)
+        self.pending_rows = 0
+        # id of the batch rows written now will commit in; listeners hear (batch, committed)
+        self.batch = 0
+        self.flush_listeners: list[Callable[[int, bool], None]] = []
+        self._full = asyncio.Event()
+        self._open_lock = asyncio.Lock()
+        self.counters = {"rows": 0, "commits": 0, "errors": 0, "dropped": 0}
+        self.commit_ms: deque = deque(maxlen=1000)
+        self.flushed: deque = deque(maxlen=1000)  # (monotonic time, rows) per commit
+
+    # ---------- producers ----------
+    def write(self, sql: str, row: Iterable | Dict) -> None:
+        """Queues one row (a tuple, or a dict for named parameters)."""
+        if self.pending_rows >= self.max_pending:
+            self.counters["dropped"] += 1
+            return
+        self.pending[sql].append(row)
+        self.pending_rows += 1
+        if self.pending_rows >= self.batch_size:
+            self._full.set()
+
+    def write_many(self, sql: str, rows: Iterable) -> None:
+        room = self.max_pending - self.pending_rows
+        batch = self.pending[sql]
+        before = len(batch)
+        batch.extend(rows)
+        added = len(batch) - before
+        if added > room:
+            del batch[before + max(room, 0) :]
+            self.counters["dropped"] += added - max(room, 0)
+            added = max(room, 0)
+        self.pending_rows += added
+        if self.pending_rows >= self.batch_size:
+            self._full.set()
+
+    # ---------- connection ----------
+    def add_ddl(self, ddl: str) -> None:
+        """Schema to create on open, or on the next flush if the connection is already open."""
+        if ddl and ddl not in self.ddl:
+            self.ddl.append(ddl)
+
+    async def open(self) -> aiosqlite.Connection:
+        async with self._open_lock:
+            if self.conn is None:
+                conn = await aiosqlite.connect(self.path)
+                for name, value in self.pragmas.items():
+                    await conn.execute(f"PRAGMA {name}={value}")
+                self.conn = conn
+                await self._apply_ddl()
+        return self.conn
+
+    async def _apply_ddl(self) -> None:
+        for ddl in self.ddl[self._applied_ddl :]:
+            await self.conn.executescript(ddl)
+        await self.conn.commit()
+        self._applied_ddl = len(self.ddl)
+
+    async def close(self) -> None:
+        if self.conn is not None:
+            await self.flush()
+            await self.conn.close()
+            self.conn = None
+            self._applied_ddl = 0
+
+    async def fetchall(self, sql: str, params: Iterable | Dict = ()) -> list:
+        """Reads on the writer's connection (sees rows committed so far, not queued ones)."""
+        conn = await self.open()
+        async with conn.execute(sql, params) as cursor:
+            return await cursor.fetchall()
+
+    # ---------- writer ----------
+    async def run(self) -> None:
+        await self.open()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(
+                        self._full.wait(), timeout=self.flush_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                await self.flush()
+        finally:
+            await self.close()
+
+    async def flush(self) -> None:
+        self._full.clear()
+        conn = await self.open()
+        if self._applied_ddl < len(self.ddl):
+            await self._apply_ddl()
+        if not self.pending:
+            return
+        pending, rows, batch_id = self.pending, self.pending_rows, self.batch
+        self.pending, self.pending_rows = defaultdict(list), 0
+        self.batch += 1
+        start = time.perf_counter()
+        try:
+            for sql, batch in pending.items():
+                await conn.executemany(sql, batch)
+            await conn.commit()
+        except Exception:
+            self.counters["errors"] += 1
+            self.counters["dropped"] += rows
+            logger.exception("Failed to write %d rows to %s", rows, self.path)
+            try:
+                await conn.rollback()
+            except Exception:
+                pass
+            self._notify(batch_id, False)
+            return
+        self.commit_ms.append((time.perf_counter() - start) * 1000)
+        self.flushed.append((time.monotonic(), rows))
+        self.counters["rows"] += rows
+        self.counters["commits"] += 1
+        self._notify(batch_id, True)
+
+    def _notify(self, batch: int, committed: bool) -> None:
+        for listener in self.flush_listeners:
+            try:
+                listener(batch, committed)
+            except Exception:
+                logger.exception("Flush listener failed for %s", self.path)
+
+    def stats(self, window: float = 60.0) -> Dict:
+        ordered = sorted(self.commit_ms)
+
+        def pct(q):
+            return (
+                round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+                if ordered
+                else None
+            )
+
+        now = time.monotonic()
+        recent = sum(rows for t, rows in self.flushed if now - t <= window)
+        return {
+            **self.counters,
+            "pending": self.pending_rows,
+            "commit_ms": {
+                "p50": pct(0.5),
+                "p99": pct(0.99),
+                "max": round(ordered[-1], 3) if ordered else None,
+            },
+            "rows_per_sec": round(recent / window, 1),
+        }
+
+
+class StorageService:
+    """
+    The process's databases, one Database per file. Components ask for theirs with
+    `database(path, ddl)` (the same path always returns the same Database) and the entry
+    point runs `run()` once for all of them. A database asked for while the service runs
+    gets its writer started right away.
+    """
+
+    def __init__(self, report_interval: float = 60.0, **defaults: Any):
+        self.report_interval = report_interval
+        self.defaults = defaults
+        self.databases: Dict[str, Database] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.running = False
+
+    def database(self, path: str, ddl: str = "", **kwargs: Any) -> Database:
+        db = self.databases.get(path)
+        if db is None:
+            db = self.databases[path] = Database(
+                path, ddl, **{**self.defaults, **kwargs}
+            )
+            if self.running:
+                self._start(path, db)
+        else:
+            db.add_ddl(ddl)
+        return db
+
+    def _start(self, path: str, db: Database) -> None:
+        self.tasks[path] = asyncio.create_task(db.run(), name=f"storage:{path}")
+
+    async def run(self) -> None:
+        self.running = True
+        for path, db in self.databases.items():
+            if path not in self.tasks:
+                self._start(path, db)
+        try:
+            while True:
+                await asyncio.sleep(self.report_interval)
+                self.log_stats()
+        finally:
+            self.running = False
+            tasks = list(self.tasks.values())
+            self.tasks.clear()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Dict]:
+        return {path: db.stats() for path, db in self.databases.items()}
+
+    def log_stats(self) -> None:
+        for path, s in self.stats().items():
+            logger.info(
+                "%s: %d rows in %d commits, %.1f rows/s, commit p50 %sms p99 %sms, %d pending, %d dropped",
+                path,
+                s["rows"],
+                s["commits"],
+                s["rows_per_sec"],
+                s["commit_ms"]["p50"],
+                s["commit_ms"]["p99"],
+                s["pending"],
+                s["dropped"],
+            )
@@ -0,0 +1,217 @@
+import abc
+import asyncio
+import logging
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Dict, Iterable
+
+import aiosqlite
+
+from journal import JOURNAL_DDL, TradeJournal
+from order_manager import OrderIntent, OrderManager
+from portfolio_state import PortfolioState
+from risk import RiskEngine
+
+logger = logging.getLogger("strategy_host")
+
+
+def parse_top(level: str) -> int:
+    """'63@120' -> 63; 'N/A' -> -1."""
+    return -1 if level == "N/A" else int(level.split("@", 1)[0])
+
+
+class Strategy(abc.ABC):
+    """
+    Base class for strategies run by a StrategyHost.
+
+    Subclasses set `tickers` and implement `on_book`, which is only called for those
+    tickers. Positions returned by `position` are this strategy's own (its rows in the
+    `strategy` column of the orders DB), not the account-wide position.
+    """
+
+    name = "Strategy"
+
+    def __init__(self, tickers: Iterable[str] = (), name: str | None = None):
+        self.tickers = set(tickers)
+        if name is not None:
+            self.name = name
+        self.host: "StrategyHost | None" = None
+
+    def position(self, ticker: str) -> int:
+        return self.host.positions[self.name].get(ticker, 0)
+
+    def submit(self, ticker: str, qty: int, price: int) -> bool:
+        return self.host.execute(self, ticker, qty, price)
+
+    @abc.abstractmethod
+    def on_book(self, ticker: str, p_yes: int, p_no: int) -> None:
+        """Top-of-book update; prices are the cost to buy each side in cents, -1 if there is no offer."""
+
+
+class StrategyHost:
+    """
+    Runs many strategies on one orderbook feed.
+
+    A ticker -> strategies index is rebuilt whenever a strategy is added or removed, so an
+    update is parsed once and dispatched only to the strategies trading that ticker.
+    Each strategy has its own position book, keyed by its name, and its own on_book
+    latency samples. Orders go through the OrderManager when one is given; otherwise
+    they are filled on paper at the quoted price.
+    """
+
+    def __init__(
+        self,
+        portfolio: PortfolioState | None = None,
+        orders: OrderManager | None = None,
+        db_file: str | None = None,
+        risk: RiskEngine | None = None,
+        journal: TradeJournal | None = None,
+    ):
+        self.portfolio = portfolio
+        self.orders = orders
+        self.db_file = db_file
+        # with an OrderManager, limits are enforced by its RiskEngine
+        self.risk = risk if risk is not None else getattr(orders, "risk", None)
+        self.journal = (
+            journal if journal is not None else getattr(orders, "journal", None)
+        )
+        self.strategies: Dict[str, Strategy] = {}
+        self.index: Dict[str, tuple[Strategy, ...]] = {}
+        self.positions: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.latency_ns: Dict[str, deque] = defaultdict(lambda: deque(maxlen=10_000))
+        self.counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"updates": 0, "orders": 0, "errors": 0}
+        )
+        if orders is not None:
+            orders.fill_listeners.append(self._on_order_fill)
+
+    # ---------- registry ----------
+    def add(self, strategy: Strategy) -> None:
+        if strategy.name in self.strategies:
+            raise ValueError(f"Duplicate strategy name {strategy.name}")
+        strategy.host = self
+        self.strategies[strategy.name] = strategy
+        self._reindex()
+
+    def remove(self, name: str) -> None:
+        self.strategies.pop(name).host = None
+        self._reindex()
+
+    def _reindex(self) -> None:
+        index = defaultdict(list)
+        for strategy in self.strategies.values():
+            for ticker in strategy.tickers:
+                index[ticker].append(strategy)
+        self.index = {ticker: tuple(strategies) for ticker, strategies in index.items()}
+
+    def tickers(self) -> set[str]:
+        return set(self.index)
+
+    async def load_positions(self) -> None:
+        """Restores every strategy's positions from the `positions` table."""
+        sql = "SELECT strategy, ticker, SUM(quantity) FROM positions GROUP BY strategy, ticker"
+        if self.journal is not None:
+            rows = await self.journal.db.fetchall(
+                sql
+            )  # the journal's long-lived connection
+        elif self.db_file:
+            async with aiosqlite.connect(self.db_file) as conn:
+                await conn.executescript(JOURNAL_DDL)
+                async with conn.execute(sql) as cur:
+                    rows = await cur.fetchall()
+        else:
+            return
+        for strategy, ticker, qty in rows:
+            if qty:
+                self.positions[strategy][ticker] = qty
+        logger.info("Loaded positions for %d strategies", len(self.positions))
+
+    # ---------- hot path ----------
+    async def on_message(self, message: Dict) -> None:
+        if message.get("type") != "orderbook":
+            return
+        msg = message["data"]
+        strategies = self.index.get(msg["ticker"])
+        if not strategies:
+            return
+        ticker = msg["ticker"]
+        p_yes = parse_top(msg["yes"])
+        p_no = parse_top(msg["no"])
+        for strategy in strategies:
+            start = time.perf_counter_ns()
+            try:
+                strategy.on_book(ticker, p_yes, p_no)
+            except Exception:
+                self.counters[strategy.name]["errors"] += 1
+                logger.exception("%s failed on %s", strategy.name, ticker)
+            self.latency_ns[strategy.name].append(time.perf_counter_ns() - start)
+            self.counters[strategy.name]["updates"] += 1
+
+    def execute(self, strategy: Strategy, ticker: str, qty: int, price: int) -> bool:
+        if (
+            self.risk is None
+            and self.portfolio is not None
+            and self.portfolio.balance <= abs(qty) * 100
+        ):
+            logger.debug("%s %s: insufficient balance", strategy.name, ticker)
+            return False
+        if self.orders is not None:
+            if not self.orders.submit(OrderIntent(strategy.name, ticker, qty, price)):
+                return False
+        else:
+            if (
+                self.risk is not None
+                and not self.risk.check(strategy.name, ticker, qty, price)[0]
+            ):
+                return False
+            logger.info("%s paper order %s %+d @ %d", strategy.name, ticker, qty, price)
+            if self.journal is not None:
+                order_id = str(uuid.uuid4())
+                self.journal.order(strategy.name, ticker, price, qty, order_id)
+                self.journal.position(strategy.name, ticker, price, qty, order_id)
+            self._apply(strategy.name, ticker, qty)
+            if self.portfolio is not None:
+                self.portfolio.apply_fill(ticker, qty, price)
+            if self.risk is not None:
+                self.risk.apply_fill(strategy.name, ticker, qty, price)
+        self.counters[strategy.name]["orders"] += 1
+        return True
+
+    def _apply(self, strategy: str, ticker: str, qty: int) -> None:
+        book = self.positions[strategy]
+        new = book.get(ticker, 0) + qty
+        if new:
+            book[ticker] = new
+        else:
+            book.pop(ticker, None)
+
+    def _on_order_fill(self, intent: OrderIntent, qty: int, price: int) -> None:
+        self._apply(intent.strategy, intent.ticker, qty)
+
+    # ---------- driving ----------
+    async def run(self, queue: asyncio.Queue) -> None:
+        """Consumes orderbook messages from `queue` (e.g. one filled by KalshiOrderBook)."""
+        while True:
+            await self.on_message(await queue.get())
+
+    def stats(self) -> Dict[str, Dict]:
+        def pct(values, q):
+            ordered = sorted(values)
+            return (
+                round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] / 1_000, 1)
+                if ordered
+                else None
+            )
+
+        return {
+            name: {
+                **self.counters[name],
+                "positions": len(self.positions[name]),
+                "on_book_us": {
+                    "p50": pct(self.latency_ns[name], 0.5),
+                    "p99": pct(self.latency_ns[name], 0.99),
+                },
+            }
+            for name in self.strategies
+        }
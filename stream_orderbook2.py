@@ -1,5 +1,5 @@
 #!.venv/bin/python
-import os,base64
+import os
 import functools
 import json
 import time
@@ -14,29 +14,38 @@ import websockets
 
 import requests
 from sortedcontainers import SortedDict
-from cryptography.hazmat.primitives import serialization, hashes
-from cryptography.hazmat.primitives.asymmetric import padding
+
+from kalshi_ref import KalshiWebSocketClient, Subscription
+from microstructure import Microstructure
+from trade_tape import TradeTape
+import loop_monitor
 
 
 class KalshiOrderBook:
 
-    def __init__(self, queue: asyncio.Queue, tickers: list[str]):
+    def __init__(
+        self,
+        queue: asyncio.Queue,
+        tickers: list[str],
+        client: KalshiWebSocketClient | None = None,
+        analytics: Microstructure | None = None,
+        publish_metrics: bool = False,
+    ):
         self.queue = queue
         self.tickers = tickers
 
-        self.url = "wss://api.elections.kalshi.com/trade-api/ws/v2"
-        self.ws: websockets.WebSocketClientProtocol | None = None
+        # Optional per-ticker microstructure metrics, fed on every snapshot/delta and
+        # attached to the top-of-book payload as "metrics" when publish_metrics is set.
+        self.analytics = analytics
+        self.publish_metrics = publish_metrics
 
-        self.reconnect_delay = 1
-        self.max_reconnect_delay = 60
+        # Shared upstream connection; run() creates a private one if none is given.
+        self.client = client
+        self.subscription: Subscription | None = None
 
         # Map: market_ticker -> {market_id, yes: SortedDict, no: SortedDict}
         self.books: Dict[str, Dict[str, Any]] = {}
 
-        self.orderbook_delta_id: int | None = None
-
-        self.unsubscribed_event = asyncio.Event()
-
     def _process_snapshot(self, msg: Dict[str, Any]) -> None:
         try:
             ticker = msg["market_ticker"]
@@ -101,6 +110,8 @@ class KalshiOrderBook:
                 yes_str = "N/A"
 
             payload = {"ticker": ticker, "no": no_str, "yes": yes_str}
+            if self.publish_metrics and self.analytics is not None:
+                payload["metrics"] = self.analytics.metrics(ticker)
 
             try:
                 self.queue.put_nowait({"type": "orderbook", "data": payload})
@@ -110,140 +121,65 @@ class KalshiOrderBook:
         except Exception:
             logging.exception("Error emitting top-of-book for %s", ticker)
 
-    @staticmethod
-    def _sign(priv_key, text: str) -> str:
-        sig = priv_key.sign(
-            text.encode(),
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.DIGEST_LENGTH,
-            ),
-            hashes.SHA256(),
-        )
-        return base64.b64encode(sig).decode()
-
-    def _auth_headers(self, priv_key) -> Dict[str, str]:
-        ts = str(int(time.time() * 1000))
-        sig = self._sign(priv_key, ts + "GET" + "/trade-api/ws/v2")
-        try:
-            access_key = os.environ["PROD_KEYID"]
-        except KeyError:
-            logging.error("Environment variable PROD_KEYID not set")
-            raise
-        return {
-            "KALSHI-ACCESS-KEY": access_key,
-            "KALSHI-ACCESS-SIGNATURE": sig,
-            "KALSHI-ACCESS-TIMESTAMP": ts,
-        }
+    async def on_book_message(self, data: Dict[str, Any]) -> None:
+        msg = data.get("msg", {})
+        typ = data.get("type")
+        if typ == "orderbook_snapshot":
+            self._process_snapshot(msg)
+        elif typ == "orderbook_delta":
+            self._process_delta(msg)
+        else:
+            logging.debug("Upstream message of unknown type: %s", data)
+            return
+        ticker = msg.get("market_ticker", "unknown")
+        if self.analytics is not None and ticker in self.books:
+            self.analytics.update(ticker, self.books[ticker]["yes"], self.books[ticker]["no"])
+        self._emit_top(ticker)
 
     async def _resubscribe(self) -> None:
-        if self.ws is None:
-            logging.debug("No upstream websocket to resubscribe on")
+        """Re-requests snapshots for our tickers, e.g. when a new browser connects."""
+        if self.client is None or self.subscription is None:
+            logging.debug("No upstream subscription to resubscribe")
             return
         try:
-            # websockets.protocol.State may vary depending on version; guard with attribute checks
-            if getattr(self.ws, "state", None) is not None and self.ws.state != websockets.protocol.State.OPEN:
-                logging.debug("Upstream websocket not open; skipping resubscribe")
-                return
-            if self.orderbook_delta_id is not None:
-                self.unsubscribed_event.clear()
-                await self.ws.send(
-                    json.dumps(
-                        {
-                            "id": 1,
-                            "cmd": "unsubscribe",
-                            "params": {
-                                "sids": [self.orderbook_delta_id],
-                                "market_tickers": self.tickers,
-                                "action": "remove",
-                            },
-                        }
-                    )
-                )
-                await asyncio.wait_for(self.unsubscribed_event.wait(),timeout=5)
-
-
-            await self.ws.send(
-                json.dumps(
-                    {
-                        "id": 1,
-                        "cmd": "subscribe",
-                        "params": {
-                            "channels": ["orderbook_delta"],
-                            "market_tickers": self.tickers,
-                        },
-                    }
-                )
-            )
-        except (websockets.exceptions.ConnectionClosed, OSError) as e:
+            await self.client.resubscribe(self.subscription)
+        except (websockets.exceptions.ConnectionClosed, ConnectionError, OSError) as e:
             logging.warning("Cannot resubscribe, upstream ws closed: %s", e)
         except Exception:
             logging.exception("Unexpected error while resubscribing")
 
     async def run(self) -> None:
-        priv_path = os.environ.get("PROD_KEYFILE")
-        if not priv_path:
-            logging.error("PROD_KEYFILE env var not set; orderbook task exiting")
-            return
+        owns_client = self.client is None
+        if owns_client:
+            try:
+                self.client = KalshiWebSocketClient.from_env()
+            except KeyError as e:
+                logging.error("Environment variable %s not set; orderbook task exiting", e)
+                return
+            except Exception:
+                logging.exception("Failed to load private key; orderbook task exiting")
+                return
 
-        try:
-            with open(priv_path, "rb") as f:
-                priv_key = serialization.load_pem_private_key(f.read(), password=None)
-        except Exception:
-            logging.exception("Failed to load private key from %s; orderbook task exiting", priv_path)
-            return
+        (self.subscription,) = await self.client.subscribe(["orderbook_delta"], self.tickers, self.on_book_message)
+        if owns_client:
+            await self.client.run()
+
+class SnapshotSource(Protocol):
+    """A producer of sequence-numbered delta packets (SensorPoll, ForecastPoll)."""
+
+    async def snapshot(self, site: str | None = None) -> list: ...
 
-        delay = self.reconnect_delay
-        while True:
-            try:
-                # compute headers at each connect attempt so signature/timestamp are fresh
-                headers = self._auth_headers(priv_key)
-
-                async with websockets.connect(self.url, additional_headers=headers) as ws:
-                    self.ws = ws
-                    logging.info("WebSocket connected")
-                    delay = self.reconnect_delay  # reset backoff
-
-                    await self._resubscribe()
-
-                    async for raw in ws:
-                        try:
-                            data = json.loads(raw)
-                        except json.JSONDecodeError:
-                            logging.exception("Failed to decode JSON from upstream: %s", raw)
-                            continue
-
-                        msg = data.get("msg", {})
-                        typ = data.get("type")
-
-                        if typ == "subscribed" and msg.get("channel") == "orderbook_delta":
-                            self.orderbook_delta_id = msg.get("sid")
-                            self.unsubscribed_event.clear()
-                        elif typ == "unsubscribed":
-                            self.unsubscribed_event.set()
-                        elif typ == "orderbook_snapshot":
-                            self._process_snapshot(msg)
-                            self._emit_top(msg.get("market_ticker", "unknown"))
-                        elif typ == "orderbook_delta":
-                            self._process_delta(msg)
-                            self._emit_top(msg.get("market_ticker", "unknown"))
-                        else:
-                            # unrecognized message type; log at debug level
-                            logging.debug("Upstream message of unknown type: %s", data)
-
-            except (websockets.ConnectionClosed, OSError, asyncio.TimeoutError) as exc:
-                logging.warning("WebSocket closed (%s); reconnecting in %ss", exc, delay)
-                await asyncio.sleep(delay)
-                delay = min(delay * 2, self.max_reconnect_delay)
-            except Exception as e:
-                logging.error(e)
-                raise
 
 class Manager:
     def __init__(self, queue: asyncio.Queue):
         self.queue = queue
         self.server: Server | None = None
         self.connections: set[ServerConnection] = set()
+        self.sources: Dict[str, SnapshotSource] = {}  # packet type -> producer
+
+    def add_source(self, source: SnapshotSource) -> None:
+        """Lets browsers ask `source` for snapshots of the packets it publishes."""
+        self.sources[source.__class__.__name__] = source
 
     async def handler(self, websocket: ServerConnection) -> None:
         self.connections.add(websocket)
@@ -251,12 +187,35 @@ class Manager:
             asyncio.create_task(kalshi_orderbook._resubscribe())
         try:
             async for message in websocket:
-                pass  # ignore inbound messages
+                await self.on_message(websocket, message)
         except websockets.exceptions.ConnectionClosed:
             pass
         finally:
             self.connections.discard(websocket)
 
+    async def on_message(self, websocket: ServerConnection, message) -> None:
+        """
+        Handles {"type": "snapshot", "source": <packet type>, "site": <site>}: sends the
+        matching full packets to this connection only. Without `source` every source
+        answers; without `site` every site. Other messages are ignored.
+        """
+        try:
+            request = json.loads(message)
+        except ValueError:
+            return
+        if not isinstance(request, dict) or request.get("type") != "snapshot":
+            return
+        name = request.get("source")
+        sources = [self.sources[name]] if name in self.sources else [] if name else list(self.sources.values())
+        for source in sources:
+            try:
+                packets = await source.snapshot(request.get("site"))
+            except Exception:
+                logging.exception("snapshot from %s failed", source.__class__.__name__)
+                continue
+            for packet in packets:
+                await websocket.send(json.dumps(packet))
+
     async def broadcast(self,msg) -> None:
         for websocket in self.connections.copy():
             try:
@@ -297,12 +256,13 @@ class Manager:
 
 async def main():
     logging.basicConfig(level=logging.INFO)
+    monitor_task = loop_monitor.start_from_env()
 
     tickers = []
     try:
         for series in ("KXWTAMATCH", "KXMLBGAME"):
             r = requests.get(
-                "https://api.elections.kalshi.com/trade-api/v2/markets",
+                os.getenv("KALSHI_API_URL", "https://api.elections.kalshi.com") + "/trade-api/v2/markets",
                 params={"series_ticker": series, "status": "open"},
                 timeout=5,
             )
@@ -315,11 +275,29 @@ async def main():
 
     q: asyncio.Queue = asyncio.Queue()
     m = Manager(q)
-    kalshi_orderbook = KalshiOrderBook(q, tickers)
-    m._ob = kalshi_orderbook
-    ob_task = asyncio.create_task(kalshi_orderbook.run(), name="kalshi_orderbook")
-    relay_task = asyncio.create_task(m.start_server(), name="relay")
-    await asyncio.gather(relay_task,ob_task)
+    # without credentials only the upstream tasks exit; the relay keeps serving the pollers
+    try:
+        client = KalshiWebSocketClient.from_env()
+    except KeyError as e:
+        logging.error("Environment variable %s not set; orderbook and trade tape disabled", e)
+        client = None
+    except Exception:
+        logging.exception("Failed to load private key; orderbook and trade tape disabled")
+        client = None
+    try:
+        tasks = [asyncio.create_task(m.start_server(), name="relay")]
+        if client is not None:
+            analytics = Microstructure(tickers) if os.getenv("PUBLISH_METRICS") else None
+            kalshi_orderbook = KalshiOrderBook(q, tickers, client, analytics, publish_metrics=analytics is not None)
+            m._ob = kalshi_orderbook
+            tasks.append(asyncio.create_task(kalshi_orderbook.run(), name="kalshi_orderbook"))
+            tape = TradeTape(db_file=os.getenv("TRADES_DB_PATH"))
+            await tape.subscribe(client, tickers)
+            tasks.append(asyncio.create_task(tape.run(), name="trade_tape"))
+            tasks.append(asyncio.create_task(client.run(), name="kalshi_ws"))
+        await asyncio.gather(*tasks)
+    finally:
+        await loop_monitor.stop(monitor_task)
 
 if __name__ == "__main__":
     try:
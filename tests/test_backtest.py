@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from backtest import simulate_ticker
+
+
+def arrays(ts, p_yes, p_no):
+    return (
+        np.array(ts, np.float64),
+        np.array(p_yes, np.int64),
+        np.array(p_no, np.int64),
+    )
+
+
+def test_trades_where_the_cheaper_side_changes():
+    ts, p_yes, p_no = arrays([0, 1, 2, 3], [10, 12, 90, 88], [90, 88, 10, 12])
+    r = simulate_ticker(ts, p_yes, p_no, max_price=95, min_spread=50, result="yes")
+    # short 1 (buy no at 90), then flip long (buy 2 yes at 90)
+    assert r["trades"] == 2
+    assert r["contracts"] == 3
+    assert r["final_pos"] == 1
+    assert r["capital"] == pytest.approx(90 + 2 * 90)
+    assert r["pnl"] == pytest.approx(2 * 100 - 270)
+
+
+def test_untradable_quotes_are_skipped():
+    ts, p_yes, p_no = arrays([0, 1, 2], [-1, 97, 40], [10, 5, 45])
+    r = simulate_ticker(ts, p_yes, p_no, max_price=95, min_spread=50)
+    assert r["trades"] == 0
+    assert r["pnl"] == 0
+
+
+def test_latency_fills_at_the_quote_in_force_not_the_next_one():
+    # buy no at t=0; at t=0.5 the t=0 quote (90) is still the one in force
+    ts, p_yes, p_no = arrays([0, 60], [10, 10], [90, 40])
+    r = simulate_ticker(ts, p_yes, p_no, max_price=95, min_spread=50, latency=0.5)
+    assert r["trades"] == 1
+    assert r["capital"] == pytest.approx(90)
+
+
+def test_latency_fills_at_a_later_quote_once_it_is_posted():
+    ts, p_yes, p_no = arrays([0, 0.2, 60], [10, 10, 10], [90, 80, 40])
+    r = simulate_ticker(ts, p_yes, p_no, max_price=95, min_spread=50, latency=0.5)
+    assert r["capital"] == pytest.approx(80)
+
+
+def test_fee_is_charged_per_contract():
+    ts, p_yes, p_no = arrays([0], [90], [10])
+    r = simulate_ticker(ts, p_yes, p_no, max_price=95, min_spread=50, fee=1.5)
+    assert r["capital"] == pytest.approx(91.5)
@@ -0,0 +1,61 @@
+import datetime as dt
+
+from nws_digital import find_table, parse_table
+from script_bench_forecast_parser import synthetic_page
+
+
+def row(label, values):
+    cells = "".join(f"<td>{v}</td>" for v in values)
+    return f"<tr><td><b>{label}</b></td>{cells}</tr>"
+
+
+def test_parse_table_types_columns():
+    table = (
+        "<table>"
+        + "".join(
+            [
+                row("Date", ["08/13", "", ""]),
+                row("Hour (EDT)", ["22", "23", "00"]),
+                row("Temperature (&deg;F)", ["80", "79", ""]),
+                row("Dewpoint (&deg;F)", ["70", "70", "69"]),
+                row("Relative Humidity (%)", ["71", "73.5", "75"]),
+            ]
+        )
+        + "</table>"
+    )
+    columns = parse_table(table, "America/New_York", dt.date(2025, 8, 13))
+    # the hour after 23 is on the next day even though its Date cell is blank
+    assert columns["observation_time"] == [
+        "2025-08-13T22:00:00-0400",
+        "2025-08-13T23:00:00-0400",
+        "2025-08-13T00:00:00-0400",
+    ]
+    assert columns["air_temp"] == [80, 79, None]
+    assert columns["relative_humidity"] == [71, 73.5, 75]
+    assert columns["wind_speed"] == [None, None, None]
+
+
+def test_parse_table_rolls_dates_into_next_year():
+    table = "<table>" + row("Date", ["01/02"]) + row("Hour (EST)", ["05"]) + "</table>"
+    columns = parse_table(table, "America/New_York", dt.date(2025, 12, 30))
+    assert columns["observation_time"] == ["2026-01-02T05:00:00-0500"]
+
+
+def test_parse_table_without_hours_is_none():
+    table = "<table>" + row("Date", ["08/13"]) + "</table>"
+    assert parse_table(table, "America/New_York") is None
+
+
+def test_parse_table_on_a_full_page():
+    page = synthetic_page(dt.datetime(2025, 11, 1, 12), hours=48)
+    columns = parse_table(find_table(page), "America/New_York", dt.date(2025, 11, 1))
+    times = columns["observation_time"]
+    assert len(times) == 48
+    assert all(len(column) == 48 for column in columns.values())
+    # the repeated fall-back hour is read as standard time
+    assert times[12:15] == [
+        "2025-11-02T00:00:00-0400",
+        "2025-11-02T01:00:00-0500",
+        "2025-11-02T02:00:00-0500",
+    ]
+    assert columns["air_temp"][:3] == [60, 61, 62]
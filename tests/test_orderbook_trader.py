@@ -0,0 +1,35 @@
+import numpy as np
+
+from orderbook_trader import MAX_PRICE, MIN_SPREAD, decide_trade, decide_trades
+
+
+def scalar(pos_qty, p_yes, p_no, max_price=MAX_PRICE, min_spread=MIN_SPREAD):
+    """OrderbookTrader's per-ticker filters followed by decide_trade."""
+    if p_yes < 0 or p_no < 0 or p_yes > max_price or p_no > max_price:
+        return 0, 0
+    if abs(p_no - p_yes) < min_spread:
+        return 0, 0
+    qty, price = decide_trade(pos_qty, p_yes, p_no)
+    return qty, price or 0
+
+
+def test_decide_trades_matches_decide_trade():
+    rng = np.random.default_rng(0)
+    n = 20_000
+    pos = rng.integers(-1, 2, n)
+    p_yes = rng.integers(-1, 101, n)
+    p_no = rng.integers(-1, 101, n)
+    for max_price, min_spread in [(MAX_PRICE, MIN_SPREAD), (100, 0), (50, 10)]:
+        qty, price = decide_trades(pos, p_yes, p_no, max_price, min_spread)
+        expected = [
+            scalar(int(q), int(y), int(n_), max_price, min_spread)
+            for q, y, n_ in zip(pos, p_yes, p_no)
+        ]
+        assert qty.tolist() == [e[0] for e in expected]
+        assert price.tolist() == [e[1] for e in expected]
+
+
+def test_decide_trades_holds_at_target_position():
+    qty, price = decide_trades(np.array([1, -1]), np.array([95, 5]), np.array([5, 95]))
+    assert qty.tolist() == [0, 0]
+    assert price.tolist() == [0, 0]
@@ -0,0 +1,50 @@
+from quoting import Quote, QuotePlan, RestingOrder, diff_ticker
+
+
+def order(order_id, action, price, count):
+    return RestingOrder(order_id, "T", action, price, count)
+
+
+def plan_for(resting, desired):
+    plan = QuotePlan()
+    diff_ticker("T", resting, desired, plan)
+    return plan
+
+
+def test_matching_orders_are_kept():
+    plan = plan_for([order("a", "buy", 40, 5)], [Quote("buy", 40, 5)])
+    assert plan.kept == 1
+    assert not plan
+
+
+def test_oversized_order_is_decreased():
+    resting = order("a", "buy", 40, 8)
+    plan = plan_for([resting], [Quote("buy", 40, 5)])
+    assert plan.decreases == [(resting, 3)]
+    assert not (plan.cancels or plan.amends or plan.creates)
+
+
+def test_shortfall_is_topped_up_with_a_new_order():
+    plan = plan_for([order("a", "buy", 40, 3)], [Quote("buy", 40, 5)])
+    assert plan.kept == 1
+    assert plan.creates == [("T", Quote("buy", 40, 2))]
+
+
+def test_leftover_order_is_amended_onto_same_action():
+    resting = order("a", "sell", 60, 5)
+    plan = plan_for([resting], [Quote("sell", 62, 4)])
+    assert plan.amends == [(resting, Quote("sell", 62, 4))]
+    assert not (plan.cancels or plan.creates)
+
+
+def test_unmatched_orders_are_cancelled_and_quotes_created():
+    resting = order("a", "sell", 60, 5)
+    plan = plan_for([resting], [Quote("buy", 40, 5), Quote("buy", 41, 0)])
+    assert plan.cancels == [resting]
+    assert plan.creates == [("T", Quote("buy", 40, 5))]
+
+
+def test_no_desired_quotes_cancels_everything():
+    resting = [order("a", "buy", 40, 5), order("b", "sell", 60, 5)]
+    plan = plan_for(resting, [])
+    assert sorted(o.order_id for o in plan.cancels) == ["a", "b"]
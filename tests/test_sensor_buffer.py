@@ -0,0 +1,56 @@
+import numpy as np
+
+from sensor_buffer import RunLengthEncoder, encode_runs
+
+
+def test_encode_runs():
+    values = np.array([1.0, 1.0, 2.0, np.nan, np.nan, 2.0, 2.0, 3.0])
+    starts, lengths = encode_runs(values)
+    assert starts.tolist() == [0, 2, 3, 5, 7]
+    assert lengths.tolist() == [2, 1, 2, 2, 1]
+    assert [len(a) for a in encode_runs(np.array([]))] == [0, 0]
+
+
+def visible_runs(labels, values):
+    """(start label, value) of each run in a window, re-encoded from scratch."""
+    runs, previous = [], None
+    for label, value in zip(labels, values):
+        if value != value:
+            previous = None
+        elif value != previous:
+            runs.append((label, float(value)))
+            previous = value
+        else:
+            previous = value
+    return runs
+
+
+def apply(runs, delta):
+    """What a reader does with a delta (frontend SensorPoll handling)."""
+    runs = runs[delta["drop"] :]
+    if "head" in delta:
+        runs[0] = delta["head"]
+    return runs + list(delta["runs"])
+
+
+def test_encoder_deltas_track_the_window():
+    rng = np.random.default_rng(1)
+    window = 20
+    encoder = RunLengthEncoder(window)
+    labels, values, reader = [], [], []
+    for step in range(300):
+        n = int(rng.choice([1, 1, 1, 2, 3, window + 2]))
+        new_values = rng.choice([60.0, 61.0, 62.0, np.nan], n, p=[0.4, 0.3, 0.2, 0.1])
+        new_labels = [f"{step:03d}:{i:02d}" for i in range(n)]
+        encoder.extend(new_labels, new_values)
+        labels, values = (labels + new_labels)[-window:], (values + list(new_values))[
+            -window:
+        ]
+
+        delta = encoder.delta()
+        if delta is not None:
+            reader = apply(reader, delta)
+        expected = visible_runs(labels, values)
+        assert encoder.snapshot() == expected
+        assert reader == expected
+    assert encoder.delta() is None
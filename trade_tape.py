@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from kalshi_ref import KalshiHttpClient, KalshiWebSocketClient
+from storage import Database
+
+logger = logging.getLogger("trade_tape")
+
+TRADE_DTYPE = np.dtype(
+    [("ts", "f8"), ("yes_price", "i2"), ("count", "i4"), ("taker_yes", "?")]
+)
+
+BARS_DDL = """
+CREATE TABLE IF NOT EXISTS bars (
+    ticker TEXT NOT NULL,
+    interval INTEGER NOT NULL,
+    start_ts INTEGER NOT NULL,
+    open INTEGER,
+    high INTEGER,
+    low INTEGER,
+    close INTEGER,
+    volume INTEGER,
+    trades INTEGER,
+    PRIMARY KEY (ticker, interval, start_ts)
+);
+"""
+# a closed bar is final: a second write for the same bucket (e.g. a partial bar rebuilt
+# by a backfill after a restart) never overwrites it
+INSERT_BAR_SQL = "INSERT OR IGNORE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+class Tape:
+    """One ticker's most recent trades in a fixed-size structured array (oldest overwritten)."""
+
+    def __init__(self, capacity: int):
+        self.buf = np.zeros(capacity, dtype=TRADE_DTYPE)
+        self.pos = 0
+        self.size = 0
+
+    def append(self, ts: float, yes_price: int, count: int, taker_yes: bool) -> None:
+        self.buf[self.pos] = (ts, yes_price, count, taker_yes)
+        self.pos = (self.pos + 1) % self.buf.size
+        self.size = min(self.size + 1, self.buf.size)
+
+    def view(self) -> np.ndarray:
+        """Trades oldest first (a copy)."""
+        if self.size < self.buf.size:
+            return self.buf[: self.size].copy()
+        return np.concatenate((self.buf[self.pos :], self.buf[: self.pos]))
+
+
+class TradeTape:
+    """
+    Real-time trade tape from the public `trade` channel.
+
+    Each trade is appended to its ticker's ring buffer and folded into the open OHLCV bar
+    for every interval (seconds). A bar closes when a trade lands in a later bucket or,
+    for quiet markets, on the next flush after its bucket ends. A trade for a bucket at or
+    before the last closed one is too late to count and is dropped (`late`). Closed bars
+    are queued every `flush_interval` seconds on a storage.Database when `db` or `db_file`
+    is given.
+    """
+
+    def __init__(
+        self,
+        intervals: Iterable[int] = (60, 300, 3600),
+        capacity: int = 4096,
+        db_file: str | None = None,
+        flush_interval: float = 5.0,
+        db: Database | None = None,
+    ):
+        self.intervals = tuple(intervals)
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        # a Database passed in is shared and run by its owner; one built from db_file is run here
+        if db is not None:
+            db.add_ddl(BARS_DDL)
+        self.db = db or (
+            Database(db_file, BARS_DDL, flush_interval=flush_interval)
+            if db_file
+            else None
+        )
+        self._owns_db = db is None and self.db is not None
+        self.db_file = self.db.path if self.db is not None else None
+        self.tapes: Dict[str, Tape] = {}
+        # (ticker, interval) -> [start, open, high, low, close, volume, trades]
+        self.open_bars: Dict[tuple[str, int], list] = {}
+        self.last_closed: Dict[
+            tuple[str, int], int
+        ] = {}  # (ticker, interval) -> start of last closed bar
+        self.closed: List[tuple] = []
+        self.seen: set[str] = set()
+        self.counters = {
+            "trades": 0,
+            "duplicates": 0,
+            "late": 0,
+            "bars": 0,
+            "flushed": 0,
+        }
+
+    # ---------- ingest ----------
+    def add(
+        self, ticker: str, ts: float, yes_price: int, count: int, taker_yes: bool
+    ) -> None:
+        tape = self.tapes.get(ticker)
+        if tape is None:
+            tape = self.tapes[ticker] = Tape(self.capacity)
+        tape.append(ts, yes_price, count, taker_yes)
+        self.counters["trades"] += 1
+        for interval in self.intervals:
+            start = int(ts // interval * interval)
+            key = (ticker, interval)
+            if start <= self.last_closed.get(key, -1):
+                self.counters["late"] += 1  # its bar has already closed
+                continue
+            bar = self.open_bars.get(key)
+            if bar is not None and bar[0] != start:
+                if start < bar[0]:
+                    self.counters["late"] += 1
+                    continue
+                self._close(key, bar)
+                bar = None
+            if bar is None:
+                self.open_bars[key] = [
+                    start,
+                    yes_price,
+                    yes_price,
+                    yes_price,
+                    yes_price,
+                    count,
+                    1,
+                ]
+            else:
+                bar[2] = max(bar[2], yes_price)
+                bar[3] = min(bar[3], yes_price)
+                bar[4] = yes_price
+                bar[5] += count
+                bar[6] += 1
+
+    def _close(self, key: tuple[str, int], bar: list) -> None:
+        self.closed.append((key[0], key[1], *bar))
+        self.last_closed[key] = bar[0]
+        self.counters["bars"] += 1
+
+    def close_stale(self, now: float | None = None) -> None:
+        now = time.time() if now is None else now
+        for key, bar in list(self.open_bars.items()):
+            if now >= bar[0] + key[1]:
+                self._close(key, bar)
+                del self.open_bars[key]
+
+    async def on_trade(self, data: Dict) -> None:
+        msg = data.get("msg", {})
+        trade_id = msg.get("trade_id")
+        if trade_id is not None:
+            if trade_id in self.seen:
+                self.counters["duplicates"] += 1
+                return
+            self.seen.add(trade_id)
+            if len(self.seen) > 100_000:
+                self.seen.clear()
+        self.add(
+            msg["market_ticker"],
+            msg["ts"],
+            msg["yes_price"],
+            msg["count"],
+            msg["taker_side"] == "yes",
+        )
+
+    async def subscribe(
+        self, client: KalshiWebSocketClient, tickers: list[str] | None = None
+    ) -> None:
+        """Subscribes to trades for `tickers`, or for every market when None."""
+        await client.subscribe(["trade"], tickers, self.on_trade)
+
+    def backfill(self, http: KalshiHttpClient, ticker: str, min_ts: int) -> int:
+        """Loads REST trades since `min_ts` (blocking; run with asyncio.to_thread before subscribing)."""
+        rows, cursor = [], None
+        while True:
+            response = http.get_trades(
+                ticker=ticker, limit=1000, cursor=cursor, min_ts=min_ts
+            )
+            rows.extend(response.get("trades", []))
+            cursor = response.get("cursor")
+            if not cursor:
+                break
+        for t in sorted(rows, key=lambda t: t["ts"]):
+            self.seen.add(t["trade_id"])
+            self.add(
+                ticker, t["ts"], t["yes_price"], t["count"], t["taker_side"] == "yes"
+            )
+        return len(rows)
+
+    # ---------- queries ----------
+    def recent(self, ticker: str) -> np.ndarray:
+        tape = self.tapes.get(ticker)
+        return tape.view() if tape is not None else np.zeros(0, dtype=TRADE_DTYPE)
+
+    def vwap(
+        self, ticker: str, seconds: float, now: float | None = None
+    ) -> float | None:
+        now = time.time() if now is None else now
+        trades = self.recent(ticker)
+        trades = trades[trades["ts"] >= now - seconds]
+        volume = trades["count"].sum()
+        return (
+            float((trades["yes_price"] * trades["count"]).sum() / volume)
+            if volume
+            else None
+        )
+
+    def bars(self, ticker: str, interval: int) -> List[tuple]:
+        """Closed bars not yet flushed plus the open bar for (ticker, interval)."""
+        rows = [b[2:] for b in self.closed if b[0] == ticker and b[1] == interval]
+        bar = self.open_bars.get((ticker, interval))
+        return rows + ([tuple(bar)] if bar else [])
+
+    # ---------- persistence ----------
+    async def run(self) -> None:
+        """Closes stale bars and queues closed ones for writing every `flush_interval` seconds."""
+        writer = (
+            asyncio.create_task(self.db.run(), name="trade_tape_db")
+            if self._owns_db
+            else None
+        )
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                self.close_stale()
+                batch, self.closed = self.closed, []
+                if batch and self.db is not None:
+                    self.db.write_many(INSERT_BAR_SQL, batch)
+                    self.counters["flushed"] += len(batch)
+        finally:
+            if writer is not None:
+                writer.cancel()
+                await asyncio.gather(writer, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        return {
+            **self.counters,
+            "tickers": len(self.tapes),
+            "open_bars": len(self.open_bars),
+            "pending": len(self.closed),
+        }
@@ -1,9 +1,34 @@
-from kalshi_ref import KalshiHttpClient
-import sqlite3
+from collections import defaultdict, deque
+from typing import Iterable
 
+from strategy_host import Strategy
 
-class TradingMomentum():
-    def __init__(self):
-        self.risk = 0
-        self.db_file = "orders.db"
-        
\ No newline at end of file
+
+class TradingMomentum(Strategy):
+    """
+    Follows the mid: once it has moved at least `threshold` cents over the last `window`
+    complete quotes, hold one contract on the side it moved towards.
+    """
+
+    name = "TradingMomentum"
+
+    def __init__(self, tickers: Iterable[str] = (), window: int = 20, threshold: float = 5.0, name: str | None = None):
+        super().__init__(tickers, name)
+        self.window = window
+        self.threshold = threshold
+        self.mids = defaultdict(lambda: deque(maxlen=window))
+
+    def on_book(self, ticker: str, p_yes: int, p_no: int) -> None:
+        if p_yes < 0 or p_no < 0:
+            return
+        # yes bid is 100 - p_no, yes ask is p_yes
+        mids = self.mids[ticker]
+        mids.append((p_yes + 100 - p_no) / 2)
+        if len(mids) < self.window:
+            return
+        move = mids[-1] - mids[0]
+        pos = self.position(ticker)
+        if move >= self.threshold and pos <= 0:
+            self.submit(ticker, 1 - pos, p_yes)
+        elif move <= -self.threshold and pos >= 0:
+            self.submit(ticker, -1 - pos, p_no)
@@ -1,7 +1,32 @@
+import asyncio
+import datetime as dt
+import functools
 import re
 import json
 from typing import Dict, Any, Optional
 
+import orjson
+
+from poll_scheduler import CLI_DAILY, Cadence, PollScheduler
+from weather_http import WeatherHttp
+from weather_markets import site2mkt
+
+# api.weather.gov: the latest products of a type for a location, and one product's text
+PRODUCTS_URL = "https://api.weather.gov/products/types/CLI/locations/{location}"
+PRODUCT_URL = "https://api.weather.gov/products/{id}"
+HEADERS = {"User-Agent": "akshay-trading weather (github.com/akshaygulabrao)", "Accept": "application/ld+json"}
+
+# market station -> CLI report location
+CLI_LOCATIONS = {
+    "KNYC": "NYC",
+    "KMDW": "MDW",
+    "KAUS": "AUS",
+    "KMIA": "MIA",
+    "KDEN": "DEN",
+    "KPHL": "PHL",
+    "KLAX": "LAX",
+}
+
 
 def parse_climate_report(text: str) -> Dict[str, Any]:
     """
@@ -196,6 +221,86 @@ def parse_climate_report(text: str) -> Dict[str, Any]:
     return data
 
 
+class ClimateReportPoll:
+    """
+    Publishes each market station's CLI (daily climate) report when a new one is issued,
+    parsed by parse_climate_report. Each station is a PollScheduler source on the daily
+    `cadence`; a poll lists the latest products and fetches the text only for a new one.
+    Like the forecast, each site (market name) is its own stream numbered by `seq`, one
+    packet per new report; a reader that misses a seq asks for `snapshot(site)`.
+    """
+
+    def __init__(
+        self,
+        queue: asyncio.Queue,
+        http: WeatherHttp | None = None,
+        scheduler: PollScheduler | None = None,
+        cadence: Cadence = CLI_DAILY,
+    ):
+        self.q = queue
+        # a client passed in is shared and closed by its owner; one built here is closed by run()
+        self.http = http or WeatherHttp()
+        self._owns_http = http is None
+        # a scheduler passed in is shared and run by its owner; otherwise run() runs its own
+        self.scheduler = scheduler or PollScheduler()
+        self._owns_scheduler = scheduler is None
+        self.cadence = cadence
+        self.latest: Dict[str, str] = {}  # station -> id of the last product published
+        self.seq = {site2mkt[station]: 0 for station in CLI_LOCATIONS}
+        self.reports: Dict[str, tuple] = {}  # site -> (issued_at, report) last published
+
+    async def update_site(self, station: str) -> Optional[float]:
+        """One scheduled poll: publishes a new report and returns its issuance time (epoch seconds)."""
+        resp = await self.http.get(PRODUCTS_URL.format(location=CLI_LOCATIONS[station]), headers=HEADERS)
+        resp.raise_for_status()
+        products = orjson.loads(resp.content).get("@graph") or []
+        if not products or products[0]["id"] == self.latest.get(station):
+            return None
+        product = products[0]
+        resp = await self.http.get(PRODUCT_URL.format(id=product["id"]), headers=HEADERS)
+        resp.raise_for_status()
+        report = parse_climate_report(orjson.loads(resp.content)["productText"])
+        first = station not in self.latest
+        self.latest[station] = product["id"]
+        site = site2mkt[station]
+        self.reports[site] = (product["issuanceTime"], report)
+        self.seq[site] += 1
+        await self.q.put(self.packet(site))
+        # the report already out at startup says nothing about when reports appear
+        return None if first else dt.datetime.fromisoformat(product["issuanceTime"]).timestamp()
+
+    def packet(self, site: str, full: bool = False) -> Dict[str, Any]:
+        issued_at, report = self.reports[site]
+        return {
+            "type": self.__class__.__name__,
+            "site": site,
+            "seq": self.seq[site],
+            "full": full,
+            "issued_at": issued_at,
+            "payload": report,
+        }
+
+    async def snapshot(self, site: str | None = None) -> list:
+        """Full packets, as of each site's seq, for `site` (a market name) or every site."""
+        sites = [site] if site is not None else list(self.reports)
+        return [self.packet(s, full=True) for s in sites if s in self.reports]
+
+    async def run(self):
+        names = [f"cli:{station}" for station in CLI_LOCATIONS]
+        try:
+            for name, station in zip(names, CLI_LOCATIONS):
+                self.scheduler.add(name, functools.partial(self.update_site, station), self.cadence)
+            if self._owns_scheduler:
+                await self.scheduler.run()
+            else:
+                await asyncio.Event().wait()  # the owner polls through our client until cancelled
+        finally:
+            for name in names:
+                self.scheduler.remove(name)
+            if self._owns_http:
+                await self.http.aclose()
+
+
 # Example usage:
 if __name__ == "__main__":
     import pprint
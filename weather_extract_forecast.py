@@ -1,43 +1,24 @@
 import asyncio
-import aiosqlite
+import email.utils
+import functools
+import hashlib
 from pathlib import Path
 import logging, os
 
 import time
 
-import pandas as pd
-import numpy as np
-from bs4 import BeautifulSoup
-from collections import defaultdict
-
 import httpx
 import datetime as dt
-import pytz
 import sys
 
+import loop_monitor
+from forecast_store import ForecastStore
+from nws_digital import find_table, parse_table
+from poll_scheduler import NWS_HOURLY, Cadence, PollScheduler
+from storage import Database, StorageService
+from weather_http import WeatherHttp
+from weather_markets import site2mkt
 
-CREATE_TABLE_SQL = """
-            CREATE TABLE IF NOT EXISTS forecast (
-                inserted_at      TEXT NOT NULL,
-                idx              INT,
-                station          TEXT NOT NULL,
-                observation_time TEXT NOT NULL,
-                air_temp         REAL,
-                relative_humidity REAL,
-                dew_point        REAL,
-                wind_speed       REAL,
-                PRIMARY KEY (idx, station, observation_time)
-            );
-            """
-
-INSERT_ROW_SQL = """
-        INSERT OR IGNORE INTO forecast
-        (inserted_at, idx, station, observation_time,
-        air_temp, relative_humidity, dew_point, wind_speed)
-        VALUES
-        (:inserted_at, :idx, :station, :observation_time,
-        :air_temp, :relative_humidity, :dew_point, :wind_speed)
-        """
 
 tz_map = {
     "KNYC": "US/Eastern",
@@ -58,18 +39,46 @@ nws_site2forecast = {
     "KLAX": "https://forecast.weather.gov/MapClick.php?lat=33.96&lon=-118.42&lg=english&&FcstType=digital",
 }
 
-site2mkt = {
-    "KLAX": "KXHIGHLAX",
-    "KNYC": "KXHIGHNY",
-    "KMDW": "KXHIGHCHI",
-    "KAUS": "KXHIGHAUS",
-    "KMIA": "KXHIGHMIA",
-    "KDEN": "KXHIGHDEN",
-    "KPHL": "KXHIGHPHIL",
-}
+def forecast_rows(nws_site, table):
+    """Forecast rows from the digital table markup of `nws_site` (see nws_digital)."""
+    columns = parse_table(table, tz_map[nws_site])
+    if not columns:
+        logging.warning("%s is down", nws_site)
+        return []
+    inserted_at = dt.datetime.now(dt.timezone.utc).isoformat(timespec="microseconds")
+    return [
+        {
+            "inserted_at": inserted_at,
+            "idx": idx,
+            "station": nws_site,
+            "observation_time": observation_time,
+            "air_temp": air_temp,
+            "dew_point": dew_point,
+            "wind_speed": wind_speed,
+            "relative_humidity": relative_humidity,
+        }
+        for idx, (observation_time, air_temp, dew_point, wind_speed, relative_humidity) in enumerate(
+            zip(
+                columns["observation_time"],
+                columns["air_temp"],
+                columns["dew_point"],
+                columns["wind_speed"],
+                columns["relative_humidity"],
+            )
+        )
+    ]
+
+
+def parse_forecast(nws_site, html):
+    """Parses the NWS digital forecast page for `nws_site` into forecast rows."""
+    table = find_table(html)
+    if table is None:
+        logging.warning("%s is down", nws_site)
+        return []
+    return forecast_rows(nws_site, table)
 
 
-async def extract_forecast(nws_site):
+async def extract_forecast(nws_site, http: WeatherHttp | None = None):
     """Fetches forecast data for a given NWS site."""
     url = nws_site2forecast.get(nws_site)
     if not url:
@@ -77,130 +86,261 @@ async def extract_forecast(nws_site):
         return []
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
+        if http is None:
+            async with WeatherHttp() as http:
+                response = await http.get(url)
+        else:
+            response = await http.get(url)
         if response.status_code != 200:
             logging.warning("%s is down", nws_site)
             return []
-
-        soup = BeautifulSoup(response.text, "html.parser")
-        try:
-            table = soup.find_all("table")[4]
-        except IndexError:
-            logging.warning("%s is down", nws_site)
-            return []
-
-        forecast_dict = defaultdict(list)
-        for row in table.find_all("tr"):
-            row_data = [cell.get_text(strip=True) for cell in row.find_all(["td", "th"])]
-            if row_data and row_data[0]:
-                forecast_dict[row_data[0]].extend(row_data[1:])
-
-        tz = pytz.timezone(tz_map[nws_site])
-        df = pd.DataFrame.from_dict(forecast_dict)
-        df["Date"] = df["Date"].replace("", np.nan).ffill()
-        df["Date"] = df["Date"].apply(lambda x: x + "/2025")
-        df["Date"] = pd.to_datetime(df["Date"], format="%m/%d/%Y")
-        df.iloc[:, 1] = df.iloc[:, 1].astype(int)
-        df["Date"] = df["Date"] + pd.to_timedelta(df.iloc[:, 1], unit="h")
-        df["Date"] = df["Date"].dt.tz_localize(tz).dt.strftime("%Y-%m-%dT%H:%M:%S%z")
-
-        df.insert(0, "idx", range(len(df)))
-        df.insert(0, "station", nws_site)
-        df.insert(
-            0,
-            "inserted_at",
-            dt.datetime.now(dt.timezone.utc).isoformat(timespec="microseconds"),
-        )
-        rename_map = {
-            "station": "station",
-            "Date": "observation_time",
-            "Temperature (°F)": "air_temp",
-            "Relative Humidity (%)": "relative_humidity",
-            "Dewpoint (°F)": "dew_point",
-            "Surface Wind (mph)": "wind_speed",
-        }
-        df = df.rename(columns=rename_map)
-        rows = df[
-            [
-                "inserted_at",
-                "idx",
-                "station",
-                "observation_time",
-                "air_temp",
-                "dew_point",
-                "wind_speed",
-                "relative_humidity",
-            ]
-        ].to_dict(orient="records")
-        return rows
+        return parse_forecast(nws_site, response.text)
 
     except Exception as e:
         logging.warning("%s is down", nws_site)
         return []
 
 
+class PageValidator:
+    """
+    Change detection for one polled page.
+
+    Sends If-None-Match / If-Modified-Since when the server has handed out an ETag or
+    Last-Modified, and otherwise compares a hash of the body with the previous one.
+    """
+
+    def __init__(self):
+        self.etag = None
+        self.last_modified = None
+        self.digest = None
+
+    def headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def changed(self, response, content=None):
+        """
+        True if `response` carries content we have not seen; records its validators.
+        `content` (default: the body) is what gets hashed, e.g. only the part we parse.
+        """
+        if response.status_code == 304:
+            return False
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        if content is None:
+            content = response.content
+        elif isinstance(content, str):
+            content = content.encode()
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        if digest == self.digest:
+            return False
+        self.digest = digest
+        return True
+
+
 class ForecastPoll:
-    def __init__(self, queue: asyncio.Queue, db_file: str):
+    """
+    Polls every NWS digital forecast page and publishes only pages that changed.
+
+    Each site is a PollScheduler source with its own learned `cadence` (pages are
+    re-issued about hourly, at different times per office). An unchanged page (304, or a
+    digital table identical to the last one) is not parsed, written or sent downstream.
+    Per-site counters record how many polls found new content. Tables of at least
+    `thread_min_chars` characters (a week of hours, several ms to parse) are parsed in a
+    worker thread instead of on the event loop.
+
+    Each site is its own stream of packets numbered by `seq`. A packet lists only the hours
+    whose temperature changed or that are new (`payload`, (observation_time, air_temp)
+    pairs) and the hours that left the page (`remove`); a page whose temperatures did not
+    change sends nothing. A reader that misses a seq asks for `snapshot(site)`.
+    """
+
+    def __init__(
+        self,
+        queue: asyncio.Queue,
+        db_file: str,
+        report_interval: float = 300.0,
+        http: WeatherHttp | None = None,
+        db: Database | None = None,
+        scheduler: PollScheduler | None = None,
+        cadence: Cadence = NWS_HOURLY,
+        thread_min_chars: int = 64_000,
+    ):
         self.q = queue
         self.db_file = db_file
+        # a Database passed in is shared and run by its owner; one built from db_file is run here
+        self.db = db or Database(db_file)
+        self._owns_db = db is None
+        self.store = ForecastStore(self.db)
+        # a client passed in is shared and closed by its owner; one built here is closed by run()
+        self.http = http or WeatherHttp()
+        self._owns_http = http is None
+        # a scheduler passed in is shared and run by its owner; otherwise run() runs its own
+        self.scheduler = scheduler or PollScheduler(report_interval)
+        self._owns_scheduler = scheduler is None
+        self.cadence = cadence
+        self.report_interval = report_interval
+        self.thread_min_chars = thread_min_chars
+        self.validators = {site: PageValidator() for site in nws_site2forecast}
+        self.sent = {site2mkt[site]: {} for site in nws_site2forecast}  # observation_time -> air_temp
+        self.seq = {site2mkt[site]: 0 for site in nws_site2forecast}
+        self.metrics = {
+            site: {"polls": 0, "not_modified": 0, "unchanged": 0, "changed": 0, "errors": 0}
+            for site in nws_site2forecast
+        }
+
+    async def fetch_site(self, nws_site):
+        """
+        Returns the digital table markup if it changed since the last poll, else None.
+        Raises if the page could not be fetched or has no digital table.
+        """
+        metrics = self.metrics[nws_site]
+        metrics["polls"] += 1
+        validator = self.validators[nws_site]
+        try:
+            response = await self.http.get(nws_site2forecast[nws_site], headers=validator.headers())
+        except httpx.HTTPError:
+            metrics["errors"] += 1
+            raise
+        if response.status_code == 304:
+            metrics["not_modified"] += 1
+            return None
+        if response.status_code != 200:
+            metrics["errors"] += 1
+            raise httpx.HTTPStatusError(
+                f"{nws_site} is down: HTTP {response.status_code}", request=response.request, response=response
+            )
+        table = find_table(response.text)
+        if table is None:
+            metrics["errors"] += 1
+            raise ValueError(f"{nws_site} is down: no digital table")
+        if not validator.changed(response, table):
+            metrics["unchanged"] += 1
+            return None
+        return table
+
+    def _count(self, nws_site, rows):
+        if rows:
+            self.metrics[nws_site]["changed"] += 1
+        else:
+            self.metrics[nws_site]["errors"] += 1
+            self.validators[nws_site].digest = None  # retry the parse next time
 
-    async def resubscribe(self):
-        await asyncio.sleep(1)
-        start = time.perf_counter_ns()
-        coros = [extract_forecast(i) for i in nws_site2forecast.keys()]
-        for coro in asyncio.as_completed(coros):
+    async def poll_site(self, nws_site):
+        """Returns parsed rows if the page changed since the last poll, else None; raises like fetch_site."""
+        table = await self.fetch_site(nws_site)
+        if table is None:
+            return None
+        if len(table) >= self.thread_min_chars:
+            rows = await asyncio.to_thread(forecast_rows, nws_site, table)
+        else:
+            rows = forecast_rows(nws_site, table)
+        self._count(nws_site, rows)
+        return rows or None
+
+    def issued_at(self, nws_site, rows):
+        """The page's Last-Modified time if it sent one, else when we fetched it (UTC ISO)."""
+        last_modified = self.validators[nws_site].last_modified
+        if last_modified:
             try:
-                result = await coro
-                if not result:  # Skip if no data
-                    continue
-                    
-                async with aiosqlite.connect(self.db_file) as conn:
-                    await conn.executemany(INSERT_ROW_SQL, result)
-                    await conn.commit()
-                filtered = [(i["observation_time"], i["air_temp"]) for i in result]
-                packet = {
-                    "type": self.__class__.__name__,
-                    "site": site2mkt[result[0]["station"]],
-                    "payload": filtered,
-                }
-                await self.q.put(packet)
-            except Exception as e:
-                logging.error("Error processing forecast: %s", e)
-                continue
-        end = time.perf_counter_ns()
-        # logging.info("%s took %d ns", self.__class__.__name__, (end - start))
+                issued = email.utils.parsedate_to_datetime(last_modified)
+                return issued.astimezone(dt.timezone.utc).isoformat(timespec="microseconds")
+            except (TypeError, ValueError):
+                pass
+        return rows[0]["inserted_at"]
+
+    async def update_site(self, nws_site):
+        """One scheduled poll: publishes a changed page and returns its issue time (epoch seconds)."""
+        rows = await self.poll_site(nws_site)
+        if rows is None:
+            return None
+        await self.publish(rows)
+        if self.metrics[nws_site]["changed"] == 1:
+            return None  # the page already up at startup says nothing about when pages change
+        return dt.datetime.fromisoformat(self.issued_at(nws_site, rows)).timestamp()
+
+    def packet(self, site, payload, remove=(), full=False):
+        return {
+            "type": self.__class__.__name__,
+            "site": site,
+            "seq": self.seq[site],
+            "full": full,
+            "payload": payload,
+            "remove": list(remove),
+        }
+
+    async def publish(self, result):
+        self.store.add(result, self.issued_at(result[0]["station"], result))
+        site = site2mkt[result[0]["station"]]
+        sent = self.sent[site]
+        page = {i["observation_time"]: i["air_temp"] for i in result}
+        changed = [(t, temp) for t, temp in page.items() if t not in sent or sent[t] != temp]
+        removed = [t for t in sent if t not in page]
+        if not (changed or removed):
+            return
+        self.sent[site] = page
+        self.seq[site] += 1
+        await self.q.put(self.packet(site, changed, removed))
+
+    async def snapshot(self, site=None):
+        """Full packets, as of each site's seq, for `site` (a market name) or every site."""
+        sites = [site] if site is not None else list(self.sent)
+        return [
+            self.packet(s, sorted(self.sent[s].items()), full=True)
+            for s in sites if s in self.sent
+        ]
 
+    def stats(self):
+        return {
+            site: {**m, "change_rate": round(m["changed"] / m["polls"], 3) if m["polls"] else None}
+            for site, m in self.metrics.items()
+        }
 
     async def run(self):
-        async with aiosqlite.connect(self.db_file) as conn:
-            await conn.execute(CREATE_TABLE_SQL)
-            await conn.commit()
+        writer = asyncio.create_task(self.db.run(), name="forecast_db") if self._owns_db else None
+        await self.store.load(since=_days_ago(1))
+        report = asyncio.create_task(self._report_forever(), name="forecast_report")
+        names = [f"forecast:{site}" for site in nws_site2forecast]
+        try:
+            for name, site in zip(names, nws_site2forecast):
+                self.scheduler.add(name, functools.partial(self.update_site, site), self.cadence)
+            if self._owns_scheduler:
+                await self.scheduler.run()
+            else:
+                await asyncio.Event().wait()  # the owner polls through our client until cancelled
+        finally:
+            for name in names:
+                self.scheduler.remove(name)
+            tasks = [t for t in (report, writer) if t is not None]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self._owns_http:
+                await self.http.aclose()
+
+    async def _report_forever(self):
         while True:
-            await asyncio.sleep(5)
-            start = time.perf_counter_ns()
-            coros = [extract_forecast(i) for i in nws_site2forecast.keys()]
-            for coro in asyncio.as_completed(coros):
-                try:
-                    result = await coro
-                    if not result:  # Skip if no data
-                        continue
-                        
-                    async with aiosqlite.connect(self.db_file) as conn:
-                        await conn.executemany(INSERT_ROW_SQL, result)
-                        await conn.commit()
-                    filtered = [(i["observation_time"], i["air_temp"]) for i in result]
-                    packet = {
-                        "type": self.__class__.__name__,
-                        "site": site2mkt[result[0]["station"]],
-                        "payload": filtered,
-                    }
-                    await self.q.put(packet)
-                except Exception as e:
-                    logging.error("Error processing forecast: %s", e)
-                    continue
-            end = time.perf_counter_ns()
-            logging.info("%s took %d ns", self.__class__.__name__, (end - start))
+            await asyncio.sleep(self.report_interval)
+            for site, m in self.stats().items():
+                logging.info(
+                    "%s %s: %d polls, %d not modified, %d unchanged, %d changed (%.1f%%), %d errors",
+                    self.__class__.__name__, site, m["polls"], m["not_modified"], m["unchanged"],
+                    m["changed"], 100 * (m["change_rate"] or 0), m["errors"],
+                )
+            self.http.log_stats()
+            logging.info("%s store: %s", self.__class__.__name__, self.store.stats())
+            self.store.prune(before=_days_ago(1))
+            if self._owns_db:
+                logging.info("%s db: %s", self.__class__.__name__, self.db.stats())
+
+
+def _days_ago(days):
+    """Date prefix that sorts before every observation_time from `days` days ago on."""
+    return (dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=days)).strftime("%Y-%m-%d")
 
 
 async def consumer(queue: asyncio.Queue):
@@ -217,15 +357,22 @@ async def main():
                 sys.exit(f"Missing or invalid env var {n}")
 
     _require_envs("FORECAST_DB_PATH")
+    monitor_task = loop_monitor.start_from_env()
 
     queue = asyncio.Queue(maxsize=10_000)
-    producers = [ForecastPoll(queue, os.getenv("FORECAST_DB_PATH"))]
-    producer_tasks = [asyncio.create_task(p.run()) for p in producers]
-    consumer_task = asyncio.create_task(consumer(queue))
+    storage = StorageService()
+    db = storage.database(os.getenv("FORECAST_DB_PATH"))
+    producers = [ForecastPoll(queue, db.path, db=db)]
+    try:
+        producer_tasks = [asyncio.create_task(p.run()) for p in producers]
+        storage_task = asyncio.create_task(storage.run(), name="storage")
+        consumer_task = asyncio.create_task(consumer(queue))
 
-    await asyncio.gather(*producer_tasks)
-    await queue.join()
-    await consumer_task
+        await asyncio.gather(*producer_tasks, storage_task)
+        await queue.join()
+        await consumer_task
+    finally:
+        await loop_monitor.stop(monitor_task)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,160 @@
+"""
+Shared HTTP client for the weather pollers.
+
+One long-lived httpx.AsyncClient (pooled keep-alive connections, explicit timeouts) with
+a concurrency cap per host and retry with exponential backoff on connection errors, 429
+and 5xx. Every request records its latency and whether it opened a new connection, so
+stats() reports per-host latency percentiles and the connection reuse rate.
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger("weather_http")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class WeatherHttp:
+    def __init__(
+        self,
+        per_host: int = 4,
+        max_connections: int = 20,
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+        retries: int = 2,
+        backoff: float = 0.5,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self._client_kwargs = {
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            "timeout": httpx.Timeout(timeout, connect=connect_timeout),
+            "follow_redirects": True,
+            "transport": transport,
+        }
+        self.client: httpx.AsyncClient | None = None
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.latency_ms: Dict[str, deque] = defaultdict(lambda: deque(maxlen=1000))
+        self.counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"requests": 0, "new_connections": 0, "retries": 0, "errors": 0}
+        )
+
+    # ---------- lifecycle ----------
+    async def start(self) -> "WeatherHttp":
+        if self.client is None:
+            self.client = httpx.AsyncClient(**self._client_kwargs)
+        return self
+
+    async def aclose(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def __aenter__(self) -> "WeatherHttp":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    # ---------- requests ----------
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        """GET with per-host concurrency cap and retries; returns the final response (any status)."""
+        await self.start()
+        host = urlsplit(url).netloc
+        semaphore = self.semaphores.get(host)
+        if semaphore is None:
+            semaphore = self.semaphores[host] = asyncio.Semaphore(self.per_host)
+        counters = self.counters[host]
+
+        def trace(event: str, info: Dict) -> None:
+            if event == "connection.connect_tcp.complete":
+                counters["new_connections"] += 1
+
+        for attempt in range(self.retries + 1):
+            async with semaphore:
+                counters["requests"] += 1
+                start = time.perf_counter()
+                try:
+                    response = await self.client.get(
+                        url, extensions={"trace": _async(trace)}, **kwargs
+                    )
+                except (httpx.TransportError, httpx.TimeoutException) as e:
+                    error: Exception | None = e
+                    response = None
+                else:
+                    error = None
+                self.latency_ms[host].append((time.perf_counter() - start) * 1000)
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                return response
+            if attempt == self.retries:
+                counters["errors"] += 1
+                if response is not None:
+                    return response
+                raise error
+            counters["retries"] += 1
+            delay = self.backoff * 2**attempt
+            if (
+                response is not None
+                and response.headers.get("Retry-After", "").isdigit()
+            ):
+                delay = max(delay, float(response.headers["Retry-After"]))
+            logger.debug(
+                "Retrying %s in %.2fs (%s)", host, delay, error or response.status_code
+            )
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Dict]:
+        def pct(values, q):
+            ordered = sorted(values)
+            return (
+                round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+                if ordered
+                else None
+            )
+
+        out = {}
+        for host, c in self.counters.items():
+            out[host] = {
+                **c,
+                "reuse_rate": round(1 - c["new_connections"] / c["requests"], 3)
+                if c["requests"]
+                else None,
+                "latency_ms": {
+                    "p50": pct(self.latency_ms[host], 0.5),
+                    "p99": pct(self.latency_ms[host], 0.99),
+                },
+            }
+        return out
+
+    def log_stats(self) -> None:
+        for host, s in self.stats().items():
+            logger.info(
+                "%s: %d requests, reuse %s, p50 %sms p99 %sms, %d retries, %d errors",
+                host,
+                s["requests"],
+                s["reuse_rate"],
+                s["latency_ms"]["p50"],
+                s["latency_ms"]["p99"],
+                s["retries"],
+                s["errors"],
+            )
+
+
+def _async(fn):
+    """httpcore calls async trace hooks on async connections."""
+
+    async def hook(event: str, info: Dict) -> None:
+        fn(event, info)
+
+    return hook
@@ -0,0 +1,14 @@
+"""
+Weather stations and the Kalshi daily-high series settled on each, shared by the
+weather pollers and the trading tools (importing it pulls in no poller dependencies).
+"""
+
+site2mkt = {
+    "KLAX": "KXHIGHLAX",
+    "KNYC": "KXHIGHNY",
+    "KMDW": "KXHIGHCHI",
+    "KAUS": "KXHIGHAUS",
+    "KMIA": "KXHIGHMIA",
+    "KDEN": "KXHIGHDEN",
+    "KPHL": "KXHIGHPHIL",
+}
@@ -1,6 +1,5 @@
 import os
 import time
-from venv import create
 from typing import Dict, Any
 import logging
 import sys, os
@@ -8,10 +7,16 @@ from pathlib import Path
 import datetime
 
 import asyncio
-import aiohttp
-import aiosqlite
-from aiohttp import ClientError, ClientTimeout
-from itertools import groupby
+import httpx
+import numpy as np
+import orjson
+
+import loop_monitor
+from poll_scheduler import ASOS_5MIN, Cadence, PollScheduler
+from sensor_buffer import RunLengthEncoder, SensorBuffers, format_times, observation_rows
+from storage import Database, StorageService
+from weather_http import WeatherHttp
+from weather_markets import site2mkt
 
 
 API_URL = "https://api.synopticdata.com/v2/stations/timeseries"
@@ -64,118 +69,149 @@ CREATE TABLE IF NOT EXISTS weather (
 );
 """
 
-site2mkt = {
-    "KLAX": "KXHIGHLAX",
-    "KNYC": "KXHIGHNY",
-    "KMDW": "KXHIGHCHI",
-    "KAUS": "KXHIGHAUS",
-    "KMIA": "KXHIGHMIA",
-    "KDEN": "KXHIGHDEN",
-    "KPHL": "KXHIGHPHIL",
-}
-
-
-def compress_consecutive(data):
-    compressed = {}
-    for sensor, readings in data.items():
-        readings = sorted(readings, key=lambda x: x[0])
-        compressed_readings = []
-        current_value = None
-        current_start = None
-
-        for timestamp, value in readings:
-            if current_value is None:
-                current_value = value
-                current_start = timestamp
-            elif value != current_value:
-                # Value changed, add the previous segment
-                compressed_readings.append((current_start[11:16], current_value))
-                current_value = value
-                current_start = timestamp
-
-        # Add the last segment
-        if current_value is not None:
-            compressed_readings.append((current_start[11:16], current_value))
-
-        compressed[sensor] = compressed_readings
-    return compressed
-
-
-async def get_timeseries_async(create_table_sql, insert_row_sql, db_file) -> Dict[str, Any]:
-    params = {**DEFAULT_PARAMS, "STID": "KNYC,KMDW,KMIA,KAUS,KDEN,KPHL,KLAX"}
-    async with aiosqlite.connect(db_file) as conn:
-        await conn.execute(create_table_sql)
-        await conn.commit()
-
-    async with aiohttp.ClientSession() as session:
-        async with session.get(API_URL, params=params, headers=HEADERS, timeout=15) as resp:
-            resp.raise_for_status()
-            data = await resp.json()
-            all_obs = [
-                (
-                    datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="microseconds"),
-                    st["STID"],
-                    dt,
-                    t,
-                    rh,
-                    dp,
-                    ws,
-                )
-                for st in data["STATION"]
-                for dt, t, rh, dp, ws in zip(
-                    st["OBSERVATIONS"]["date_time"],
-                    st["OBSERVATIONS"]["air_temp_set_1"],
-                    st["OBSERVATIONS"]["relative_humidity_set_1"],
-                    st["OBSERVATIONS"]["dew_point_temperature_set_1d"],
-                    st["OBSERVATIONS"]["wind_speed_set_1"],
-                )
-            ]
-            latest_obs = {
-                site2mkt[st["STID"]]: list(
-                    zip(
-                        st["OBSERVATIONS"]["date_time"][-6 * 13 :],
-                        st["OBSERVATIONS"]["air_temp_set_1"][-6 * 13 :],
-                    )
-                )
-                for st in data["STATION"]
-            }
-
-    async with aiosqlite.connect(db_file) as conn:
-        await conn.executemany(insert_row_sql, all_obs)
-        await conn.commit()
-
-    return compress_consecutive(latest_obs)
+STATIONS = "KNYC,KMDW,KMIA,KAUS,KDEN,KPHL,KLAX"
+# Synoptic series, in the weather table's column order (sensor_buffer.VALUE_FIELDS)
+OBS_KEYS = ("air_temp_set_1", "relative_humidity_set_1", "dew_point_temperature_set_1d", "wind_speed_set_1")
+RECENT_OBS = 6 * 13  # observations per station in the payload
 
 
 class SensorPoll:
-    def __init__(self, queue: asyncio.Queue, db_file: str):
+    """
+    Polls Synoptic for the seven market stations and publishes their recent temperatures,
+    as a PollScheduler source on the 5-minute ASOS `cadence`.
+
+    The first poll asks for the last three hours (`recent`); after that each request starts
+    at the oldest of the stations' latest observation times, and only observations newer
+    than a station's latest are kept. New observations go to per-station ring buffers and
+    to the `weather` table.
+
+    Packets carry each station's temperatures as (HH:MM, value) runs over its last
+    RECENT_OBS readings. Published packets are deltas: only the stations whose runs changed,
+    as RunLengthEncoder deltas, numbered by `seq` (the first one, seq 1, lists every run);
+    a poll that changes nothing publishes nothing. A reader that misses a seq asks for
+    `snapshot()`, the full set as of its `seq`, and applies the deltas after it.
+    """
+
+    def __init__(
+        self,
+        queue: asyncio.Queue,
+        db_file: str,
+        http: WeatherHttp | None = None,
+        db: Database | None = None,
+        capacity: int = 1024,
+        scheduler: PollScheduler | None = None,
+        cadence: Cadence = ASOS_5MIN,
+    ):
         self.q = queue
         self.db_file = db_file
+        # a client passed in is shared and closed by its owner; one built here is closed by run()
+        self.http = http or WeatherHttp()
+        self._owns_http = http is None
+        # a scheduler passed in is shared and run by its owner; otherwise run() runs its own
+        self.scheduler = scheduler or PollScheduler()
+        self._owns_scheduler = scheduler is None
+        self.cadence = cadence
+        # a Database passed in is shared and run by its owner; one built from db_file is run here
+        self.db = db or Database(db_file)
+        self._owns_db = db is None
+        self.db.add_ddl(CREATE_TABLE_SQL)
+        self.buffers = SensorBuffers(site2mkt, capacity)
+        self.encoders = {station: RunLengthEncoder(RECENT_OBS) for station in site2mkt}
+        self.seq = 0
+        self.bootstrapped = False
+        self.counters = {"polls": 0, "observations": 0, "new": 0}
+
+    def params(self) -> Dict[str, Any]:
+        params = {**DEFAULT_PARAMS, "STID": STATIONS}
+        if not self.bootstrapped:
+            return params
+        # a station that has reported nothing yet keeps the bootstrap window
+        window_start = int(time.time()) - params.pop("recent")
+        start = min((ts for ts in self.buffers.last_ts().values() if ts is not None), default=window_start)
+        if any(ts is None for ts in self.buffers.last_ts().values()):
+            start = min(start, window_start)
+        params["start"] = time.strftime("%Y%m%d%H%M", time.gmtime(start))
+        params["end"] = time.strftime("%Y%m%d%H%M", time.gmtime(time.time() + 60))
+        return params
+
+    async def poll_once(self) -> int:
+        """Fetches and stores new observations; returns how many were new."""
+        resp = await self.http.get(API_URL, params=self.params(), headers=HEADERS)
+        resp.raise_for_status()
+        data = orjson.loads(resp.content)
+        inserted_at = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="microseconds")
+        self.counters["polls"] += 1
+        new = 0
+        for st in data.get("STATION", []):
+            obs = st["OBSERVATIONS"]
+            times = obs.get("date_time") or []
+            self.counters["observations"] += len(times)
+            ts, utc_offset, values = self.buffers.ingest(st["STID"], times, [obs.get(key) for key in OBS_KEYS])
+            if len(ts):
+                self.db.write_many(INSERT_ROW_SQL, observation_rows(inserted_at, st["STID"], ts, utc_offset, values))
+                self.encode(st["STID"], ts, utc_offset, values)
+            new += len(ts)
+        self.counters["new"] += new
+        self.bootstrapped = True
+        return new
+
+    def encode(self, station: str, ts: np.ndarray, utc_offset: np.ndarray, values: np.ndarray) -> None:
+        encoder = self.encoders.get(station)
+        if encoder is None:
+            encoder = self.encoders[station] = RunLengthEncoder(RECENT_OBS)
+        labels = [t[11:16] for t in format_times(ts, utc_offset)]
+        encoder.extend(labels, np.round(values[:, 0].astype(np.float64), 3))
+
+    def payload(self) -> Dict[str, Any]:
+        """Deltas of the stations whose runs changed since the last payload."""
+        deltas = ((site2mkt[station], enc.delta()) for station, enc in self.encoders.items())
+        return {mkt: delta for mkt, delta in deltas if delta is not None}
+
+    def packet(self, payload: Dict[str, Any], full: bool = False) -> Dict[str, Any]:
+        return {"type": self.__class__.__name__, "seq": self.seq, "full": full, "payload": payload}
+
+    async def publish(self) -> None:
+        payload = self.payload()
+        if not payload:
+            return
+        self.seq += 1
+        await self.q.put(self.packet(payload))
+
+    async def snapshot(self, site: str | None = None) -> list:
+        """A full packet for one reader (`site` is ignored: it covers every station)."""
+        await self.publish()  # readers get any change not published yet as the next seq
+        return [self.packet({site2mkt[station]: enc.snapshot() for station, enc in self.encoders.items()}, full=True)]
+
+    async def update(self) -> float | None:
+        """
+        One scheduled poll: publishes new observations and returns the newest one's time
+        (epoch seconds), or None if there were none. Bad responses raise, so nothing bad
+        is pushed to the queue and the scheduler backs off.
+        """
+        bootstrap = not self.bootstrapped
+        if not await self.poll_once():
+            return None
+        await self.publish()
+        if bootstrap:
+            return None  # the last three hours, not a new report
+        return max(ts for ts in self.buffers.last_ts().values() if ts is not None)
 
     async def run(self):
-        while True:
-            await asyncio.sleep(1)
-            start = time.perf_counter_ns()
-            try:
-                payload = await get_timeseries_async(CREATE_TABLE_SQL, INSERT_ROW_SQL, self.db_file)
-            except (ClientError, asyncio.TimeoutError, ValueError) as exc:
-                logging.exception("Error fetching timeseries %s", exc)
-                continue  # do not push bad/None data to the queue
-            packet = {"type": self.__class__.__name__, "payload": payload}
-            await self.q.put(packet)
-            end = time.perf_counter_ns()
-            # logging.info("%s took %d ns", self.__class__.__name__, (end - start))
-
-    async def resubscribe(self):
-        start = time.perf_counter_ns()
+        writer = asyncio.create_task(self.db.run(), name="weather_db") if self._owns_db else None
+        name = self.__class__.__name__
         try:
-            payload = await get_timeseries_async(CREATE_TABLE_SQL, INSERT_ROW_SQL, self.db_file)
-        except (ClientError, asyncio.TimeoutError, ValueError) as exc:
-            logging.exception("Error fetching timeseries %s", exc)
-        packet = {"type": self.__class__.__name__, "payload": payload}
-        await self.q.put(packet)
-        end = time.perf_counter_ns()
-        # logging.info("%s took %d ns", self.__class__.__name__, (end - start))
+            self.scheduler.add(name, self.update, self.cadence)
+            if self._owns_scheduler:
+                await self.scheduler.run()
+            else:
+                await asyncio.Event().wait()  # the owner polls through our client until cancelled
+        finally:
+            self.scheduler.remove(name)
+            if writer is not None:
+                writer.cancel()
+                await asyncio.gather(writer, return_exceptions=True)
+            if self._owns_http:
+                await self.http.aclose()
 
 
 async def consumer(queue: asyncio.Queue):
@@ -192,14 +228,21 @@ async def main():
                 sys.exit(f"Missing or invalid env var {n}")
 
     _require_envs("WEATHER_DB_PATH")
+    monitor_task = loop_monitor.start_from_env()
     queue = asyncio.Queue(maxsize=10_000)
-    producers = [SensorPoll(queue, os.getenv("WEATHER_DB_PATH"))]
-    producer_tasks = [asyncio.create_task(p.run()) for p in producers]
-    consumer_task = asyncio.create_task(consumer(queue))
-
-    await asyncio.gather(*producer_tasks)
-    await queue.join()
-    await consumer_task
+    storage = StorageService()
+    db = storage.database(os.getenv("WEATHER_DB_PATH"), CREATE_TABLE_SQL)
+    producers = [SensorPoll(queue, db.path, db=db)]
+    try:
+        producer_tasks = [asyncio.create_task(p.run()) for p in producers]
+        storage_task = asyncio.create_task(storage.run(), name="storage")
+        consumer_task = asyncio.create_task(consumer(queue))
+
+        await asyncio.gather(*producer_tasks, storage_task)
+        await queue.join()
+        await consumer_task
+    finally:
+        await loop_monitor.stop(monitor_task)
 
 
 if __name__ == "__main__":